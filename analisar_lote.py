@@ -0,0 +1,75 @@
+"""Analisa uma pasta (ou um padrão glob) de PDFs e TXTs sem abrir o app, gravando os resultados em JSONL.
+
+Uso: python analisar_lote.py CAMINHO_OU_GLOB [--saida resultados.jsonl] [--simultaneos N] [--motor unica|secoes]
+
+A chave do Gemini vem da variável de ambiente GEMINI_API_KEY ou de .streamlit/secrets.toml.
+As análises usam (e alimentam) o mesmo cache do app, então abrir depois um desses
+documentos no Resume Ai mostra o resultado na hora. Interrompido, basta rodar o mesmo
+comando de novo: os arquivos já presentes na saída com status "ok" são pulados.
+"""
+import argparse
+import logging
+import os
+import sys
+import tomllib
+
+from core.analise import LIMIAR_TOKENS_MAP_REDUCE, MOTOR_CHAMADA_UNICA, MOTOR_TRES_CHAMADAS, VERSAO_PROMPTS
+from core.cache import CacheAnalises
+from core.config import CAMINHO_CACHE_ANALISES, CAMINHO_REGISTRO_USO, LIMITE_CACHE_ANALISES, LIMITE_CARACTERES_EXTRACAO, MODELO_GEMINI
+from core.lote import MAX_DOCUMENTOS_SIMULTANEOS, analisar_com_cache, listar_arquivos, processar_lote
+from core.portao import ModeloComPortao, PortaoGemini
+from core.uso import ModeloRegistrado, RegistroUso
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+USUARIO_LOTE = "analise-em-lote"  # Identifica as chamadas do lote no painel de uso
+MOTORES = {"unica": MOTOR_CHAMADA_UNICA, "secoes": MOTOR_TRES_CHAMADAS}
+
+
+def chave_gemini():
+    if chave := os.environ.get("GEMINI_API_KEY"): return chave
+    for caminho in (os.path.join(RAIZ, ".streamlit", "secrets.toml"), os.path.expanduser("~/.streamlit/secrets.toml")):
+        if os.path.exists(caminho):
+            with open(caminho, "rb") as f:
+                if chave := tomllib.load(f).get("GEMINI_API_KEY"): return chave
+    sys.exit("Defina GEMINI_API_KEY no ambiente ou em .streamlit/secrets.toml.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("alvo", help="pasta (percorrida recursivamente) ou padrão glob, entre aspas")
+    parser.add_argument("--saida", default="resultados.jsonl", help="arquivo JSONL de saída; também serve de checkpoint")
+    parser.add_argument("--simultaneos", type=int, default=MAX_DOCUMENTOS_SIMULTANEOS, help="documentos analisados ao mesmo tempo")
+    parser.add_argument("--motor", choices=list(MOTORES), default="unica")
+    parser.add_argument("--modelo", default=MODELO_GEMINI)
+    parser.add_argument("--cache", default=CAMINHO_CACHE_ANALISES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    arquivos = listar_arquivos(args.alvo)
+    if not arquivos: sys.exit(f"Nenhum PDF ou TXT encontrado em {args.alvo}.")
+
+    import google.generativeai as genai
+    genai.configure(api_key=chave_gemini())
+    cache = CacheAnalises(args.cache, limite_bytes=LIMITE_CACHE_ANALISES)
+    cache.invalidar(VERSAO_PROMPTS)
+    registro_uso = RegistroUso(CAMINHO_REGISTRO_USO, limite_tokens_diario=None)
+    portao = PortaoGemini(inicial=args.simultaneos * 3)  # Até três seções por documento ao mesmo tempo
+    model = ModeloRegistrado(ModeloComPortao(genai.GenerativeModel(args.modelo), portao, USUARIO_LOTE), registro_uso, USUARIO_LOTE, "analise_lote", args.modelo)
+
+    def analisar_texto(texto):
+        return analisar_com_cache(model, texto, cache, nome_modelo=args.modelo, motor=MOTORES[args.motor], limiar_tokens=LIMIAR_TOKENS_MAP_REDUCE)
+
+    def informar(registro, concluidos, total):
+        situacao = "cache" if registro.get("uso", {}).get("cache") else registro["status"]
+        print(f"[{concluidos}/{total}] {situacao:>5} {registro['segundos']:>7.1f} s  {registro['arquivo']}" + (f"  ({registro['erro']})" if registro.get("erro") else ""), flush=True)
+
+    contagem = processar_lote(arquivos, analisar_texto, args.saida, max_simultaneos=args.simultaneos,
+                              limite_caracteres=LIMITE_CARACTERES_EXTRACAO, ao_concluir=informar)
+    print(f"{contagem['ok']} analisados, {contagem['erros']} com erro, {contagem['pulados']} já estavam no checkpoint ({args.saida}).")
+    metricas = portao.estatisticas()
+    print(f"Gemini: {metricas['chamadas']} chamadas, {metricas['retentativas']} retentativas, {metricas['limitacoes']} limitações de taxa, concorrência final {metricas['limite']}.")
+    sys.exit(1 if contagem["erros"] else 0)
+
+
+if __name__ == "__main__":
+    main()
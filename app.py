@@ -1,31 +1,79 @@
 import streamlit as st
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
-import fitz  # PyMuPDF
-from io import BytesIO
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from newspaper import Article
 import time
 from supabase import create_client, Client
 from datetime import date, datetime, timedelta
-import uuid
+import os
+import logging
+from core.artigos import BuscadorArtigos, CachePaginas, separar_urls
+from core.analise import LIMIAR_TOKENS_MAP_REDUCE, SECOES, MOTOR_CHAMADA_UNICA, MOTOR_TRES_CHAMADAS, VERSAO_PROMPTS
+from core.cache import CacheAnalises, CacheExtracoes, chave_analise
+from core.chat import ChatLimitado, RespostaEmStream
+from core.config import (CAMINHO_CACHE_ANALISES, CAMINHO_CACHE_EXTRACOES, CAMINHO_REGISTRO_USO, LIMITE_CACHE_ANALISES,
+                         LIMITE_CACHE_EXTRACOES, LIMITE_CARACTERES_EXTRACAO, MODELO_GEMINI)
+from core.extracao import VERSAO_EXTRATOR, combinar_documentos, extrair_documentos, extrair_texto
+from core.lote import analisar_com_cache
+from core.notas import CacheNotas, IndiceNotas, buscar_notas, excluir_notas, exportar_notas_zip
+from core.portao import ModeloComPortao, PortaoGemini
+from core.prefixos import BackendGemini, CachePrefixos
+from core.recuperacao import BuscaHibrida, ChatComRecuperacao, IndiceBM25, dividir_documentos
+from core.tarefas import FALHOU, NA_FILA, ExecutorTarefas
+from core.transcricoes import CacheTranscricoes, MuitasRequisicoes, ProvedorYouTube, ServicoTranscricoes, TranscricaoIndisponivel, extrair_id_video
+from core.uso import ModeloRegistrado, RegistroUso
+from core.vetores import EmbeddingHash, carregar_ou_construir, chave_documentos
+
+logger = logging.getLogger(__name__)
 
 # --- MODELO DE IA ESCOLHIDO ---
-ai_model = 'gemini-2.5-flash'
+ai_model = MODELO_GEMINI  # Definido em core/config.py, junto com os caches compartilhados com a análise em lote
+
+# --- CONFIGURAÇÕES DA ANÁLISE ---
+ANALISE_PARALELA = True  # Envia os três prompts da análise ao mesmo tempo
+MOTOR_ANALISE = MOTOR_CHAMADA_UNICA  # Motor padrão; pode ser trocado na página de análise
+NOMES_MOTORES = {MOTOR_CHAMADA_UNICA: "Requisição única (envia o documento uma vez)", MOTOR_TRES_CHAMADAS: "Três requisições (uma por seção)"}
+
+# --- ARTIGOS DA WEB ---
+CAMINHO_CACHE_PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "paginas.sqlite3")
+LIMITE_CACHE_PAGINAS = 100 * 1024 * 1024  # bytes
+MAX_URLS_POR_LOTE = 20
+
+# --- TAREFAS EM SEGUNDO PLANO ---
+MAX_TAREFAS_SIMULTANEAS = 4  # Análises e ingestões executando ao mesmo tempo no processo
+INTERVALO_CONSULTA_TAREFAS = 1.0  # segundos entre as consultas de uma página ao estado da tarefa
+
+# --- TRANSCRIÇÕES DO YOUTUBE ---
+CAMINHO_CACHE_TRANSCRICOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "transcricoes.sqlite3")
+
+# --- PERFIL DO USUÁRIO ---
+TTL_PERFIL = 60  # segundos em que o perfil fica em cache na sessão
+
+# --- REGISTRO DE USO DA IA ---
+LIMITE_TOKENS_DIARIO_USUARIO = 2_000_000  # None desativa a cota
+
+# --- CONFIGURAÇÕES DO CHAT MULTI-DOCUMENTOS ---
+MODO_CONTEXTO_COMPLETO = "contexto_completo"  # Todo o texto vai na primeira mensagem
+MODO_RECUPERACAO = "recuperacao"  # Só os trechos mais relevantes (BM25) vão em cada pergunta
+MODO_VETORIAL = "vetorial"  # Trechos mais parecidos pela busca semântica
+MODO_HIBRIDO = "hibrido"  # BM25 e busca semântica combinados
+MODO_CHAT_MULTI = MODO_HIBRIDO
+NOMES_MODOS_CHAT_MULTI = {MODO_HIBRIDO: "Trechos relevantes (híbrido)", MODO_RECUPERACAO: "Trechos relevantes (BM25)", MODO_VETORIAL: "Trechos relevantes (semântico)", MODO_CONTEXTO_COMPLETO: "Contexto completo"}
+TOP_K_TRECHOS = 6
+EMBEDDING_TRECHOS = EmbeddingHash()
+DIRETORIO_INDICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "indices")
+LIMITE_DISCO_INDICES = 500 * 1024 * 1024  # bytes; os índices usados há mais tempo são removidos
+TITULOS_SECOES = {"resumo_simples": "Resumo Simples (ELI5)", "analise_estruturada": "Análise Estruturada", "perguntas_criticas": "Perguntas Críticas"}
 
 # --- 1. CONFIGURAÇÃO DA PÁGINA E CONEXÕES ---
 st.set_page_config(page_title="Resume Ai", page_icon="💠", layout="wide")
 
 @st.cache_resource
 def init_connections():
-    """Inicializa as conexões com Supabase e Gemini API."""
+    """Inicializa as conexões com o Supabase."""
     try:
         url = st.secrets["SUPABASE_URL"]
         anon_key = st.secrets["SUPABASE_KEY"]
         service_key = st.secrets.get("SUPABASE_SERVICE_ROLE_KEY")
         supabase = create_client(url, anon_key)
         supabase_admin = create_client(url, service_key) if service_key else None
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
         return supabase, supabase_admin
     except Exception as e:
         st.error(f"Erro ao inicializar as conexões. Verifique suas chaves de API. Erro: {e}")
@@ -33,6 +81,62 @@ def init_connections():
 
 supabase, supabase_admin = init_connections()
 
+@st.cache_resource
+def obter_genai():
+    """Importa e configura o SDK do Gemini na primeira página que usa a IA (a importação leva meio segundo)."""
+    import google.generativeai as genai
+    try:
+        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+        return genai
+    except Exception as e:
+        st.error(f"Erro ao inicializar a Gemini API. Verifique sua chave de API. Erro: {e}")
+        st.stop()
+
+@st.cache_resource
+def obter_cache_analises():
+    """Cache de análises compartilhado por todas as sessões do processo."""
+    cache = CacheAnalises(CAMINHO_CACHE_ANALISES, limite_bytes=LIMITE_CACHE_ANALISES)
+    cache.invalidar(VERSAO_PROMPTS)  # Descarta análises feitas com prompts antigos
+    return cache
+
+@st.cache_resource
+def obter_cache_extracoes():
+    """Textos extraídos dos uploads, compartilhados pela análise única e pelo chat multi-documentos."""
+    cache = CacheExtracoes(CAMINHO_CACHE_EXTRACOES, limite_bytes=LIMITE_CACHE_EXTRACOES)
+    cache.invalidar(VERSAO_EXTRATOR)  # Descarta textos de versões antigas do extrator
+    return cache
+
+@st.cache_resource
+def obter_registro_uso():
+    """Registro de chamadas ao Gemini compartilhado por todas as sessões."""
+    return RegistroUso(CAMINHO_REGISTRO_USO, limite_tokens_diario=LIMITE_TOKENS_DIARIO_USUARIO)
+
+@st.cache_resource
+def obter_buscador_artigos():
+    """Sessão HTTP e cache de páginas compartilhados por todas as sessões."""
+    return BuscadorArtigos(CachePaginas(CAMINHO_CACHE_PAGINAS, limite_bytes=LIMITE_CACHE_PAGINAS))
+
+@st.cache_resource
+def obter_servico_transcricoes():
+    """Transcrições em cache e limite de taxa do YouTube compartilhados por todas as sessões."""
+    return ServicoTranscricoes(ProvedorYouTube(), CacheTranscricoes(CAMINHO_CACHE_TRANSCRICOES))
+
+@st.cache_resource
+def obter_executor_tarefas():
+    """Pool de tarefas em segundo plano compartilhado por todas as sessões."""
+    return ExecutorTarefas(max_trabalhadores=MAX_TAREFAS_SIMULTANEAS)
+
+@st.cache_resource
+def obter_portao_gemini():
+    """Limite adaptativo de chamadas simultâneas ao Gemini, compartilhado por todas as sessões."""
+    return PortaoGemini()
+
+@st.cache_resource
+def obter_cache_prefixos():
+    """Documentos registrados como contexto em cache do Gemini, compartilhados entre sessões."""
+    obter_genai()
+    return CachePrefixos(BackendGemini())
+
 # --- 2. FUNÇÕES DE AUTENTICAÇÃO E PERFIL ---
 def show_login_form():
     st.title("Bem-vindo ao Resume Ai")
@@ -66,15 +170,37 @@ def show_login_form():
                     st.info("Agora você pode fazer login na aba 'Login'.")
                 except Exception as e: st.error(f"Erro ao criar conta: {e}")
 
-def get_user_profile():
+def get_user_profile(forcar=False):
+    """Perfil do usuário logado, guardado na sessão por TTL_PERFIL segundos para evitar uma consulta por rerun."""
     if "user_session" in st.session_state:
         try:
             user_id = st.session_state.user_session['user']['id']
+            cache = st.session_state.get("perfil_cache")
+            if not forcar and cache and cache["user_id"] == user_id and time.monotonic() - cache["obtido_em"] < TTL_PERFIL:
+                return cache["dados"]
+            inicio = time.perf_counter()
             response = supabase.table('profiles').select('*').eq('id', user_id).single().execute()
+            latencia = time.perf_counter() - inicio
+            logger.info("Perfil carregado do Supabase em %.0f ms", latencia * 1000)
+            st.session_state.perfil_cache = {"user_id": user_id, "dados": response.data, "obtido_em": time.monotonic(), "latencia": latencia}
             return response.data
         except Exception: return None
     return None
 
+def invalidar_perfil():
+    """Descarta o perfil em cache; chamado no logout.
+
+    Mudanças de assinatura não passam por aqui: um perfil vencido no cache é
+    sempre buscado de novo no banco antes de bloquear o acesso.
+    """
+    st.session_state.pop("perfil_cache", None)
+
+def fazer_logout():
+    invalidar_perfil()
+    supabase.auth.sign_out()
+    for key in list(st.session_state.keys()): del st.session_state[key]
+    st.rerun()
+
 def verificar_validade_assinatura(profile):
     if not profile: return False
     raw = profile.get('subscription_valid_until')
@@ -93,15 +219,15 @@ if "user_session" not in st.session_state or st.session_state.user_session is No
     show_login_form()
 else:
     user_profile = get_user_profile()
+    # Um perfil vencido no cache pode já ter sido renovado: confirma no banco antes de bloquear
+    if user_profile is not None and not verificar_validade_assinatura(user_profile):
+        user_profile = get_user_profile(forcar=True)
 
     if user_profile is None:
         st.error("Erro Crítico: Não foi possível carregar os dados do seu perfil.")
         with st.sidebar:
             st.write("⚠️ Erro de Perfil")
-            if st.button("Logout"):
-                supabase.auth.sign_out()
-                for key in list(st.session_state.keys()): del st.session_state[key]
-                st.rerun()
+            if st.button("Logout"): fazer_logout()
 
     elif verificar_validade_assinatura(user_profile):
         
@@ -121,59 +247,134 @@ else:
                             st.session_state.current_page = page_name
                             st.rerun()
 
-        if "analise_key" not in st.session_state:
-            st.session_state.analise_key = str(uuid.uuid4())
-            
-        @st.cache_data(show_spinner=False, ttl=10)
-        def analisar_texto_unico_com_gemini(_texto, _key):
+        def modelo_registrado(model, tipo):
+            """Modelo que respeita a cota diária do usuário, registra cada chamada no painel de uso e passa pelo portão global."""
+            user_id = st.session_state.user_session['user']['id']
+            return ModeloRegistrado(ModeloComPortao(model, obter_portao_gemini(), user_id), obter_registro_uso(), user_id, tipo, ai_model)
+
+        def extrair_arquivo(arquivo):
+            """Extrai o texto de um upload mostrando o progresso página a página."""
+            barra = st.progress(0.0, text=f"Extraindo texto de {arquivo.name}...")
+            def progredir(pagina, total):
+                barra.progress(pagina / total, text=f"Extraindo texto de {arquivo.name}: página {pagina} de {total}")
+            extracao = extrair_texto(arquivo, arquivo.type, limite_caracteres=LIMITE_CARACTERES_EXTRACAO, ao_progredir=progredir, cache=obter_cache_extracoes())
+            barra.empty()
+            if extracao.get("do_cache"): st.caption(f"Texto de {arquivo.name} reaproveitado de um envio anterior do mesmo arquivo.")
+            if extracao["truncado"]:
+                st.warning(f"{arquivo.name} excede o limite de {LIMITE_CARACTERES_EXTRACAO} caracteres; foram lidas {extracao['paginas_lidas']} de {extracao['total_paginas']} páginas.")
+            return extracao["texto"]
+
+        def responder_em_stream(chat, prompt, mensagens):
+            """Mostra a resposta do chat à medida que é gerada e a registra no histórico exibido."""
+            with st.chat_message("user"): st.markdown(prompt)
+            mensagens.append({"role": "user", "content": prompt})
+            resposta = RespostaEmStream(chat, prompt)
+            try:
+                with st.chat_message("assistant"):
+                    st.write_stream(resposta)
+                    # Citações do chat com recuperação de trechos
+                    if fontes := getattr(chat, "ultimas_fontes", None): st.caption(f"Fontes: {'; '.join(fontes)}")
+            finally:
+                # Também roda em rerun/navegação no meio da resposta: guarda o que já chegou
+                resposta.fechar()
+                if resposta.partes:
+                    conteudo = resposta.texto if resposta.concluida else f"{resposta.texto}\n\n*(resposta interrompida)*"
+                    metricas = {**resposta.metricas, "tokens_prompt": getattr(chat, "ultimo_prompt_tokens", None)}
+                    mensagens.append({"role": "assistant", "content": conteudo, "metricas": metricas, "fontes": getattr(chat, "ultimas_fontes", None)})
+
+        def acompanhar_tarefa(tarefa, exibir_progresso):
+            """Consulta a tarefa periodicamente sem bloquear a página; quando ela termina, roda o script de novo."""
+            @st.fragment(run_every=INTERVALO_CONSULTA_TAREFAS)
+            def consultar():
+                if tarefa.terminada: st.rerun(scope="app")
+                if tarefa.estado == NA_FILA:
+                    fila = sum(r["na_fila"] for r in obter_executor_tarefas().estatisticas())
+                    st.info(f"Aguardando na fila ({fila} tarefa(s) à frente ou junto com esta)...")
+                exibir_progresso(tarefa)
+            consultar()
+
+        def analisar_texto_unico_com_gemini(_texto):
+            """Retorna a Tarefa que executa a análise em segundo plano (None se o texto for curto demais).
+
+            O cache de análises é consultado só dentro da tarefa, por `analisar_com_cache`.
+            """
             if not _texto or len(_texto) < 50:
                 st.warning("O texto extraído é muito curto para uma análise significativa.")
                 return None
-            model = genai.GenerativeModel(ai_model)
-            prompt_resumo = f"Explique o conteúdo principal do seguinte texto como se eu tivesse 10 anos de idade (ELI5):\n\n{_texto}"
-            prompt_analise = f"Analise o seguinte texto e extraia em tópicos:\n- A Ideia Principal\n- Os Argumentos ou Passos Apresentados\n- A Conclusão Principal\n\nTexto:\n{_texto}"
-            prompt_perguntas = f"Baseado no texto a seguir, gere 3 perguntas inteligentes e críticas:\n\nTexto:\n{_texto}"
-            with st.spinner("Resume Ai está trabalhando na sua análise..."):
-                r1 = model.generate_content(prompt_resumo)
-                r2 = model.generate_content(prompt_analise)
-                r3 = model.generate_content(prompt_perguntas)
-            return {"resumo_simples": r1.text, "analise_estruturada": r2.text, "perguntas_criticas": r3.text}
+            cache = obter_cache_analises()
+            chave = chave_analise(_texto, ai_model, VERSAO_PROMPTS)
+            model = modelo_registrado(obter_genai().GenerativeModel(ai_model), "analise")
+            motor = st.session_state.get("motor_analise", MOTOR_ANALISE)
+            # Roda fora da thread do script: sem chamadas ao st.*, só atualizações do progresso da tarefa
+            def executar(tarefa):
+                def concluir(secao, conteudo, erro):
+                    tarefa.informar_progresso(secoes={**tarefa.progresso.get("secoes", {}), secao: (conteudo, erro)})
+                def progredir_blocos(concluidos, total): tarefa.informar_progresso(blocos=(concluidos, total))
+                return analisar_com_cache(model, _texto, cache, nome_modelo=ai_model, motor=motor, paralelo=ANALISE_PARALELA, ao_concluir=concluir,
+                                          limiar_tokens=LIMIAR_TOKENS_MAP_REDUCE, ao_progredir_blocos=progredir_blocos)
+            user_id = st.session_state.user_session['user']['id']
+            return obter_executor_tarefas().enviar(user_id, "analise", chave, executar)
+
+        def concluir_analise(tarefa):
+            """Copia o resultado da tarefa de análise para a sessão e a tira do executor."""
+            # Recolhida, a tarefa sai da tabela: abrir o documento de novo refaz as seções que falharam
+            resultado = obter_executor_tarefas().recolher(tarefa)
+            if tarefa.estado == FALHOU:
+                resultados, erros, uso = None, {secao: tarefa.erro for secao in SECOES}, {}
+            else: resultados, erros, uso = resultado
+            st.session_state.uso_analise = uso
+            if len(erros) == len(SECOES):
+                st.session_state.erro_analise = f"Erro ao comunicar com a IA: {next(iter(erros.values()))}"
+                resultados = None
+            st.session_state.analise_estatica = resultados
+
+        def baixar_artigos(urls, ao_concluir=None):
+            """Baixa os artigos ao mesmo tempo e mostra os erros de cada URL."""
+            resultados = obter_buscador_artigos().buscar(urls, ao_concluir=ao_concluir)
+            for resultado in resultados:
+                if resultado["erro"]: st.error(f"Erro ao processar o artigo {resultado['nome']}: {resultado['erro']}")
+            return resultados
 
         def pagina_analise_unica():
             st.title("Análise de Conteúdo Individual")
             st.info("Use esta seção para analisar um único documento, vídeo ou artigo da web.")
             st.header("Analisar Novo Conteúdo")
             fonte = st.radio("Selecione a fonte:", ["Documento (PDF ou TXT)", "Vídeo (YouTube)", "Artigo da Web"], key="fonte_unica", horizontal=True)
+            with st.expander("⚙️ Opções de análise"):
+                motores = list(NOMES_MOTORES)
+                st.session_state.motor_analise = st.radio("Motor de análise", motores, format_func=NOMES_MOTORES.get, index=motores.index(st.session_state.get("motor_analise", MOTOR_ANALISE)))
             texto_extraido, source_name = None, None
             if fonte == "Documento (PDF ou TXT)":
                 f = st.file_uploader("Escolha um arquivo", type=["pdf", "txt"], key="upload_unico")
                 if f:
                     source_name = f.name
-                    with st.spinner(f"Extraindo texto de {f.name}..."):
-                        if f.type == "application/pdf":
-                            texto_extraido = "".join(p.get_text() for p in fitz.open(stream=f.read(), filetype="pdf"))
-                        else:
-                            texto_extraido = f.read().decode("utf-8")
+                    texto_extraido = extrair_arquivo(f)
             elif fonte == "Vídeo (YouTube)":
-                st.error("""
-                Estamos enfrentando instabilidades para obter a transcrição diretamente do YouTube devido a questões de segurança da plataforma. Para garantir sua análise, recomendamos:
-                1. Obtenha a transcrição em um site como o [YouTube Transcript](https://youtubetotranscript.com).
-                2. Salve o texto como um arquivo PDF ou TXT.
-                3. Selecione a opção **"Documento (PDF ou TXT)"** e faça o upload do arquivo.
-                
-                Nossa IA fará a análise completa para você a partir do seu documento.
-                
-                Já estamos trabalhando em uma solução e estará disponível assim que possível. Pedimos desculpas pelo transtorno!
-                """, icon="⚠️")
+                url_video = st.text_input("Cole a URL do vídeo do YouTube:")
+                if url_video:
+                    video_id = extrair_id_video(url_video)
+                    if not video_id: st.error("URL do YouTube inválida ou formato não reconhecido.")
+                    else:
+                        source_name = url_video
+                        with st.spinner("Obtendo a transcrição do vídeo..."):
+                            try: texto_extraido = obter_servico_transcricoes().obter(video_id)
+                            except TranscricaoIndisponivel: st.error("Não foi possível obter a transcrição. Este vídeo não possui legendas em Português ou Inglês, ou elas estão desativadas.")
+                            except MuitasRequisicoes:
+                                st.error("""
+                                O YouTube bloqueou nosso acesso temporariamente. Tente novamente mais tarde ou, para garantir sua análise:
+                                1. Obtenha a transcrição em um site como o [YouTube Transcript](https://youtubetotranscript.com).
+                                2. Salve o texto como um arquivo PDF ou TXT.
+                                3. Selecione a opção **"Documento (PDF ou TXT)"** e faça o upload do arquivo.
+                                """, icon="⚠️")
+                            except Exception as e: st.error(f"Houve um erro inesperado ao buscar a transcrição: {e}")
             else:
-                url = st.text_input("Cole a URL do artigo:")
-                if url:
-                    source_name = url
-                    with st.spinner("Lendo o artigo..."):
-                        try:
-                            art = Article(url); art.download(); art.parse()
-                            texto_extraido = art.text
-                        except Exception as e: st.error(f"Erro ao processar o artigo: {e}")
+                urls = separar_urls(st.text_area("Cole a URL do artigo (ou várias, uma por linha):"))[:MAX_URLS_POR_LOTE]
+                if urls:
+                    with st.spinner(f"Lendo {len(urls)} artigo(s)..."):
+                        resultados = baixar_artigos(urls)
+                    if len(urls) == 1: texto_extraido = resultados[0]["texto"]
+                    else: texto_extraido = combinar_documentos(resultados)
+                    source_name = urls[0] if len(urls) == 1 else f"{len(urls)} artigos da web"
             if texto_extraido:
                 st.success("Conteúdo extraído! Navegando para a página de resultados...")
                 st.session_state.update({
@@ -186,41 +387,67 @@ else:
         def pagina_resultados_e_chat():
             st.title(f"Resultados: {st.session_state.source_name}")
             if st.sidebar.button("‹ Voltar para o Início"):
-                keys_to_clear = ["pagina_atual", "source_name", "source_type", "texto_analisado", "analise_estatica", "chat_doc_unico", "chat_messages_unico", "bloco_de_notas_content"]
+                keys_to_clear = ["pagina_atual", "source_name", "source_type", "texto_analisado", "analise_estatica", "erro_analise", "uso_analise", "chat_doc_unico", "chat_messages_unico", "bloco_de_notas_content"]
                 for key in keys_to_clear:
                     st.session_state.pop(key, None)
                 st.session_state.current_page = "Página Inicial"
-                st.session_state.analise_key = str(uuid.uuid4())
                 st.rerun()
 
-            if "analise_estatica" not in st.session_state:
-                st.session_state.analise_estatica = analisar_texto_unico_com_gemini(st.session_state.texto_analisado, st.session_state.analise_key)
             if "chat_doc_unico" not in st.session_state:
                 prompt_inicial_chat = f"Você é um especialista no seguinte texto:\n---\n{st.session_state.texto_analisado}\n---\nResponda perguntas baseadas exclusivamente neste conteúdo."
-                model = genai.GenerativeModel(ai_model, system_instruction=prompt_inicial_chat)
-                st.session_state.chat_doc_unico = model.start_chat(history=[])
+                # O documento é registrado na primeira pergunta e referenciado em todos os turnos e sessões
+                model = modelo_registrado(obter_cache_prefixos().modelo_para(ai_model, prompt_inicial_chat), "chat_documento")
+                st.session_state.chat_doc_unico = ChatLimitado(model)
                 st.session_state.chat_messages_unico = []
 
             tab_analise, tab_chat, tab_notas = st.tabs(["📊 Análise Inicial", "💬 Conversar com o Documento", "📝 Bloco de Notas"])
 
             with tab_analise:
+                def exibir_secoes(secoes):
+                    sub_tabs = st.tabs([TITULOS_SECOES[secao] for secao in SECOES])
+                    for secao, sub_tab in zip(SECOES, sub_tabs):
+                        with sub_tab:
+                            conteudo, erro = secoes.get(secao, (None, None))
+                            if conteudo is not None: st.markdown(conteudo)
+                            elif erro: st.error(f"Esta seção não pôde ser gerada: {erro}")
+                            elif secao not in secoes: st.caption("Gerando esta seção...")
+                            else: st.error("Esta seção não pôde ser gerada.")
+
+                def exibir_progresso_analise(tarefa):
+                    if blocos := tarefa.progresso.get("blocos"):
+                        st.progress(blocos[0] / blocos[1], text=f"Documento extenso: {blocos[0]} de {blocos[1]} partes resumidas")
+                    elif tarefa.estado != NA_FILA:
+                        st.caption(f"Resume Ai está trabalhando na sua análise... ({tarefa.duracao:.0f} s)")
+                    # Cada seção aparece na sua aba assim que a resposta chega
+                    exibir_secoes(tarefa.progresso.get("secoes", {}))
+
+                if "analise_estatica" not in st.session_state:
+                    analise = analisar_texto_unico_com_gemini(st.session_state.texto_analisado)
+                    if analise is None: st.session_state.analise_estatica = None
+                    elif analise.terminada: concluir_analise(analise)
+                    else: acompanhar_tarefa(analise, exibir_progresso_analise)
                 resultados = st.session_state.get("analise_estatica")
                 if resultados:
-                    sub_tab1, sub_tab2, sub_tab3 = st.tabs(["Resumo Simples (ELI5)", "Análise Estruturada", "Perguntas Críticas"])
-                    with sub_tab1: st.markdown(resultados["resumo_simples"])
-                    with sub_tab2: st.markdown(resultados["analise_estruturada"])
-                    with sub_tab3: st.markdown(resultados["perguntas_criticas"])
-                else: st.error("A análise não pôde ser gerada.")
+                    exibir_secoes({secao: (resultados.get(secao), None) for secao in SECOES})
+                    uso = st.session_state.get("uso_analise") or {}
+                    if uso.get("blocos_map_reduce"):
+                        st.caption(f"Documento extenso: resumido por partes antes da análise ({' → '.join(map(str, uso['blocos_map_reduce']))} partes).")
+                    if uso.get("cache"):
+                        st.caption("Análise recuperada do cache; nenhuma requisição foi enviada à IA.")
+                    elif uso.get("fallback"):
+                        st.caption(f"A resposta única veio inválida e a análise foi refeita em três requisições ({uso['fallback']}).")
+                    elif uso.get("tokens_economizados") is not None:
+                        st.caption(f"Requisição única: {uso['tokens_entrada']} tokens de entrada, cerca de {uso['tokens_economizados']} economizados.")
+                elif "analise_estatica" in st.session_state: st.error(st.session_state.get("erro_analise") or "A análise não pôde ser gerada.")
             
             with tab_chat:
                 for msg in st.session_state.chat_messages_unico:
                     with st.chat_message(msg["role"]): st.markdown(msg["content"])
                 if prompt := st.chat_input("Faça uma pergunta sobre o conteúdo..."):
-                    st.session_state.chat_messages_unico.append({"role": "user", "content": prompt})
-                    with st.spinner("Analisando sua pergunta..."):
-                        response = st.session_state.chat_doc_unico.send_message(prompt).text
-                        st.session_state.chat_messages_unico.append({"role": "assistant", "content": response})
-                    st.rerun()
+                    try:
+                        responder_em_stream(st.session_state.chat_doc_unico, prompt, st.session_state.chat_messages_unico)
+                    except Exception as e:
+                        st.error(f"Erro ao comunicar com a IA: {e}")
 
             with tab_notas:
                 st.subheader("Suas Anotações sobre este Documento")
@@ -236,17 +463,64 @@ else:
                         try:
                             user_id = st.session_state.user_session['user']['id']
                             data = {"user_id": user_id, "title": note_title, "content": note_content}
-                            supabase.table("user_notes").insert(data).execute()
+                            resposta = supabase.table("user_notes").insert(data).execute()
+                            invalidar_cache_notas()
+                            for nota in resposta.data or []: obter_indice_notas().adicionar(nota)
                             st.success(f'Nota "{note_title}" salva com sucesso! Você pode vê-la na aba "Suas Notas".')
                         except Exception as e:
                             st.error(f"Ocorreu um erro ao salvar a nota: {e}")
         
+        def enviar_ingestao(arquivos, urls):
+            """Agenda a extração dos arquivos, o download dos artigos e a indexação. Retorna a chave da tarefa."""
+            buscador = obter_buscador_artigos() if urls else None
+            cache_extracoes = obter_cache_extracoes()
+            chave = f"{chave_documentos(arquivos, EMBEDDING_TRECHOS, limite_caracteres=LIMITE_CARACTERES_EXTRACAO)}:{' '.join(urls)}"
+            def executar(tarefa):
+                def progredir(etapa):
+                    return lambda resultado, concluidos, total: tarefa.informar_progresso(etapa=etapa, concluidos=concluidos, total=total, nome=resultado["nome"])
+                resultados = extrair_documentos(arquivos, limite_caracteres=LIMITE_CARACTERES_EXTRACAO, ao_concluir=progredir("Extraindo texto"), cache=cache_extracoes)
+                artigos = buscador.buscar(urls, ao_concluir=progredir("Baixando artigos")) if urls else []
+                tarefa.informar_progresso(etapa="Indexando trechos", concluidos=0, total=1, nome="")
+                trechos = dividir_documentos(resultados + artigos)
+                chave_indice = chave_documentos(arquivos, EMBEDDING_TRECHOS, [(a["nome"], a["texto"]) for a in artigos if a["erro"] is None],
+                                                limite_caracteres=LIMITE_CARACTERES_EXTRACAO)
+                indice_vetorial, carregado = carregar_ou_construir(DIRETORIO_INDICES, chave_indice, lambda: trechos, EMBEDDING_TRECHOS, limite_bytes=LIMITE_DISCO_INDICES)
+                return {"resultados": resultados + artigos, "texto": combinar_documentos(resultados + artigos),
+                        "indice": IndiceBM25(trechos), "indice_vetorial": indice_vetorial, "carregado": carregado}
+            obter_executor_tarefas().enviar(st.session_state.user_session['user']['id'], "ingestao", chave, executar)
+            return chave
+
+        def exibir_progresso_ingestao(tarefa):
+            if etapa := tarefa.progresso.get("etapa"):
+                st.progress(tarefa.progresso["concluidos"] / tarefa.progresso["total"], text=f"{etapa}: {tarefa.progresso['concluidos']} de {tarefa.progresso['total']} {tarefa.progresso['nome']}".rstrip())
+
+        def concluir_ingestao(tarefa):
+            """Mostra os avisos de cada documento e guarda os índices da tarefa na sessão."""
+            # O texto e os índices passam a existir só na sessão; processar de novo refaz os arquivos com erro
+            ingestao = obter_executor_tarefas().recolher(tarefa)
+            if tarefa.estado == FALHOU:
+                st.error(f"Erro ao processar os arquivos: {tarefa.erro}")
+                return
+            for resultado in ingestao["resultados"]:
+                if resultado["erro"]: st.error(f"Erro ao processar {resultado['nome']}: {resultado['erro']}")
+                elif resultado["truncado"]: st.warning(f"{resultado['nome']} excede o limite de {LIMITE_CARACTERES_EXTRACAO} caracteres e foi truncado.")
+            with st.expander("Tempo de extração por arquivo"):
+                for resultado in ingestao["resultados"]:
+                    st.write(f"{'❌' if resultado['erro'] else '✅'} {resultado['nome']}: {resultado['segundos']:.2f} s" + (" (cache)" if resultado.get("do_cache") else ""))
+            st.caption(f"Processado em segundo plano em {tarefa.duracao:.1f} s (espera na fila: {tarefa.espera:.1f} s).")
+            if ingestao["carregado"]: st.caption("Índice semântico reaproveitado de um processamento anterior destes arquivos.")
+            st.session_state.update({"texto_multi_analise": ingestao["texto"], "indice_multi": ingestao["indice"], "indice_vetorial_multi": ingestao["indice_vetorial"]})
+            # Limpa o chat anterior se novos arquivos forem processados
+            st.session_state.pop("chat_multi_doc", None)
+            st.session_state.pop("chat_multi_messages", None)
+            st.success("Arquivos processados! Você já pode iniciar a conversa abaixo.")
+
         def pagina_chat_multiplos_arquivos():
             st.title("Chat Multi-Documentos")
             st.info("Use esta seção para fazer upload de vários arquivos e conversar sobre o conteúdo combinado.")
 
             if st.sidebar.button("‹ Voltar ao Menu"):
-                keys_to_clear = ["texto_multi_analise", "chat_multi_doc", "chat_multi_messages", "upload_multi"]
+                keys_to_clear = ["texto_multi_analise", "indice_multi", "indice_vetorial_multi", "chat_multi_doc", "chat_multi_messages", "upload_multi", "urls_multi", "tarefa_ingestao_multi"]
                 for key in keys_to_clear:
                     st.session_state.pop(key, None)
                 st.session_state.pagina_atual = "Principal"
@@ -259,42 +533,52 @@ else:
                 key="upload_multi"
             )
 
-            if uploaded_files:
+            urls = separar_urls(st.text_area("Ou cole URLs de artigos da web (uma por linha)", key="urls_multi"))[:MAX_URLS_POR_LOTE]
+
+            if uploaded_files or urls:
                 if st.button("Processar Arquivos e Iniciar Chat"):
-                    texto_combinado = ""
-                    with st.spinner("Extraindo texto de todos os arquivos..."):
-                        for file in uploaded_files:
-                            try:
-                                texto_combinado += f"\n\n--- INÍCIO DO DOCUMENTO: {file.name} ---\n\n"
-                                if file.type == "application/pdf":
-                                    texto_bytes = file.read()
-                                    with fitz.open(stream=BytesIO(texto_bytes), filetype="pdf") as doc:
-                                        texto_combinado += "".join(page.get_text() for page in doc)
-                                elif file.type == "text/plain":
-                                    texto_combinado += file.read().decode("utf-8")
-                                texto_combinado += f"\n\n--- FIM DO DOCUMENTO: {file.name} ---\n\n"
-                            except Exception as e:
-                                st.error(f"Erro ao processar o arquivo {file.name}: {e}")
-                    
-                    st.session_state.texto_multi_analise = texto_combinado
-                    # Limpa o chat anterior se novos arquivos forem processados
+                    st.session_state.tarefa_ingestao_multi = enviar_ingestao(uploaded_files or [], urls)
+
+            # A extração e a indexação rodam em segundo plano; a página só acompanha o progresso
+            if chave_tarefa := st.session_state.get("tarefa_ingestao_multi"):
+                tarefa = obter_executor_tarefas().obter(st.session_state.user_session['user']['id'], "ingestao", chave_tarefa)
+                if tarefa is None: st.session_state.pop("tarefa_ingestao_multi")
+                elif not tarefa.terminada: acompanhar_tarefa(tarefa, exibir_progresso_ingestao)
+                else:
+                    st.session_state.pop("tarefa_ingestao_multi")
+                    concluir_ingestao(tarefa)
+
+            if "texto_multi_analise" in st.session_state:
+                def reiniciar_chat_multi():
                     st.session_state.pop("chat_multi_doc", None)
                     st.session_state.pop("chat_multi_messages", None)
-                    st.success("Arquivos processados! Você já pode iniciar a conversa abaixo.")
-            
-            if "texto_multi_analise" in st.session_state:
+                modos = list(NOMES_MODOS_CHAT_MULTI)
+                modo = st.radio("Contexto enviado à IA", modos, format_func=NOMES_MODOS_CHAT_MULTI.get, index=modos.index(MODO_CHAT_MULTI), key="modo_chat_multi", horizontal=True, on_change=reiniciar_chat_multi)
+
+                if "chat_multi_doc" not in st.session_state and modo != MODO_CONTEXTO_COMPLETO:
+                    indices = {MODO_RECUPERACAO: st.session_state.indice_multi, MODO_VETORIAL: st.session_state.indice_vetorial_multi,
+                               MODO_HIBRIDO: BuscaHibrida(st.session_state.indice_multi, st.session_state.indice_vetorial_multi)}
+                    instrucao_sistema = "Você é um assistente de IA especialista em analisar e responder perguntas sobre os documentos fornecidos pelo usuário. Responda de forma concisa, baseie-se exclusivamente nos trechos enviados e cite as fontes."
+                    model = modelo_registrado(obter_genai().GenerativeModel(ai_model, system_instruction=instrucao_sistema), "chat_multi_documentos")
+                    st.session_state.chat_multi_doc = ChatComRecuperacao(model, indices[modo], k=TOP_K_TRECHOS)
+                    # A primeira mensagem é omitida na exibição, como no modo de contexto completo
+                    st.session_state.chat_multi_messages = [
+                        {"role": "user", "content": f"{len(st.session_state.indice_multi.trechos)} trechos indexados."},
+                        {"role": "assistant", "content": "Os documentos foram indexados. A cada pergunta vou consultar os trechos mais relevantes e citar as fontes. Pode começar."}
+                    ]
+
                 # --- INÍCIO DA ALTERAÇÃO PRINCIPAL ---
                 if "chat_multi_doc" not in st.session_state:
                     # 1. A instrução do sistema agora é simples e focada no comportamento.
                     instrucao_sistema = "Você é um assistente de IA especialista em analisar e responder perguntas sobre os documentos fornecidos pelo usuário. Responda de forma concisa e baseie-se exclusivamente no texto."
-                    model = genai.GenerativeModel(ai_model, system_instruction=instrucao_sistema)
+                    model = modelo_registrado(obter_genai().GenerativeModel(ai_model, system_instruction=instrucao_sistema), "chat_multi_documentos")
                     
                     # 2. O conteúdo dos documentos é a primeira mensagem da conversa.
                     prompt_inicial = f"Por favor, analise o conteúdo combinado dos seguintes documentos para responder às minhas perguntas:\n\n{st.session_state.texto_multi_analise}"
                     
                     # 3. Iniciamos o chat já com o histórico contendo os documentos.
-                    st.session_state.chat_multi_doc = model.start_chat(history=[
-
+                    # O contexto fixo nunca é resumido; só as trocas antigas são compactadas.
+                    st.session_state.chat_multi_doc = ChatLimitado(model, contexto=[
                         {'role': 'user', 'parts': [prompt_inicial]},
                         {'role': 'model', 'parts': ["Entendido. Os documentos foram processados e estou pronto para responder às suas perguntas com base neles. Pode começar."]}
                     ])
@@ -310,18 +594,54 @@ else:
                 for msg in st.session_state.get("chat_multi_messages", [])[1:]:
                     with st.chat_message(msg["role"]):
                         st.markdown(msg["content"])
+                        if msg.get("fontes"): st.caption(f"Fontes: {'; '.join(msg['fontes'])}")
                 
                 if prompt := st.chat_input("Faça uma pergunta sobre o conteúdo combinado..."):
-                    st.session_state.chat_multi_messages.append({"role": "user", "content": prompt})
-                    with st.spinner("Analisando sua pergunta..."):
-                        try:
-                            response = st.session_state.chat_multi_doc.send_message(prompt).text
-                            st.session_state.chat_multi_messages.append({"role": "assistant", "content": response})
-                        except Exception as e:
-                            st.error(f"Erro ao comunicar com a IA: {e}")
-                    st.rerun()
+                    try:
+                        responder_em_stream(st.session_state.chat_multi_doc, prompt, st.session_state.chat_multi_messages)
+                    except Exception as e:
+                        st.error(f"Erro ao comunicar com a IA: {e}")
             
         
+        def obter_cache_notas():
+            user_id = st.session_state.user_session['user']['id']
+            cache = st.session_state.get("cache_notas")
+            if cache is None or cache.user_id != user_id:
+                cache = st.session_state.cache_notas = CacheNotas(supabase, user_id)
+            return cache
+
+        def invalidar_cache_notas():
+            """Chamado após qualquer escrita em user_notes."""
+            st.session_state.pop("cache_notas", None)
+
+        def obter_indice_notas():
+            """Índice de busca das notas; ao contrário das páginas em cache, é atualizado a cada escrita."""
+            user_id = st.session_state.user_session['user']['id']
+            if st.session_state.get("indice_notas_usuario") != user_id:
+                st.session_state.indice_notas, st.session_state.indice_notas_usuario = IndiceNotas(), user_id
+            return st.session_state.indice_notas
+
+        def exibir_nota(note, cache):
+            chave_expander = f"nota_aberta_{note['id']}"
+            with st.expander(f"**{note['title']}** - *Salvo em: {datetime.fromisoformat(note['created_at']).strftime('%d/%m/%Y %H:%M')}*", key=chave_expander, on_change="rerun"):
+                # O conteúdo só é buscado quando a nota é aberta
+                if not st.session_state.get(chave_expander): return
+                content = cache.conteudo(note['id'])
+                st.markdown(content)
+                col1, col2 = st.columns([1, 0.2])
+                with col1:
+                    st.download_button(label="Baixar .txt", data=content, file_name=f"{note['title']}.txt", mime="text/plain", key=f"download_{note['id']}")
+                with col2:
+                    if st.button("Excluir", key=f"delete_{note['id']}", type="primary"):
+                        try:
+                            supabase.table("user_notes").delete().eq("id", note['id']).execute()
+                            invalidar_cache_notas()
+                            obter_indice_notas().remover(note['id'])
+                            st.session_state.mensagem_notas = f'Nota "{note["title"]}" excluída.'
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Erro ao excluir a nota: {e}")
+
         # --- FUNÇÃO MODIFICADA ---
         def pagina_suas_notas():
             st.title("Suas Notas")
@@ -340,7 +660,9 @@ else:
                             try:
                                 user_id = st.session_state.user_session['user']['id']
                                 data = {"user_id": user_id, "title": new_title, "content": new_content}
-                                supabase.table("user_notes").insert(data).execute()
+                                resposta = supabase.table("user_notes").insert(data).execute()
+                                invalidar_cache_notas()
+                                for nota in resposta.data or []: obter_indice_notas().adicionar(nota)
                                 st.success(f'Nota "{new_title}" salva com sucesso!')
                                 time.sleep(1) # Delay para o usuário ler a mensagem de sucesso
                                 st.rerun()
@@ -350,37 +672,117 @@ else:
             st.markdown("---")
             st.subheader("Notas Salvas")
             
-            # Lógica para exibir as notas existentes
+            # Mensagem da última operação, exibida depois do rerun
+            if mensagem := st.session_state.pop("mensagem_notas", None): st.success(mensagem)
+
+            busca = st.text_input("🔎 Buscar nas notas", placeholder="Digite palavras do título ou do conteúdo")
+            # Lógica para exibir as notas existentes: só títulos e datas, página a página
             try:
+                cache = obter_cache_notas()
                 user_id = st.session_state.user_session['user']['id']
-                response = supabase.table("user_notes").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-                notes = response.data
+                with st.expander("☑️ Ações em lote"):
+                    carregadas = {note['id']: note for note in cache.notas()}
+                    selecionadas = st.multiselect(
+                        "Notas selecionadas", list(carregadas), key="notas_selecionadas",
+                        format_func=lambda note_id: f"{carregadas[note_id]['title']} ({datetime.fromisoformat(carregadas[note_id]['created_at']).strftime('%d/%m/%Y')})"
+                    )
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        if st.button(f"Excluir selecionadas ({len(selecionadas)})", type="primary", disabled=not selecionadas):
+                            try:
+                                removidas = excluir_notas(supabase, user_id, selecionadas)
+                                invalidar_cache_notas()
+                                for note_id in selecionadas: obter_indice_notas().remover(note_id)
+                                st.session_state.pop("notas_selecionadas", None)
+                                st.session_state.mensagem_notas = f"{removidas} nota(s) excluída(s)."
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Erro ao excluir as notas: {e}")
+                    # O ZIP só é montado quando o botão é clicado, lote a lote. A função roda
+                    # fora da execução do script, então a quantidade exportada fica num
+                    # dicionário da sessão e aparece na execução seguinte.
+                    exportacao = st.session_state.setdefault("exportacao_notas", {})
+                    def exportar(ids=None):
+                        dados, exportacao["quantidade"] = exportar_notas_zip(supabase, user_id, ids)
+                        return dados
+                    with col2:
+                        st.download_button(f"Exportar selecionadas ({len(selecionadas)})", data=lambda ids=list(selecionadas): exportar(ids),
+                                           file_name="notas_selecionadas.zip", mime="application/zip", disabled=not selecionadas)
+                    with col3:
+                        st.download_button("Exportar todas (.zip)", data=exportar, file_name="todas_as_notas.zip", mime="application/zip")
+                    if "quantidade" in exportacao: st.caption(f"Última exportação: {exportacao['quantidade']} nota(s) no ZIP.")
+
+                if busca.strip():
+                    inicio = time.perf_counter()
+                    resultados = buscar_notas(supabase, user_id, busca, obter_indice_notas())
+                    st.caption(f"{len(resultados)} nota(s) encontrada(s) em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+                    for note in resultados:
+                        exibir_nota(note, cache)
+                    return
+                notes = cache.notas()
                 if not notes:
                     st.info("Você ainda não tem nenhuma nota salva. Crie uma acima!")
                 
                 for note in notes:
-                    with st.expander(f"**{note['title']}** - *Salvo em: {datetime.fromisoformat(note['created_at']).strftime('%d/%m/%Y %H:%M')}*"):
-                        st.markdown(note['content'])
-                        col1, col2 = st.columns([1, 0.2])
-                        with col1:
-                            st.download_button(label="Baixar .txt", data=note['content'], file_name=f"{note['title']}.txt", mime="text/plain", key=f"download_{note['id']}")
-                        with col2:
-                            if st.button("Excluir", key=f"delete_{note['id']}", type="primary"):
-                                try:
-                                    supabase.table("user_notes").delete().eq("id", note['id']).execute()
-                                    st.success(f'Nota "{note["title"]}" excluída.')
-                                    time.sleep(1)
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Erro ao excluir a nota: {e}")
+                    exibir_nota(note, cache)
+
+                if notes and cache.tem_mais and st.button("Carregar mais notas"):
+                    cache.carregar_mais()
+                    st.rerun()
             except Exception as e:
                 st.error(f"Não foi possível carregar suas notas: {e}")
         
+        def exibir_tarefas_em_segundo_plano():
+            st.subheader("Tarefas em segundo plano")
+            resumo = obter_executor_tarefas().estatisticas()
+            col1, col2 = st.columns(2)
+            col1.metric("Na fila", sum(r["na_fila"] for r in resumo))
+            col2.metric("Executando", sum(r["executando"] for r in resumo))
+            formatar = lambda segundos: None if segundos is None else round(segundos, 2)
+            if resumo: st.dataframe(
+                [{"Tipo": r["tipo"], "Na fila": r["na_fila"], "Executando": r["executando"], "Concluídas": r["concluidas"], "Falhas": r["falhas"],
+                  "Espera p50 (s)": formatar(r["espera_p50"]), "Duração p50 (s)": formatar(r["duracao_p50"]), "Duração p95 (s)": formatar(r["duracao_p95"])} for r in resumo],
+                use_container_width=True, hide_index=True
+            )
+
+        def exibir_portao_gemini():
+            st.subheader("Chamadas ao Gemini agora")
+            portao = obter_portao_gemini().estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Limite de concorrência", portao["limite"], help="Ajustado automaticamente: cresce aos poucos e cai pela metade quando a API limita a taxa.")
+            col2.metric("Em andamento / na fila", f"{portao['em_uso']} / {portao['na_fila']}")
+            col3.metric("Retentativas / limitações", f"{portao['retentativas']} / {portao['limitacoes']}")
+            col4.metric("Espera na fila p50 / p95", "-" if portao["espera_p50"] is None else f"{portao['espera_p50']:.2f} / {portao['espera_p95']:.2f} s")
+
+        def pagina_painel_uso():
+            st.title("Painel de Uso da IA")
+            exibir_portao_gemini()
+            exibir_tarefas_em_segundo_plano()
+            periodos = {"Últimas 24 horas": 1, "Últimos 7 dias": 7, "Últimos 30 dias": 30}
+            periodo = st.radio("Período", list(periodos), horizontal=True)
+            resumo = obter_registro_uso().resumo_por_tipo(desde=time.time() - periodos[periodo] * 86400)
+            if not resumo:
+                st.info("Nenhuma chamada registrada no período.")
+                return
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Chamadas", sum(r["chamadas"] for r in resumo))
+            col2.metric("Tokens de entrada", sum(r["tokens_entrada"] for r in resumo))
+            col3.metric("Tokens de saída", sum(r["tokens_saida"] for r in resumo))
+            st.dataframe(
+                [{"Funcionalidade": r["tipo"], "Chamadas": r["chamadas"], "Falhas": r["falhas"],
+                  "Latência p50 (s)": round(r["latencia_p50"], 2), "Latência p95 (s)": round(r["latencia_p95"], 2),
+                  "Tokens de entrada": r["tokens_entrada"], "Tokens de saída": r["tokens_saida"]} for r in resumo],
+                use_container_width=True, hide_index=True
+            )
+
         PAGES = {
             "Analisar Conteúdo": { "func": pagina_analise_unica, "icon": "📄", "desc": "Extraia insights de um único documento, vídeo ou artigo."},
             "Chat Multi-Documentos": { "func": pagina_chat_multiplos_arquivos, "icon": "📚", "desc": "Converse com vários arquivos ao mesmo tempo."},
             "Suas Notas": { "func": pagina_suas_notas, "icon": "📝", "desc": "Visualize, baixe e gerencie suas anotações salvas."}
         }
+        # O painel de uso só aparece para os e-mails listados em ADMIN_EMAILS nos secrets
+        if st.session_state.user_session['user'].get('email') in st.secrets.get("ADMIN_EMAILS", []):
+            PAGES["Painel de Uso"] = { "func": pagina_painel_uso, "icon": "📈", "desc": "Latência e tokens gastos por funcionalidade."}
         
         # --- LÓGICA DE NAVEGAÇÃO E ROTEAMENTO ---
 
@@ -391,10 +793,7 @@ else:
 
         with st.sidebar:
             st.write(f'Bem-vindo(a), *{user_profile.get("full_name", "Usuário")}*')
-            if st.button("Logout"):
-                supabase.auth.sign_out()
-                for key in list(st.session_state.keys()): del st.session_state[key]
-                st.rerun()
+            if st.button("Logout"): fazer_logout()
             st.markdown("---")
             
             st.session_state.current_page = st.radio(
@@ -415,7 +814,4 @@ else:
         with st.sidebar:
             st.write(f'Olá, *{user_profile.get("full_name", "Usuário")}*')
             st.write("Status: 🔴 Assinatura Expirada")
-            if st.button("Logout"):
-                supabase.auth.sign_out()
-                for key in list(st.session_state.keys()): del st.session_state[key]
-                st.rerun()
+            if st.button("Logout"): fazer_logout()
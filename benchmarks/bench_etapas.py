@@ -0,0 +1,173 @@
+"""Mede cada etapa do Resume Ai com o Gemini e o Supabase substituídos por falsos locais.
+
+Uso: python benchmarks/bench_etapas.py [--repeticoes N] [--etapas FILTRO] [--saida relatorio.json]
+                                       [--base benchmarks/base_etapas.json] [--tolerancia 0.25]
+
+Gera um relatório JSON com a mediana e o mínimo de cada etapa. Com `--base`, compara
+as medianas com um relatório salvo e termina com código 1 se alguma etapa ficar mais
+lenta que a base além da tolerância. Para atualizar a base: `--saida benchmarks/base_etapas.json`.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bench_extracao import gerar_pdf
+from falsos import ModeloGeminiFalso, SupabaseFalso
+from core.analise import MOTOR_CHAMADA_UNICA, MOTOR_TRES_CHAMADAS, analisar
+from core.chat import ChatLimitado, RespostaEmStream
+from core.extracao import extrair_documentos, extrair_texto
+from core.notas import CacheNotas, IndiceNotas, buscar_notas
+from core.recuperacao import BuscaHibrida, ChatComRecuperacao, IndiceBM25, dividir_documentos
+from core.vetores import EmbeddingHash, IndiceVetorial
+
+VERSAO_RELATORIO = 1
+LATENCIA_GEMINI = 0.05  # segundos por chamada no modelo falso
+LATENCIA_SUPABASE = 0.005  # segundos por requisição no cliente falso
+PARAGRAFO = "Resume Ai analisa documentos longos e extrai os pontos principais de cada seção. " * 8
+
+
+class Arquivo(io.BytesIO):
+    """Imita o UploadedFile do Streamlit: bytes com `name` e `type`."""
+    def __init__(self, nome, tipo, dados):
+        super().__init__(dados)
+        self.name, self.type = nome, tipo
+
+
+def etapas():
+    """{nome: (preparar() -> contexto, executar(contexto) -> métricas extras ou None)}."""
+    pdfs = {}
+    def pdf(paginas):
+        if paginas not in pdfs: pdfs[paginas] = gerar_pdf(paginas)
+        return pdfs[paginas]
+
+    def extracao(paginas):
+        return lambda: pdf(paginas), lambda dados: {"caracteres": len(extrair_texto(dados, paralelo=False)["texto"])}
+
+    def ingestao():
+        arquivos = [Arquivo(f"doc{i}.pdf", "application/pdf", pdf(100)) for i in range(4)] + [Arquivo("notas.txt", "text/plain", (PARAGRAFO * 200).encode())]
+        def executar(arquivos):
+            resultados = extrair_documentos(arquivos)
+            trechos = dividir_documentos(resultados)
+            IndiceBM25(trechos)
+            IndiceVetorial.construir(trechos, EmbeddingHash())
+            return {"trechos": len(trechos)}
+        return lambda: arquivos, executar
+
+    def analise(motor, tamanho_texto, limiar_tokens=None):
+        def executar(modelo):
+            _, erros, uso = analisar(modelo, PARAGRAFO * tamanho_texto, motor=motor, limiar_tokens=limiar_tokens)
+            assert not erros, erros
+            return {"chamadas_modelo": modelo.chamadas, "tokens_entrada": modelo.tokens_entrada, "blocos_map_reduce": uso["blocos_map_reduce"]}
+        return lambda: ModeloGeminiFalso(LATENCIA_GEMINI), executar
+
+    def chat(recuperacao):
+        def preparar():
+            modelo = ModeloGeminiFalso(LATENCIA_GEMINI)
+            if not recuperacao: return ChatLimitado(modelo, contexto=[{"role": "user", "parts": [PARAGRAFO * 100]}, {"role": "model", "parts": ["ok"]}]), modelo
+            trechos = dividir_documentos([{"nome": "doc.txt", "texto": PARAGRAFO * 400, "erro": None, "inicios_paginas": [0]}])
+            indice = BuscaHibrida(IndiceBM25(trechos), IndiceVetorial.construir(trechos, EmbeddingHash()))
+            return ChatComRecuperacao(modelo, indice, k=6), modelo
+        def executar(contexto):
+            chat, modelo = contexto
+            for i in range(5):
+                resposta = RespostaEmStream(chat, f"Pergunta {i} sobre os pontos principais do documento?")
+                for _ in resposta: pass
+                resposta.fechar()
+            chat.historico.aguardar_compactacao(timeout=30)
+            return {"chamadas_modelo": modelo.chamadas, "tokens_entrada": modelo.tokens_entrada}
+        return preparar, executar
+
+    def notas(quantidade):
+        def preparar():
+            cliente = SupabaseFalso(latencia=0)
+            cliente.table("user_notes").insert([{"user_id": "u1", "title": f"Nota {i}", "content": f"{PARAGRAFO} item {i}"} for i in range(quantidade)]).execute()
+            cliente.table("user_notes").latencia = LATENCIA_SUPABASE
+            return cliente
+        def executar(cliente):
+            inicio = cliente.requisicoes
+            cache = CacheNotas(cliente, "u1")
+            cache.notas()
+            while cache.tem_mais: cache.carregar_mais()
+            cache.conteudo(cache.notas()[0]["id"])
+            indice = IndiceNotas()
+            buscar_notas(cliente, "u1", "item 42", indice)  # Primeira busca: indexa tudo
+            buscar_notas(cliente, "u1", "pontos principais", indice)
+            return {"notas": len(cache.notas()), "requisicoes_supabase": cliente.requisicoes - inicio}
+        return preparar, executar
+
+    return {
+        "extracao_pdf_50_paginas": extracao(50),
+        "extracao_pdf_200_paginas": extracao(200),
+        "extracao_pdf_500_paginas": extracao(500),
+        "ingestao_multi_5_arquivos": ingestao(),
+        "analise_chamada_unica": analise(MOTOR_CHAMADA_UNICA, 50),
+        "analise_tres_chamadas": analise(MOTOR_TRES_CHAMADAS, 50),
+        "analise_map_reduce": analise(MOTOR_CHAMADA_UNICA, 2000, limiar_tokens=20_000),
+        "chat_5_turnos_contexto_completo": chat(False),
+        "chat_5_turnos_recuperacao": chat(True),
+        "notas_listagem_e_busca_1000": notas(1000),
+    }
+
+
+def medir(preparar, executar, repeticoes):
+    tempos, extras = [], None
+    for _ in range(repeticoes):
+        contexto = preparar()
+        inicio = time.perf_counter()
+        extras = executar(contexto)
+        tempos.append(time.perf_counter() - inicio)
+    return {"mediana_s": round(statistics.median(tempos), 4), "minimo_s": round(min(tempos), 4), "repeticoes": repeticoes, **(extras or {})}
+
+
+def comparar(relatorio, base, tolerancia):
+    """Linhas (etapa, base, atual, variação) e a lista de etapas que regrediram além da tolerância."""
+    linhas, regressoes = [], []
+    for nome, atual in relatorio["etapas"].items():
+        anterior = base.get("etapas", {}).get(nome)
+        if anterior is None:
+            linhas.append((nome, None, atual["mediana_s"], None))
+            continue
+        variacao = atual["mediana_s"] / anterior["mediana_s"] - 1 if anterior["mediana_s"] else 0.0
+        linhas.append((nome, anterior["mediana_s"], atual["mediana_s"], variacao))
+        if variacao > tolerancia: regressoes.append(nome)
+    return linhas, regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--etapas", default="", help="mede só as etapas cujo nome contém este texto")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--base", help="relatório salvo para comparação")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento relativo da mediana aceito (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    relatorio = {"versao": VERSAO_RELATORIO, "gerado_em": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "plataforma": platform.platform(), "cpus": os.cpu_count(), "latencia_gemini_s": LATENCIA_GEMINI,
+                 "latencia_supabase_s": LATENCIA_SUPABASE, "etapas": {}}
+    for nome, (preparar, executar) in etapas().items():
+        if args.etapas not in nome: continue
+        relatorio["etapas"][nome] = medir(preparar, executar, args.repeticoes)
+        print(f"{nome:<36} {relatorio['etapas'][nome]['mediana_s']:>9.4f} s", flush=True)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f: json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    if not args.base: return
+    with open(args.base, encoding="utf-8") as f: base = json.load(f)
+    linhas, regressoes = comparar(relatorio, base, args.tolerancia)
+    print(f"\n{'etapa':<36} {'base (s)':>9} {'atual (s)':>10} {'variação':>9}")
+    for nome, anterior, atual, variacao in linhas:
+        print(f"{nome:<36} {'-' if anterior is None else f'{anterior:.4f}':>9} {atual:>10.4f} {'-' if variacao is None else f'{variacao:+.0%}':>9}")
+    if regressoes:
+        print(f"\nRegressão acima de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Mede o tempo de importação do app.py com `python -X importtime` e compara com um orçamento.
+
+Uso: python benchmarks/bench_importacao.py [--repeticoes N] [--orcamento MS] [--top N]
+
+Termina com código 1 se a mediana passar do orçamento ou se alguma dependência
+que deveria ser carregada sob demanda aparecer na inicialização.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+ORCAMENTO_MS = 1500  # Mediana do tempo acumulado de `import app`, sem contar o interpretador
+SOB_DEMANDA = ("fitz", "newspaper", "google.generativeai", "youtube_transcript_api", "requests", "numpy")
+LINHA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def medir():
+    """Executa `import app` num processo novo. Retorna {modulo: (proprio_us, acumulado_us, nivel)}."""
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=RAIZ, capture_output=True, text=True, check=True)
+    modulos = {}
+    for linha in saida.stderr.splitlines():
+        if encontrado := LINHA.match(linha):
+            proprio, acumulado, recuo, nome = encontrado.groups()
+            modulos[nome] = (int(proprio), int(acumulado), len(recuo) // 2)
+    return modulos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--orcamento", type=float, default=ORCAMENTO_MS, help="em milissegundos")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    medicoes = [medir() for _ in range(args.repeticoes)]
+    total_ms = statistics.median(m["app"][1] for m in medicoes) / 1000
+    # Pacotes importados diretamente pelo app (nível 1 da árvore), pela mediana do tempo acumulado
+    diretos = {nome for nome, (_, _, nivel) in medicoes[0].items() if nivel == 1}
+    custos = sorted(((statistics.median(m[nome][1] for m in medicoes if nome in m) / 1000, nome) for nome in diretos), reverse=True)
+    print(f"{'módulo':<40} {'acumulado (ms)':>15}")
+    for custo, nome in custos[:args.top]:
+        print(f"{nome:<40} {custo:>15.1f}")
+    print(f"{'app (total)':<40} {total_ms:>15.1f}   orçamento: {args.orcamento:.0f} ms")
+    carregados = [nome for nome in SOB_DEMANDA if nome in medicoes[0]]
+    if carregados: print(f"ERRO: carregados na inicialização: {', '.join(carregados)}")
+    if total_ms > args.orcamento: print("ERRO: tempo de importação acima do orçamento")
+    sys.exit(1 if carregados or total_ms > args.orcamento else 0)
+
+
+if __name__ == "__main__":
+    main()
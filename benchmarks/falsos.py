@@ -0,0 +1,149 @@
+"""Substitutos locais e determinísticos do Gemini e do Supabase para os benchmarks.
+
+Não fazem rede: a latência do Gemini é simulada com `time.sleep` a partir de
+parâmetros fixos, e o Supabase é uma tabela em memória com o subconjunto do
+postgrest usado pelo app (select, insert, delete, eq, in_, or_, order, limit, single).
+"""
+import json
+import re
+import threading
+import time
+
+from core.analise import ESQUEMA_CHAMADA_UNICA, SECOES
+from core.uso import estimar_tokens_entrada
+
+
+class _Uso:
+    def __init__(self, entrada, saida):
+        self.prompt_token_count, self.candidates_token_count, self.total_token_count = entrada, saida, entrada + saida
+
+
+class _Resposta:
+    def __init__(self, text, uso=None):
+        self.text, self.usage_metadata = text, uso
+
+
+class ModeloGeminiFalso:
+    """Imita o `genai.GenerativeModel`: `generate_content` com ou sem stream e com `usage_metadata`.
+
+    A latência de cada chamada é `latencia + tokens_saida * segundos_por_token_saida`;
+    no stream ela é dividida igualmente entre os `trechos_stream` trechos. Com
+    `response_schema` na `generation_config`, responde o JSON das três seções.
+    """
+
+    def __init__(self, latencia=0.05, tokens_saida=200, segundos_por_token_saida=0.0, trechos_stream=8):
+        self.latencia, self.tokens_saida, self.segundos_por_token_saida, self.trechos_stream = latencia, tokens_saida, segundos_por_token_saida, trechos_stream
+        self.chamadas = self.tokens_entrada = 0
+        self._lock = threading.Lock()
+
+    def _texto(self, generation_config):
+        if generation_config and generation_config.get("response_schema") == ESQUEMA_CHAMADA_UNICA:
+            return json.dumps({secao: f"conteúdo de {secao} " * (self.tokens_saida // (3 * len(SECOES)) + 1) for secao in SECOES})
+        return "palavra " * self.tokens_saida
+
+    def generate_content(self, conteudo, generation_config=None, stream=False, **kwargs):
+        entrada = estimar_tokens_entrada(conteudo)
+        with self._lock: self.chamadas, self.tokens_entrada = self.chamadas + 1, self.tokens_entrada + entrada
+        texto, duracao = self._texto(generation_config), self.latencia + self.tokens_saida * self.segundos_por_token_saida
+        if not stream:
+            time.sleep(duracao)
+            return _Resposta(texto, _Uso(entrada, self.tokens_saida))
+        return self._stream(texto, entrada, duracao)
+
+    def _stream(self, texto, entrada, duracao):
+        tamanho = -(-len(texto) // self.trechos_stream)
+        partes = [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+        for i, parte in enumerate(partes):
+            time.sleep(duracao / len(partes))
+            # Como na API, os contadores chegam acumulados e completos no último trecho
+            yield _Resposta(parte, _Uso(entrada, self.tokens_saida) if i == len(partes) - 1 else None)
+
+
+class _RespostaTabela:
+    def __init__(self, data):
+        self.data = data
+
+
+class ConsultaFalsa:
+    def __init__(self, tabela, operacao, colunas=None, linhas=None):
+        self.tabela, self.operacao, self.colunas, self.linhas = tabela, operacao, colunas, linhas
+        self.filtros, self.ordem, self.limite, self.unica = [], [], None, False
+
+    def eq(self, coluna, valor):
+        self.filtros.append(lambda n: n[coluna] == valor)
+        return self
+
+    def in_(self, coluna, valores):
+        valores = set(valores)
+        self.filtros.append(lambda n: n[coluna] in valores)
+        return self
+
+    def or_(self, expressao):
+        # Só o filtro de paginação por conjunto de chaves de listar_pagina_notas
+        criado_em, note_id = re.search(r'created_at\.lt\."([^"]+)".*id\.lt\."([^"]+)"', expressao).groups()
+        self.filtros.append(lambda n: n["created_at"] < criado_em or (n["created_at"] == criado_em and str(n["id"]) < note_id))
+        return self
+
+    def order(self, coluna, desc=False):
+        self.ordem.append((coluna, desc))
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def single(self):
+        self.unica = True
+        return self
+
+    def execute(self):
+        tabela = self.tabela
+        time.sleep(tabela.latencia)
+        with tabela.lock:
+            tabela.requisicoes += 1
+            if self.operacao == "insert":
+                novas = []
+                for linha in self.linhas:
+                    tabela.sequencia += 1
+                    novas.append({"id": f"{tabela.sequencia:08d}", "created_at": f"2025-01-01T00:00:00.{tabela.sequencia:06d}+00:00", **linha})
+                tabela.linhas.extend(novas)
+                return _RespostaTabela(novas)
+            linhas = [n for n in tabela.linhas if all(f(n) for f in self.filtros)]
+            if self.operacao == "delete":
+                removidas = {id(n) for n in linhas}
+                tabela.linhas = [n for n in tabela.linhas if id(n) not in removidas]
+                return _RespostaTabela(linhas)
+        for coluna, desc in reversed(self.ordem):
+            linhas = sorted(linhas, key=lambda n: n[coluna], reverse=desc)
+        colunas = [c.strip() for c in self.colunas.split(",")]
+        dados = [{c: n[c] for c in colunas} for n in linhas[:self.limite]]
+        return _RespostaTabela(dados[0] if self.unica and dados else dados)
+
+
+class TabelaFalsa:
+    def __init__(self, latencia):
+        self.linhas, self.latencia, self.requisicoes, self.sequencia = [], latencia, 0, 0
+        self.lock = threading.Lock()
+
+    def select(self, colunas):
+        return ConsultaFalsa(self, "select", colunas)
+
+    def insert(self, dados):
+        return ConsultaFalsa(self, "insert", linhas=dados if isinstance(dados, list) else [dados])
+
+    def delete(self):
+        return ConsultaFalsa(self, "delete")
+
+
+class SupabaseFalso:
+    """Cliente com `table(nome)`; cada `execute()` custa `latencia` segundos, como uma ida ao servidor."""
+
+    def __init__(self, latencia=0.005):
+        self.latencia, self.tabelas = latencia, {}
+
+    def table(self, nome):
+        return self.tabelas.setdefault(nome, TabelaFalsa(self.latencia))
+
+    @property
+    def requisicoes(self):
+        return sum(t.requisicoes for t in self.tabelas.values())
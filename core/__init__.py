@@ -0,0 +1 @@
+"""Lógica do Resume Ai independente da interface Streamlit."""
@@ -0,0 +1,187 @@
+"""Orquestração das análises geradas pelo Gemini para um único texto."""
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.extracao import CARACTERES_POR_TOKEN
+from core.recuperacao import dividir_em_trechos
+
+# --- MOTORES DE ANÁLISE ---
+MOTOR_TRES_CHAMADAS = "tres_chamadas"  # Um prompt por seção
+MOTOR_CHAMADA_UNICA = "chamada_unica"  # Uma resposta JSON com as três seções
+MOTORES = (MOTOR_TRES_CHAMADAS, MOTOR_CHAMADA_UNICA)
+
+# --- PROMPTS DA ANÁLISE TRIPLA ---
+PROMPTS = {
+    "resumo_simples": "Explique o conteúdo principal do seguinte texto como se eu tivesse 10 anos de idade (ELI5):\n\n{texto}",
+    "analise_estruturada": "Analise o seguinte texto e extraia em tópicos:\n- A Ideia Principal\n- Os Argumentos ou Passos Apresentados\n- A Conclusão Principal\n\nTexto:\n{texto}",
+    "perguntas_criticas": "Baseado no texto a seguir, gere 3 perguntas inteligentes e críticas:\n\nTexto:\n{texto}",
+}
+SECOES = tuple(PROMPTS)
+
+PROMPT_CHAMADA_UNICA = (
+    "Analise o texto a seguir e responda em JSON com três campos, cada um escrito em Markdown:\n"
+    "- resumo_simples: explique o conteúdo principal como se eu tivesse 10 anos de idade (ELI5);\n"
+    "- analise_estruturada: extraia em tópicos a Ideia Principal, os Argumentos ou Passos Apresentados e a Conclusão Principal;\n"
+    "- perguntas_criticas: gere 3 perguntas inteligentes e críticas.\n\n"
+    "Texto:\n{texto}"
+)
+PROMPT_RESUMO_PARCIAL = (
+    "O texto a seguir é a parte {parte} de {total} de um documento longo. Resuma-o de forma detalhada, "
+    "preservando a ideia principal, os argumentos ou passos apresentados, dados relevantes e conclusões.\n\n"
+    "Parte:\n{texto}"
+)
+# Muda sempre que algum prompt muda, invalidando as análises guardadas em cache
+VERSAO_PROMPTS = hashlib.sha256("\0".join([*PROMPTS.values(), PROMPT_CHAMADA_UNICA, PROMPT_RESUMO_PARCIAL]).encode("utf-8")).hexdigest()[:12]
+
+# --- TEXTOS MAIORES QUE O CONTEXTO DO MODELO ---
+LIMIAR_TOKENS_MAP_REDUCE = 400_000  # Acima disso o texto é resumido por partes antes da análise
+TOKENS_POR_BLOCO = 100_000
+MAX_BLOCOS_SIMULTANEOS = 4
+
+ESQUEMA_CHAMADA_UNICA = {
+    "type": "object",
+    "properties": {secao: {"type": "string"} for secao in SECOES},
+    "required": list(SECOES),
+}
+
+
+def montar_prompts(texto):
+    """Retorna o prompt de cada seção já preenchido com o texto."""
+    return {secao: modelo.format(texto=texto) for secao, modelo in PROMPTS.items()}
+
+
+def analisar_secoes(model, texto, paralelo=True, ao_concluir=None):
+    """Gera as três seções da análise, em paralelo ou uma após a outra.
+
+    `ao_concluir(secao, conteudo, erro)` é chamado na thread de quem chamou assim
+    que cada seção fica pronta. Uma falha fica restrita à sua seção: o conteúdo
+    dela vira None e a exceção é devolvida em `erros`.
+    Retorna (resultados, erros).
+    """
+    prompts = montar_prompts(texto)
+    resultados, erros = {secao: None for secao in SECOES}, {}
+
+    def registrar(secao, conteudo, erro):
+        if erro is None: resultados[secao] = conteudo
+        else: erros[secao] = erro
+        if ao_concluir: ao_concluir(secao, conteudo, erro)
+
+    if not paralelo:
+        for secao, prompt in prompts.items():
+            try: registrar(secao, model.generate_content(prompt).text, None)
+            except Exception as e: registrar(secao, None, e)
+        return resultados, erros
+
+    with ThreadPoolExecutor(max_workers=len(prompts), thread_name_prefix="analise") as pool:
+        futuros = {pool.submit(lambda p: model.generate_content(p).text, prompt): secao for secao, prompt in prompts.items()}
+        for futuro in as_completed(futuros):
+            secao = futuros[futuro]
+            try: registrar(secao, futuro.result(), None)
+            except Exception as e: registrar(secao, None, e)
+    return resultados, erros
+
+
+def validar_resposta_estruturada(bruto):
+    """Converte o JSON devolvido pelo modelo no dicionário de resultados.
+
+    Levanta ValueError se faltar alguma seção ou se ela vier vazia.
+    """
+    try: dados = json.loads(bruto)
+    except (TypeError, json.JSONDecodeError) as e: raise ValueError(f"JSON inválido: {e}") from e
+    if not isinstance(dados, dict): raise ValueError("A resposta não é um objeto JSON.")
+    resultados = {}
+    for secao in SECOES:
+        conteudo = dados.get(secao)
+        if not isinstance(conteudo, str) or not conteudo.strip():
+            raise ValueError(f"Seção ausente ou vazia: {secao}")
+        resultados[secao] = conteudo
+    return resultados
+
+
+def analisar_em_chamada_unica(model, texto):
+    """Gera as três seções com um único envio do texto.
+
+    Retorna (resultados, tokens_entrada, tokens_texto); os contadores vêm do
+    `usage_metadata` e ficam None quando a API não os informa.
+    """
+    prompt = PROMPT_CHAMADA_UNICA.format(texto=texto)
+    resposta = model.generate_content(prompt, generation_config={
+        "response_mime_type": "application/json",
+        "response_schema": ESQUEMA_CHAMADA_UNICA,
+    })
+    resultados = validar_resposta_estruturada(resposta.text)
+    tokens_entrada = getattr(getattr(resposta, "usage_metadata", None), "prompt_token_count", None)
+    # Parcela do prompt ocupada pelo documento, proporcional ao número de caracteres
+    tokens_texto = round(tokens_entrada * len(texto) / len(prompt)) if tokens_entrada else None
+    return resultados, tokens_entrada, tokens_texto
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN
+
+
+def resumir_por_partes(model, texto, tokens_por_bloco=TOKENS_POR_BLOCO, max_simultaneos=MAX_BLOCOS_SIMULTANEOS, ao_progredir=None):
+    """Etapa "map": resume blocos de até `tokens_por_bloco` em paralelo, com concorrência limitada.
+
+    `ao_progredir(concluidos, total)` é chamado na thread de quem chamou.
+    Retorna os resumos parciais na ordem do texto; um bloco que falhar vira um
+    aviso no lugar do seu resumo, e só se todos falharem a exceção é propagada.
+    """
+    blocos = [t["texto"] for t in dividir_em_trechos(texto, "", tamanho=tokens_por_bloco * CARACTERES_POR_TOKEN, sobreposicao=0)]
+    resumos, falhas = [None] * len(blocos), []
+    with ThreadPoolExecutor(max_workers=max_simultaneos, thread_name_prefix="map") as pool:
+        futuros = {
+            pool.submit(lambda p: model.generate_content(p).text, PROMPT_RESUMO_PARCIAL.format(parte=i + 1, total=len(blocos), texto=bloco)): i
+            for i, bloco in enumerate(blocos)
+        }
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            i = futuros[futuro]
+            try: resumos[i] = futuro.result()
+            except Exception as e:
+                falhas.append(e)
+                resumos[i] = f"[A parte {i + 1} de {len(blocos)} não pôde ser resumida.]"
+            if ao_progredir: ao_progredir(concluidos, len(blocos))
+    if len(falhas) == len(blocos): raise falhas[0]
+    return resumos
+
+
+def reduzir_texto(model, texto, limiar_tokens=LIMIAR_TOKENS_MAP_REDUCE, ao_progredir=None, **kwargs):
+    """Resume o texto por partes, em níveis, até caber no limiar. Retorna (texto, blocos_por_nivel)."""
+    niveis = []
+    kwargs.setdefault("tokens_por_bloco", min(TOKENS_POR_BLOCO, limiar_tokens))
+    while estimar_tokens(texto) > limiar_tokens:
+        resumos = resumir_por_partes(model, texto, ao_progredir=ao_progredir, **kwargs)
+        niveis.append(len(resumos))
+        anterior, texto = texto, "\n\n".join(f"### Parte {i} de {len(resumos)}\n{resumo}" for i, resumo in enumerate(resumos, start=1))
+        if len(resumos) == 1 or len(texto) >= len(anterior): break  # Não há como reduzir mais
+    return texto, niveis
+
+
+def analisar(model, texto, motor=MOTOR_TRES_CHAMADAS, paralelo=True, ao_concluir=None, limiar_tokens=LIMIAR_TOKENS_MAP_REDUCE, ao_progredir_blocos=None):
+    """Executa a análise com o motor escolhido.
+
+    Textos acima de `limiar_tokens` passam antes por um map-reduce: são resumidos
+    por partes e as seções são geradas a partir dos resumos. O motor de chamada
+    única recorre às três chamadas só quando a resposta vem malformada; erros da
+    API e da cota são propagados, já que repeti-los em três requisições só
+    agravaria uma limitação de taxa. Retorna (resultados, erros, uso), onde `uso` informa o motor
+    efetivo, a economia estimada de tokens de entrada e os blocos do map-reduce.
+    """
+    uso = {"motor": MOTOR_TRES_CHAMADAS, "tokens_entrada": None, "tokens_economizados": None, "fallback": None, "blocos_map_reduce": []}
+    if limiar_tokens is not None and estimar_tokens(texto) > limiar_tokens:
+        texto, uso["blocos_map_reduce"] = reduzir_texto(model, texto, limiar_tokens, ao_progredir=ao_progredir_blocos)
+    if motor == MOTOR_CHAMADA_UNICA:
+        try:
+            resultados, tokens_entrada, tokens_texto = analisar_em_chamada_unica(model, texto)
+        except ValueError as e:  # JSON inválido, seção ausente ou resposta sem texto (bloqueada)
+            uso["fallback"] = str(e)
+        else:
+            # As três chamadas enviariam o documento mais duas vezes
+            uso.update(motor=MOTOR_CHAMADA_UNICA, tokens_entrada=tokens_entrada,
+                       tokens_economizados=2 * tokens_texto if tokens_texto is not None else None)
+            if ao_concluir:
+                for secao in SECOES: ao_concluir(secao, resultados[secao], None)
+            return resultados, {}, uso
+    resultados, erros = analisar_secoes(model, texto, paralelo=paralelo, ao_concluir=ao_concluir)
+    return resultados, erros, uso
@@ -0,0 +1,177 @@
+"""Download concorrente de artigos da web com cache HTTP (ETag/Last-Modified) em SQLite."""
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+import zlib
+
+from core.cache import CacheSQLite
+
+MAX_CONEXOES = 8  # Downloads simultâneos no total
+MAX_CONEXOES_POR_HOST = 2  # Para não sobrecarregar um mesmo site
+TIMEOUT = (5, 20)  # segundos: (conexão, leitura)
+LIMITE_BYTES_HTML = 5 * 1024 * 1024  # Páginas maiores são cortadas
+TTL_FRESCO = 10 * 60  # segundos em que uma página em cache é usada sem revalidar
+USER_AGENT = "Mozilla/5.0 (compatible; ResumeAi/1.0)"
+_CHARSET_CABECALHO = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+_CHARSET_META = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+class CachePaginas(CacheSQLite):
+    """Cache LRU em disco do HTML e do texto extraído de cada URL, com os validadores HTTP.
+
+    O conteúdo é guardado como JSON comprimido; a URL é a chave, e ETag,
+    Last-Modified e o momento da última verificação ficam em colunas próprias.
+    """
+
+    tabela, coluna_valor, tipo_valor = "paginas_web", "dados", "BLOB"
+    colunas_extras = {"etag": "TEXT", "last_modified": "TEXT", "verificado_em": "REAL"}
+
+    def __init__(self, caminho, limite_bytes=100 * 1024 * 1024):
+        super().__init__(caminho, limite_bytes)
+        with self._conectar() as con: con.execute("DROP TABLE IF EXISTS paginas")  # Formato anterior, sem compressão
+
+    def _codificar(self, pagina):
+        dados = zlib.compress(json.dumps(pagina, ensure_ascii=False).encode("utf-8"))
+        return dados, len(dados), {}
+
+    def _decodificar(self, dados, extras):
+        return {**json.loads(zlib.decompress(dados)), **extras}
+
+    def guardar(self, url, html, titulo, texto, etag=None, last_modified=None):
+        super().guardar(url, {"html": html, "titulo": titulo, "texto": texto}, etag=etag, last_modified=last_modified, verificado_em=time.time())
+
+    def marcar_verificado(self, url):
+        """Registra que o servidor confirmou (304) que a cópia em cache continua válida."""
+        with self._lock, self._conectar() as con:
+            con.execute(f"UPDATE {self.tabela} SET verificado_em = ? WHERE chave = ?", (time.time(), url))
+
+
+def decodificar_html(conteudo, content_type=""):
+    """Decodifica o HTML pelo charset do cabeçalho, depois pelo `<meta charset>` e, sem nenhum dos dois, como UTF-8.
+
+    O `requests` assume ISO-8859-1 para `text/html` sem charset no cabeçalho,
+    o que estraga páginas em UTF-8 ("anÃ¡lise"); por isso a decisão é feita aqui.
+    """
+    if conteudo.startswith(b"\xef\xbb\xbf"): return conteudo[3:].decode("utf-8", errors="replace")
+    candidatos = [m.group(1) for m in (_CHARSET_CABECALHO.search(content_type or ""),) if m]
+    candidatos += [m.group(1).decode("ascii") for m in (_CHARSET_META.search(conteudo[:4096]),) if m]
+    for charset in candidatos:
+        try: return conteudo.decode(charset, errors="replace")
+        except LookupError: continue  # Charset desconhecido declarado pela página
+    try: return conteudo.decode("utf-8")
+    except UnicodeDecodeError: return conteudo.decode("cp1252", errors="replace")
+
+
+def extrair_texto_html(url, html):
+    """Título e texto principal do HTML, usando o mesmo extrator do newspaper3k."""
+    from newspaper import Article  # Carrega nltk e lxml; só é importado quando há artigo para ler
+    art = Article(url)
+    art.download(input_html=html)
+    art.parse()
+    return art.title or "", art.text or ""
+
+
+class BuscadorArtigos:
+    """Baixa várias URLs ao mesmo tempo numa sessão HTTP com pool de conexões.
+
+    O total de downloads simultâneos é limitado por `max_conexoes` e, para cada
+    host, por `por_host`; os dois limites valem para todas as chamadas de
+    `buscar` na mesma instância (a do app é compartilhada pelo processo). Páginas em cache há menos de `ttl_fresco` segundos são
+    reaproveitadas direto; as mais antigas são revalidadas com If-None-Match /
+    If-Modified-Since. Pedidos simultâneos da mesma URL (de sessões diferentes,
+    por exemplo) compartilham um único download.
+    """
+
+    def __init__(self, cache=None, max_conexoes=MAX_CONEXOES, por_host=MAX_CONEXOES_POR_HOST, timeout=TIMEOUT, ttl_fresco=TTL_FRESCO, sessao=None):
+        self.cache, self.max_conexoes, self.por_host, self.timeout, self.ttl_fresco = cache, max_conexoes, por_host, timeout, ttl_fresco
+        if sessao is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            sessao.headers["User-Agent"] = USER_AGENT
+        self.sessao = sessao
+        self._lock = threading.Lock()
+        self._vagas = threading.Semaphore(max_conexoes)  # Limite global, não por chamada de `buscar`
+        self._hosts = {}  # host -> Semaphore
+        self._em_andamento = {}  # url -> Future
+
+    def _semaforo(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts: self._hosts[host] = threading.Semaphore(self.por_host)
+            return self._hosts[host]
+
+    def _baixar(self, url):
+        """Baixa (ou revalida) a URL. Retorna (titulo, texto, origem)."""
+        entrada = self.cache.obter(url) if self.cache else None
+        if entrada and time.time() - entrada["verificado_em"] < self.ttl_fresco:
+            return entrada["titulo"], entrada["texto"], "cache"
+        cabecalhos = {}
+        if entrada and entrada["etag"]: cabecalhos["If-None-Match"] = entrada["etag"]
+        if entrada and entrada["last_modified"]: cabecalhos["If-Modified-Since"] = entrada["last_modified"]
+        # Primeiro a vaga do host, para não segurar uma vaga global enquanto espera por ela
+        with self._semaforo(url), self._vagas, self.sessao.get(url, headers=cabecalhos, timeout=self.timeout, stream=True) as resposta:
+            if resposta.status_code == 304 and entrada:
+                self.cache.marcar_verificado(url)
+                return entrada["titulo"], entrada["texto"], "revalidado"
+            resposta.raise_for_status()
+            conteudo = resposta.raw.read(LIMITE_BYTES_HTML, decode_content=True)
+            html = decodificar_html(conteudo, resposta.headers.get("Content-Type", ""))
+        titulo, texto = extrair_texto_html(url, html)
+        if not texto.strip(): raise ValueError("Não foi possível extrair o texto principal da página.")
+        if self.cache: self.cache.guardar(url, html, titulo, texto, resposta.headers.get("ETag"), resposta.headers.get("Last-Modified"))
+        return titulo, texto, "rede"
+
+    def _baixar_compartilhado(self, url):
+        with self._lock:
+            futuro, dono = self._em_andamento.get(url), False
+            if futuro is None:
+                futuro, dono = Future(), True
+                self._em_andamento[url] = futuro
+        if not dono: return futuro.result()
+        try:
+            futuro.set_result(self._baixar(url))
+        except Exception as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock: self._em_andamento.pop(url, None)
+        return futuro.result()
+
+    def buscar_um(self, url):
+        """Resultado de uma URL no mesmo formato de `extrair_documentos`; falhas ficam em `erro`."""
+        inicio = time.perf_counter()
+        resultado = {"nome": url, "titulo": "", "texto": "", "truncado": False, "inicios_paginas": [], "erro": None, "origem": None}
+        try:
+            resultado["titulo"], resultado["texto"], resultado["origem"] = self._baixar_compartilhado(url)
+        except Exception as e:
+            resultado["erro"] = f"{type(e).__name__}: {e}"
+        resultado["segundos"] = time.perf_counter() - inicio
+        return resultado
+
+    def buscar(self, urls, ao_concluir=None):
+        """Baixa as URLs ao mesmo tempo. `ao_concluir(resultado, concluidos, total)` é chamado
+        a cada URL terminada. Retorna a lista de resultados na ordem de `urls`."""
+        urls = list(urls)
+        resultados = [None] * len(urls)
+        if not urls: return resultados
+        with ThreadPoolExecutor(max_workers=min(self.max_conexoes, len(urls))) as pool:
+            futuros = {pool.submit(self.buscar_um, url): indice for indice, url in enumerate(urls)}
+            for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+                resultados[futuros[futuro]] = futuro.result()
+                if ao_concluir: ao_concluir(resultados[futuros[futuro]], concluidos, len(urls))
+        return resultados
+
+
+def separar_urls(texto):
+    """URLs http(s) de um texto com uma por linha, sem repetições e na ordem em que aparecem."""
+    urls = []
+    for linha in texto.splitlines():
+        url = linha.strip()
+        if url.startswith(("http://", "https://")) and url not in urls: urls.append(url)
+    return urls
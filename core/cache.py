@@ -0,0 +1,162 @@
+"""Caches persistentes em SQLite para os resultados das análises e os textos extraídos."""
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+import threading
+import time
+import unicodedata
+import zlib
+
+
+def normalizar_texto(texto):
+    """Normaliza Unicode e espaços para que variações triviais gerem a mesma chave."""
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+def chave_analise(texto, modelo, versao_prompts):
+    """Chave de conteúdo: hash do texto normalizado, do modelo e da versão dos prompts."""
+    h = hashlib.sha256()
+    for parte in (modelo, versao_prompts, normalizar_texto(texto)):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def chave_extracao(dados, versao_extrator, limite_caracteres=None):
+    """Chave de conteúdo: hash dos bytes enviados, da versão do extrator e do limite de caracteres."""
+    h = hashlib.sha256()
+    for parte in (versao_extrator, str(limite_caracteres)):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    h.update(dados)
+    return h.hexdigest()
+
+
+class CacheSQLite:
+    """Cache LRU em disco, limitado em bytes e compartilhado por todas as sessões.
+
+    Cada operação abre a sua própria conexão, então uma única instância pode ser
+    usada por várias threads do Streamlit ao mesmo tempo. As subclasses definem
+    a tabela, a coluna do valor, colunas extras de metadados e a codificação.
+    """
+
+    tabela = coluna_valor = None
+    tipo_valor = "TEXT"
+    colunas_extras = {}  # nome -> tipo SQL
+
+    def __init__(self, caminho, limite_bytes):
+        self.caminho, self.limite_bytes = caminho, limite_bytes
+        self.acertos = self.falhas = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(caminho): os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        extras = "".join(f"{nome} {tipo}, " for nome, tipo in self.colunas_extras.items())
+        with self._conectar() as con:
+            con.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.tabela} ("
+                f"chave TEXT PRIMARY KEY, {extras}versao TEXT, {self.coluna_valor} {self.tipo_valor}, "
+                "tamanho INTEGER, criado_em REAL, acessado_em REAL)"
+            )
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.tabela}_acesso ON {self.tabela} (acessado_em)")
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con: yield con
+        finally: con.close()
+
+    def _codificar(self, valor):
+        """(dados gravados, tamanho em bytes, colunas extras calculadas)."""
+        raise NotImplementedError
+
+    def _decodificar(self, dados, extras):
+        """Valor a partir dos dados gravados e das colunas extras da linha."""
+        raise NotImplementedError
+
+    def obter(self, chave):
+        """Retorna o valor guardado para a chave, ou None."""
+        colunas = ", ".join([self.coluna_valor, *self.colunas_extras])
+        with self._lock, self._conectar() as con:
+            linha = con.execute(f"SELECT {colunas} FROM {self.tabela} WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                self.falhas += 1
+                return None
+            con.execute(f"UPDATE {self.tabela} SET acessado_em = ? WHERE chave = ?", (time.time(), chave))
+            self.acertos += 1
+        return self._decodificar(linha[0], dict(zip(self.colunas_extras, linha[1:])))  # Fora do lock
+
+    def guardar(self, chave, valor, versao="", **colunas):
+        """Guarda o valor e remove as entradas menos usadas se o limite for excedido."""
+        dados, tamanho, extras = self._codificar(valor)
+        if tamanho > self.limite_bytes: return  # Nunca caberia; despejaria o cache inteiro à toa
+        agora = time.time()
+        linha = {"chave": chave, **{nome: None for nome in self.colunas_extras}, **colunas, **extras, "versao": versao,
+                 self.coluna_valor: dados, "tamanho": tamanho, "criado_em": agora, "acessado_em": agora}
+        with self._lock, self._conectar() as con:
+            con.execute(f"INSERT OR REPLACE INTO {self.tabela} ({', '.join(linha)}) VALUES ({', '.join('?' * len(linha))})", tuple(linha.values()))
+            self._despejar(con)
+
+    def _despejar(self, con):
+        total = con.execute(f"SELECT COALESCE(SUM(tamanho), 0) FROM {self.tabela}").fetchone()[0]
+        if total <= self.limite_bytes: return
+        for chave, tamanho in con.execute(f"SELECT chave, tamanho FROM {self.tabela} ORDER BY acessado_em").fetchall():
+            con.execute(f"DELETE FROM {self.tabela} WHERE chave = ?", (chave,))
+            total -= tamanho
+            if total <= self.limite_bytes: break
+
+    def invalidar(self, versao_atual=None):
+        """Remove entradas de outras versões (ou todas, sem versão). Retorna quantas."""
+        with self._lock, self._conectar() as con:
+            if versao_atual is None: cur = con.execute(f"DELETE FROM {self.tabela}")
+            else: cur = con.execute(f"DELETE FROM {self.tabela} WHERE versao != ?", (versao_atual,))
+            return cur.rowcount
+
+    def estatisticas(self):
+        with self._lock, self._conectar() as con:
+            entradas, total = con.execute(f"SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM {self.tabela}").fetchone()
+        return {"acertos": self.acertos, "falhas": self.falhas, "entradas": entradas, "bytes": total}
+
+
+class CacheAnalises(CacheSQLite):
+    """Resultados das análises em JSON, por chave de conteúdo (`chave_analise`); a versão é a dos prompts."""
+
+    tabela, coluna_valor, colunas_extras = "analises", "resultados", {"modelo": "TEXT"}
+
+    def __init__(self, caminho, limite_bytes=50 * 1024 * 1024):
+        super().__init__(caminho, limite_bytes)
+
+    def _codificar(self, resultados):
+        dados = json.dumps(resultados, ensure_ascii=False)
+        return dados, len(dados.encode("utf-8")), {}
+
+    def _decodificar(self, dados, extras):
+        return json.loads(dados)
+
+
+class CacheExtracoes(CacheSQLite):
+    """Textos extraídos dos uploads, em JSON comprimido com zlib; o limite conta os bytes comprimidos.
+
+    Guarda o dicionário de `extrair_texto` para que o mesmo arquivo enviado de
+    novo, em qualquer página do app, não precise ser extraído outra vez.
+    """
+
+    tabela, coluna_valor, tipo_valor, colunas_extras = "extracoes", "dados", "BLOB", {"tamanho_original": "INTEGER"}
+
+    def __init__(self, caminho, limite_bytes=200 * 1024 * 1024, nivel_compressao=6):
+        self.nivel_compressao = nivel_compressao
+        super().__init__(caminho, limite_bytes)
+
+    def _codificar(self, extracao):
+        original = json.dumps(extracao, ensure_ascii=False).encode("utf-8")
+        dados = zlib.compress(original, self.nivel_compressao)
+        return dados, len(dados), {"tamanho_original": len(original)}
+
+    def _decodificar(self, dados, extras):
+        return json.loads(zlib.decompress(dados))
+
+    def estatisticas(self):
+        with self._lock, self._conectar() as con:
+            original = con.execute("SELECT COALESCE(SUM(tamanho_original), 0) FROM extracoes").fetchone()[0]
+        return {**super().estatisticas(), "bytes_originais": original}
@@ -0,0 +1,155 @@
+"""Utilitários para as conversas com o Gemini."""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.extracao import CARACTERES_POR_TOKEN
+
+logger = logging.getLogger(__name__)
+
+ORCAMENTO_TOKENS_HISTORICO = 8_000  # Turnos além disso são compactados num resumo
+TURNOS_RECENTES = 6  # Trocas mais recentes sempre enviadas na íntegra
+PROMPT_RESUMO_CONVERSA = (
+    "Atualize o resumo de uma conversa entre um usuário e um assistente sobre documentos. "
+    "Mantenha as perguntas feitas, as respostas e os fatos combinados, de forma concisa.\n\n"
+    "Resumo atual:\n{resumo}\n\nNovas trocas:\n{trocas}\n\nResumo atualizado:"
+)
+
+# Resumos de histórico são gerados fora da thread do script, compartilhados por todas as sessões
+_executor_resumos = ThreadPoolExecutor(max_workers=2, thread_name_prefix="resumo-chat")
+
+
+def estimar_tokens_conteudo(conteudo):
+    """Estimativa de tokens de uma lista de mensagens no formato {"role", "parts"}."""
+    return sum(len(parte) for mensagem in conteudo for parte in mensagem["parts"]) // CARACTERES_POR_TOKEN
+
+
+class RespostaEmStream:
+    """Envia uma mensagem com `stream=True` e entrega os trechos à medida que chegam.
+
+    Pode ser passada direto ao `st.write_stream`. Ao final, `texto` contém a resposta
+    completa e `metricas` o tempo até o primeiro trecho e a latência total. Se a
+    leitura for interrompida (erro, rerun ou navegação), `fechar()` remove do
+    histórico do chat o turno incompleto para que a conversa continue coerente.
+    """
+
+    def __init__(self, chat, mensagem):
+        self.chat, self.mensagem = chat, mensagem
+        self.partes, self.concluida, self._aberta = [], False, False
+        self.metricas = {"tempo_primeiro_token": None, "latencia_total": None, "concluida": False}
+        self._inicio = None
+
+    @property
+    def texto(self):
+        return "".join(self.partes)
+
+    def __iter__(self):
+        self._inicio = time.perf_counter()
+        resposta = self.chat.send_message(self.mensagem, stream=True)
+        self._aberta = True
+        for trecho in resposta:
+            parte = trecho.text
+            if self.metricas["tempo_primeiro_token"] is None:
+                self.metricas["tempo_primeiro_token"] = time.perf_counter() - self._inicio
+            self.partes.append(parte)
+            yield parte
+        self.concluida = self.metricas["concluida"] = True
+        self.metricas["latencia_total"] = time.perf_counter() - self._inicio
+
+    def fechar(self):
+        """Finaliza as métricas e desfaz o turno no histórico se a resposta ficou incompleta."""
+        if self._inicio is not None and self.metricas["latencia_total"] is None:
+            self.metricas["latencia_total"] = time.perf_counter() - self._inicio
+        if self._aberta and not self.concluida:
+            try: self.chat.rewind()
+            except Exception: pass
+        self._aberta = False
+
+
+class HistoricoLimitado:
+    """Histórico de chat com orçamento de tokens e resumo contínuo das trocas antigas.
+
+    O `contexto` (ex.: o documento) e as `turnos_recentes` últimas trocas vão
+    sempre na íntegra. Quando as trocas passam do orçamento, as mais antigas são
+    resumidas em segundo plano; até o resumo ficar pronto elas continuam sendo
+    enviadas como estão.
+    """
+
+    def __init__(self, model, contexto=None, orcamento_tokens=ORCAMENTO_TOKENS_HISTORICO, turnos_recentes=TURNOS_RECENTES):
+        self.model, self.contexto = model, list(contexto or [])
+        self.orcamento_tokens, self.turnos_recentes = orcamento_tokens, turnos_recentes
+        self.resumo, self.trocas, self._compactando = None, [], None
+        self._lock = threading.Lock()
+
+    def conteudo(self, mensagem):
+        """Mensagens a enviar no próximo turno, terminando com a nova mensagem do usuário."""
+        with self._lock:
+            resumo, trocas = self.resumo, list(self.trocas)
+        conteudo = list(self.contexto)
+        if resumo:
+            conteudo += [{"role": "user", "parts": [f"Resumo da conversa até aqui:\n{resumo}"]}, {"role": "model", "parts": ["Entendido."]}]
+        for pergunta, resposta in trocas:
+            conteudo += [{"role": "user", "parts": [pergunta]}, {"role": "model", "parts": [resposta]}]
+        return conteudo + [{"role": "user", "parts": [mensagem]}]
+
+    def registrar(self, pergunta, resposta):
+        with self._lock:
+            self.trocas.append((pergunta, resposta))
+            tokens = sum(len(p) + len(r) for p, r in self.trocas) // CARACTERES_POR_TOKEN
+            if tokens <= self.orcamento_tokens or len(self.trocas) <= self.turnos_recentes: return
+            if self._compactando is not None and not self._compactando.done(): return
+            antigas = self.trocas[:-self.turnos_recentes]
+            self._compactando = _executor_resumos.submit(self._compactar, self.resumo, antigas)
+
+    def _compactar(self, resumo, antigas):
+        trocas = "\n\n".join(f"Usuário: {p}\nAssistente: {r}" for p, r in antigas)
+        try:
+            novo = self.model.generate_content(PROMPT_RESUMO_CONVERSA.format(resumo=resumo or "(vazio)", trocas=trocas)).text
+        except Exception:
+            logger.exception("Falha ao resumir o histórico do chat; as trocas seguem na íntegra")
+            return
+        with self._lock:
+            # Só houve inclusões no fim desde o envio, então as antigas continuam no início
+            self.resumo, self.trocas = novo, self.trocas[len(antigas):]
+        logger.info("Histórico do chat compactado: %d trocas resumidas", len(antigas))
+
+    def aguardar_compactacao(self, timeout=None):
+        if self._compactando is not None: self._compactando.result(timeout)
+
+
+class ChatLimitado:
+    """Chat com a mesma interface do ChatSession (`send_message`/`rewind`) e histórico limitado.
+
+    Um turno só entra no histórico quando a resposta termina. O tamanho estimado
+    de cada prompt fica em `ultimo_prompt_tokens` e é registrado no log.
+    """
+
+    def __init__(self, model, contexto=None, **kwargs):
+        self.model = model
+        self.historico = HistoricoLimitado(model, contexto, **kwargs)
+        self.ultimo_prompt_tokens = None
+
+    def _preparar(self, mensagem):
+        """Mensagem efetivamente enviada ao modelo; subclasses podem enriquecê-la."""
+        return mensagem
+
+    def send_message(self, mensagem, stream=False):
+        conteudo = self.historico.conteudo(self._preparar(mensagem))
+        self.ultimo_prompt_tokens = estimar_tokens_conteudo(conteudo)
+        logger.info("Turno de chat: ~%d tokens de prompt (%d mensagens)", self.ultimo_prompt_tokens, len(conteudo))
+        resposta = self.model.generate_content(conteudo, stream=stream)
+        if not stream:
+            self.historico.registrar(mensagem, resposta.text)
+            return resposta
+        return self._acompanhar(mensagem, resposta)
+
+    def _acompanhar(self, mensagem, resposta):
+        partes = []
+        for trecho in resposta:
+            partes.append(trecho.text)
+            yield trecho
+        self.historico.registrar(mensagem, "".join(partes))
+
+    def rewind(self):
+        """Nada a desfazer: turnos incompletos nunca entram no histórico."""
@@ -0,0 +1,19 @@
+"""Configurações compartilhadas pelo app e pela análise em lote (analisar_lote.py).
+
+Ficam num lugar só porque entram nas chaves dos caches: se o modelo ou o limite
+de extração fossem diferentes nos dois, o lote deixaria de aproveitar as
+análises do app (e vice-versa) sem nenhum aviso.
+"""
+import os
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_CACHE = os.path.join(RAIZ, ".cache")
+
+MODELO_GEMINI = "gemini-2.5-flash"
+LIMITE_CARACTERES_EXTRACAO = 4_000_000  # Cerca de 1 milhão de tokens; o restante do arquivo é ignorado
+
+CAMINHO_CACHE_ANALISES = os.path.join(DIRETORIO_CACHE, "analises.sqlite3")
+LIMITE_CACHE_ANALISES = 50 * 1024 * 1024  # bytes
+CAMINHO_CACHE_EXTRACOES = os.path.join(DIRETORIO_CACHE, "extracoes.sqlite3")
+LIMITE_CACHE_EXTRACOES = 200 * 1024 * 1024  # bytes, já comprimidos
+CAMINHO_REGISTRO_USO = os.path.join(DIRETORIO_CACHE, "uso.sqlite3")
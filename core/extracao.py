@@ -0,0 +1,191 @@
+"""Extração de texto de PDFs e TXTs, página a página."""
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.cache import chave_extracao
+
+
+CARACTERES_POR_TOKEN = 4  # Estimativa usada para converter orçamentos de tokens
+LIMIAR_PAGINAS_PARALELO = 200  # A partir daqui a extração é dividida entre processos
+PAGINAS_POR_BLOCO = 50
+MAX_PROCESSOS_INGESTAO = 4  # Arquivos extraídos ao mesmo tempo no chat multi-documentos
+VERSAO_EXTRATOR = "1"  # Mude ao alterar o texto produzido pela extração; invalida o cache de extrações
+CAMPOS_EXTRACAO = ("texto", "paginas_lidas", "total_paginas", "truncado", "inicios_paginas")
+
+
+def _como_buffer(origem):
+    """Obtém os bytes da origem sem copiá-los quando possível."""
+    if isinstance(origem, (bytes, memoryview)): return origem
+    if isinstance(origem, bytearray): return memoryview(origem)
+    if hasattr(origem, "getbuffer"): return origem.getbuffer()  # BytesIO / UploadedFile
+    return origem.read()
+
+
+def iterar_paginas_pdf(origem):
+    """Gera (numero_da_pagina, total_de_paginas, texto) abrindo o PDF uma única vez."""
+    import fitz  # PyMuPDF; importado só quando há PDF para ler
+    with fitz.open(stream=_como_buffer(origem), filetype="pdf") as doc:
+        total = doc.page_count
+        for numero, pagina in enumerate(doc, start=1):
+            yield numero, total, pagina.get_text()
+
+
+def contar_paginas(origem):
+    import fitz  # PyMuPDF
+    with fitz.open(stream=_como_buffer(origem), filetype="pdf") as doc:
+        return doc.page_count
+
+
+def _extrair_intervalo(caminho, inicio, fim):
+    """Executado em outro processo: abre o PDF por conta própria e lê as páginas [inicio, fim)."""
+    import fitz  # PyMuPDF
+    with fitz.open(caminho) as doc:
+        return [doc[i].get_text() for i in range(inicio, fim)]
+
+
+def iterar_paginas_pdf_paralelo(origem, processos=None):
+    """Como `iterar_paginas_pdf`, mas extrai blocos de páginas num pool de processos.
+
+    O PDF é gravado num arquivo temporário que cada processo abre de forma
+    independente. As páginas são entregues em ordem; fechar o gerador antes do
+    fim cancela os blocos que ainda não começaram.
+    """
+    buffer = _como_buffer(origem)
+    total = contar_paginas(buffer)
+    processos = processos or os.cpu_count() or 1
+    # Cerca de dois blocos por processo, para equilibrar a carga sem blocos grandes demais
+    paginas_por_bloco = max(1, min(PAGINAS_POR_BLOCO, math.ceil(total / (2 * processos))))
+    fd, caminho = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as arquivo: arquivo.write(buffer)
+        # "spawn" evita herdar por fork as threads do servidor Streamlit
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = [pool.submit(_extrair_intervalo, caminho, inicio, min(inicio + paginas_por_bloco, total))
+                       for inicio in range(0, total, paginas_por_bloco)]
+            try:
+                numero = 0
+                for futuro in futuros:
+                    for texto in futuro.result():
+                        numero += 1
+                        yield numero, total, texto
+            finally:
+                for futuro in futuros: futuro.cancel()
+    finally:
+        os.remove(caminho)
+
+
+def extrair_texto(origem, tipo="application/pdf", limite_caracteres=None, limite_tokens=None, ao_progredir=None, paralelo=None, processos=None, cache=None):
+    """Extrai o texto de um PDF ou TXT, parando ao atingir o orçamento configurado.
+
+    `ao_progredir(pagina, total)` é chamado após cada página. O texto final é
+    montado com um único join. Com `paralelo=None`, em máquinas com mais de um
+    núcleo, PDFs a partir de LIMIAR_PAGINAS_PARALELO páginas são extraídos num
+    pool de processos.
+    Retorna um dicionário com `texto`, `paginas_lidas`, `total_paginas`, `truncado`
+    e `inicios_paginas` (posição no texto onde começa cada página).
+    Com um `cache` (CacheExtracoes), os mesmos bytes não são extraídos de novo;
+    o resultado vindo do cache traz também `do_cache=True`.
+    """
+    if limite_tokens is not None:
+        limite_tokens_em_caracteres = limite_tokens * CARACTERES_POR_TOKEN
+        limite_caracteres = min(limite_caracteres or limite_tokens_em_caracteres, limite_tokens_em_caracteres)
+    if cache is not None:
+        origem = _como_buffer(origem)  # Lida uma vez: serve à chave e à extração
+        chave = chave_extracao(origem, VERSAO_EXTRATOR, limite_caracteres)
+        if (extracao := cache.obter(chave)) is not None:
+            if ao_progredir and extracao["total_paginas"]: ao_progredir(extracao["paginas_lidas"], extracao["total_paginas"])
+            return {**extracao, "do_cache": True}
+        extracao = extrair_texto(origem, tipo, limite_caracteres=limite_caracteres, ao_progredir=ao_progredir, paralelo=paralelo, processos=processos)
+        cache.guardar(chave, extracao, versao=VERSAO_EXTRATOR)
+        return extracao
+
+    if tipo != "application/pdf":
+        texto = str(_como_buffer(origem), "utf-8")
+        truncado = limite_caracteres is not None and len(texto) > limite_caracteres
+        if ao_progredir: ao_progredir(1, 1)
+        return {"texto": texto[:limite_caracteres] if truncado else texto, "paginas_lidas": 1, "total_paginas": 1, "truncado": truncado, "inicios_paginas": [0]}
+
+    partes, inicios_paginas, tamanho, paginas_lidas, total, truncado = [], [], 0, 0, 0, False
+    if paralelo is None: paralelo = (os.cpu_count() or 1) > 1 and contar_paginas(origem) >= LIMIAR_PAGINAS_PARALELO
+    paginas = iterar_paginas_pdf_paralelo(origem, processos) if paralelo else iterar_paginas_pdf(origem)
+    try:
+        for numero, total, texto_pagina in paginas:
+            if limite_caracteres is not None and tamanho + len(texto_pagina) > limite_caracteres:
+                texto_pagina, truncado = texto_pagina[:limite_caracteres - tamanho], True
+            partes.append(texto_pagina)
+            inicios_paginas.append(tamanho)
+            tamanho += len(texto_pagina)
+            paginas_lidas = numero
+            if ao_progredir: ao_progredir(numero, total)
+            if truncado: break
+    finally:
+        paginas.close()  # Fecha o documento mesmo ao parar antes da última página
+    return {"texto": "".join(partes), "paginas_lidas": paginas_lidas, "total_paginas": total, "truncado": truncado, "inicios_paginas": inicios_paginas}
+
+
+def _extrair_documento(nome, tipo, dados, limite_caracteres):
+    """Extrai um arquivo inteiro, devolvendo o erro em vez de levantá-lo."""
+    inicio = time.perf_counter()
+    try:
+        extracao = extrair_texto(dados, tipo, limite_caracteres=limite_caracteres, paralelo=False)
+        erro = None
+    except Exception as e:
+        extracao, erro = {"texto": "", "paginas_lidas": 0, "total_paginas": 0, "truncado": False, "inicios_paginas": []}, f"{type(e).__name__}: {e}"
+    return {"nome": nome, **extracao, "erro": erro, "segundos": time.perf_counter() - inicio}
+
+
+def extrair_documentos(arquivos, max_processos=MAX_PROCESSOS_INGESTAO, limite_caracteres=None, ao_concluir=None, cache=None):
+    """Extrai vários arquivos (objetos com `name`, `type` e conteúdo em bytes) ao mesmo tempo.
+
+    Como o PyMuPDF não é thread-safe, os PDFs são distribuídos num pool de
+    processos limitado por `max_processos` e pelo número de núcleos. Uma falha
+    fica registrada no resultado do arquivo sem interromper os demais.
+    `ao_concluir(resultado, concluidos, total)` é chamado a cada arquivo
+    terminado. Com um `cache` (CacheExtracoes), os arquivos já extraídos antes
+    são resolvidos na hora, sem passar pelo pool, e vêm com `do_cache=True`.
+    Retorna a lista de resultados na ordem de `arquivos`.
+    """
+    tarefas = [(arquivo.name, arquivo.type, bytes(_como_buffer(arquivo)), limite_caracteres) for arquivo in arquivos]
+    resultados = [None] * len(tarefas)
+    chaves = [chave_extracao(tarefa[2], VERSAO_EXTRATOR, limite_caracteres) for tarefa in tarefas] if cache is not None else []
+
+    def registrar(indice, resultado):
+        resultados[indice] = resultado
+        if cache is not None and resultado["erro"] is None and not resultado.get("do_cache"):
+            cache.guardar(chaves[indice], {campo: resultado[campo] for campo in CAMPOS_EXTRACAO}, versao=VERSAO_EXTRATOR)
+        if ao_concluir: ao_concluir(resultado, sum(r is not None for r in resultados), len(tarefas))
+
+    pendentes = []
+    for indice, tarefa in enumerate(tarefas):
+        inicio = time.perf_counter()
+        if cache is not None and (extracao := cache.obter(chaves[indice])) is not None:
+            registrar(indice, {"nome": tarefa[0], **extracao, "erro": None, "segundos": time.perf_counter() - inicio, "do_cache": True})
+        else: pendentes.append(indice)
+    processos = min(max_processos, os.cpu_count() or 1, len(pendentes))
+
+    if processos <= 1:
+        for indice in pendentes: registrar(indice, _extrair_documento(*tarefas[indice]))
+        return resultados
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futuros = {pool.submit(_extrair_documento, *tarefas[indice]): indice for indice in pendentes}
+        for futuro in as_completed(futuros):
+            indice = futuros[futuro]
+            try: resultado = futuro.result()
+            except Exception as e:  # Processo interrompido, por exemplo
+                resultado = {"nome": tarefas[indice][0], "texto": "", "paginas_lidas": 0, "total_paginas": 0, "truncado": False, "inicios_paginas": [], "erro": f"{type(e).__name__}: {e}", "segundos": 0.0}
+            registrar(indice, resultado)
+    return resultados
+
+
+def combinar_documentos(resultados):
+    """Junta os textos extraídos, na ordem original, com os delimitadores de cada documento."""
+    partes = []
+    for resultado in resultados:
+        if resultado["erro"] is not None: continue
+        nome = resultado["nome"]
+        partes.append(f"\n\n--- INÍCIO DO DOCUMENTO: {nome} ---\n\n{resultado['texto']}\n\n--- FIM DO DOCUMENTO: {nome} ---\n\n")
+    return "".join(partes)
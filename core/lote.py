@@ -0,0 +1,113 @@
+"""Análise em lote de uma pasta de documentos, sem Streamlit, com checkpoint em JSONL."""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+from core.analise import LIMIAR_TOKENS_MAP_REDUCE, MOTOR_CHAMADA_UNICA, VERSAO_PROMPTS, analisar
+from core.cache import chave_analise
+from core.extracao import extrair_texto
+
+EXTENSOES = {".pdf": "application/pdf", ".txt": "text/plain"}
+MAX_DOCUMENTOS_SIMULTANEOS = 4
+TAMANHO_MINIMO_TEXTO = 50  # Abaixo disso a análise não faz sentido, como no app
+
+# O PyMuPDF não é thread-safe: a extração é feita um arquivo por vez, e só as
+# análises (que passam a maior parte do tempo esperando a IA) rodam em paralelo.
+_lock_extracao = threading.Lock()
+
+
+def analisar_com_cache(model, texto, cache=None, nome_modelo="", motor=MOTOR_CHAMADA_UNICA, paralelo=True,
+                       ao_concluir=None, limiar_tokens=LIMIAR_TOKENS_MAP_REDUCE, ao_progredir_blocos=None):
+    """Como `analisar`, mas consulta e alimenta o cache de análises (o mesmo do app).
+
+    Um acerto no cache retorna (resultados, {}, {"cache": True}) sem chamar a IA.
+    Só análises sem erros são guardadas.
+    """
+    chave = chave_analise(texto, nome_modelo, VERSAO_PROMPTS)
+    if cache is not None and (resultados := cache.obter(chave)) is not None:
+        return resultados, {}, {"cache": True}
+    resultados, erros, uso = analisar(model, texto, motor=motor, paralelo=paralelo, ao_concluir=ao_concluir,
+                                      limiar_tokens=limiar_tokens, ao_progredir_blocos=ao_progredir_blocos)
+    if cache is not None and not erros: cache.guardar(chave, resultados, modelo=nome_modelo, versao=VERSAO_PROMPTS)
+    return resultados, erros, uso
+
+
+def listar_arquivos(alvo):
+    """PDFs e TXTs de uma pasta (recursivamente) ou de um padrão glob, em ordem alfabética."""
+    if os.path.isdir(alvo): caminhos = glob.glob(os.path.join(alvo, "**", "*"), recursive=True)
+    else: caminhos = glob.glob(alvo, recursive=True)
+    return sorted(c for c in caminhos if os.path.isfile(c) and os.path.splitext(c)[1].lower() in EXTENSOES)
+
+
+def ler_checkpoint(caminho_saida):
+    """Hashes dos arquivos já analisados com sucesso numa execução anterior (linhas do JSONL de saída)."""
+    concluidos = set()
+    if not os.path.exists(caminho_saida): return concluidos
+    with open(caminho_saida, encoding="utf-8") as f:
+        for linha in f:
+            try: registro = json.loads(linha)
+            except json.JSONDecodeError: continue  # Linha cortada por uma interrupção no meio da escrita
+            if registro.get("status") == "ok": concluidos.add(registro["sha256"])
+    return concluidos
+
+
+def _processar_arquivo(caminho, analisar_texto, limite_caracteres):
+    inicio = time.perf_counter()
+    with open(caminho, "rb") as f: dados = f.read()
+    registro = {"arquivo": caminho, "sha256": hashlib.sha256(dados).hexdigest(), "status": "erro"}
+    try:
+        with _lock_extracao:
+            extracao = extrair_texto(dados, EXTENSOES[os.path.splitext(caminho)[1].lower()], limite_caracteres=limite_caracteres, paralelo=False)
+    except Exception as e:
+        registro.update(erro=f"{type(e).__name__}: {e}", segundos=round(time.perf_counter() - inicio, 3))
+        return registro
+    registro.update(caracteres=len(extracao["texto"]), truncado=extracao["truncado"], segundos_extracao=round(time.perf_counter() - inicio, 3))
+    if len(extracao["texto"]) < TAMANHO_MINIMO_TEXTO: registro["erro"] = "Texto extraído curto demais para uma análise significativa."
+    else:
+        try:
+            resultados, erros, uso = analisar_texto(extracao["texto"])
+            registro.update(resultados=resultados, erros={secao: str(e) for secao, e in erros.items()}, uso=uso)
+            if not erros: registro["status"] = "ok"
+            else: registro["erro"] = "; ".join(f"{secao}: {e}" for secao, e in registro["erros"].items())
+        except Exception as e:
+            registro["erro"] = f"{type(e).__name__}: {e}"
+    registro["segundos"] = round(time.perf_counter() - inicio, 3)
+    return registro
+
+
+def processar_lote(arquivos, analisar_texto, caminho_saida, max_simultaneos=MAX_DOCUMENTOS_SIMULTANEOS, limite_caracteres=None, ao_concluir=None):
+    """Analisa os arquivos e acrescenta uma linha JSON por arquivo em `caminho_saida`.
+
+    `analisar_texto(texto)` retorna (resultados, erros, uso), como `analisar_com_cache`.
+    Arquivos cujo conteúdo já aparece com status "ok" na saída são pulados, então
+    uma execução interrompida continua de onde parou; os que falharam são refeitos.
+    `ao_concluir(registro, concluidos, total)` é chamado a cada arquivo.
+    Retorna {"total", "pulados", "ok", "erros"}.
+    """
+    concluidos_antes = ler_checkpoint(caminho_saida)
+    pendentes = []
+    for caminho in arquivos:
+        with open(caminho, "rb") as f: sha = hashlib.sha256(f.read()).hexdigest()
+        if sha not in concluidos_antes: pendentes.append(caminho)
+    contagem = {"total": len(arquivos), "pulados": len(arquivos) - len(pendentes), "ok": 0, "erros": 0}
+    if os.path.dirname(caminho_saida): os.makedirs(os.path.dirname(caminho_saida), exist_ok=True)
+    # Uma linha cortada no fim do arquivo não pode grudar no primeiro registro novo
+    if os.path.exists(caminho_saida) and os.path.getsize(caminho_saida):
+        with open(caminho_saida, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                with open(caminho_saida, "a", encoding="utf-8") as saida: saida.write("\n")
+    with open(caminho_saida, "a", encoding="utf-8") as saida, ThreadPoolExecutor(max_workers=max(1, max_simultaneos)) as pool:
+        futuros = [pool.submit(_processar_arquivo, caminho, analisar_texto, limite_caracteres) for caminho in pendentes]
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            registro = futuro.result()
+            # Cada linha é gravada assim que o arquivo termina: é o checkpoint da próxima execução
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            saida.flush()
+            contagem["ok" if registro["status"] == "ok" else "erros"] += 1
+            if ao_concluir: ao_concluir(registro, concluidos, len(pendentes))
+    return contagem
@@ -0,0 +1,221 @@
+"""Acesso às notas do usuário na tabela `user_notes` do Supabase."""
+import logging
+import io
+import math
+import re
+import zipfile
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from core.recuperacao import tokenizar
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_PAGINA_NOTAS = 20
+COLUNAS_LISTAGEM = "id, title, created_at"  # O conteúdo só é buscado quando a nota é aberta
+PESO_TITULO = 3  # Um termo no título vale como três ocorrências no conteúdo
+MAX_TERMOS_PREFIXO = 50  # Expansões do último termo digitado consideradas na busca
+LIMITE_BUSCA_SERVIDOR = 50
+TAMANHO_LOTE_EXPORTACAO = 100  # Notas com conteúdo buscadas por vez ao montar o ZIP
+
+# A busca no servidor usa uma coluna tsvector `fts`, criada com:
+#   alter table user_notes add column fts tsvector generated always as
+#     (to_tsvector('portuguese', coalesce(title, '') || ' ' || coalesce(content, ''))) stored;
+#   create index user_notes_fts on user_notes using gin (fts);
+# Sem ela, a busca recai no índice local completo.
+
+
+def listar_pagina_notas(cliente, user_id, cursor=None, tamanho=TAMANHO_PAGINA_NOTAS, colunas=COLUNAS_LISTAGEM):
+    """Uma página de notas, da mais recente para a mais antiga, por paginação de conjunto de chaves.
+
+    `cursor` é o par (created_at, id) da última nota da página anterior.
+    Retorna (notas, proximo_cursor); o cursor é None na última página.
+    """
+    consulta = cliente.table("user_notes").select(colunas).eq("user_id", user_id)
+    if cursor:
+        criado_em, note_id = cursor
+        consulta = consulta.or_(f'created_at.lt."{criado_em}",and(created_at.eq."{criado_em}",id.lt."{note_id}")')
+    # Uma nota a mais revela se existe página seguinte sem precisar de um count
+    notas = consulta.order("created_at", desc=True).order("id", desc=True).limit(tamanho + 1).execute().data
+    if len(notas) <= tamanho: return notas, None
+    ultima = notas[tamanho - 1]
+    return notas[:tamanho], (ultima["created_at"], ultima["id"])
+
+
+def obter_conteudo_nota(cliente, note_id):
+    return cliente.table("user_notes").select("content").eq("id", note_id).single().execute().data["content"]
+
+
+class CacheNotas:
+    """Páginas e conteúdos de notas já buscados, mantidos na sessão até a próxima escrita."""
+
+    def __init__(self, cliente, user_id, tamanho_pagina=TAMANHO_PAGINA_NOTAS):
+        self.cliente, self.user_id, self.tamanho_pagina = cliente, user_id, tamanho_pagina
+        self.paginas, self.proximo_cursor, self.conteudos = [], None, {}
+
+    @property
+    def tem_mais(self):
+        return not self.paginas or self.proximo_cursor is not None
+
+    def notas(self):
+        """Notas de todas as páginas carregadas; busca a primeira se ainda não houver nenhuma."""
+        if not self.paginas: self.carregar_mais()
+        return [nota for pagina in self.paginas for nota in pagina]
+
+    def carregar_mais(self):
+        if not self.tem_mais: return
+        pagina, self.proximo_cursor = listar_pagina_notas(self.cliente, self.user_id, self.proximo_cursor, self.tamanho_pagina)
+        self.paginas.append(pagina)
+
+    def conteudo(self, note_id):
+        if note_id not in self.conteudos:
+            self.conteudos[note_id] = obter_conteudo_nota(self.cliente, note_id)
+        return self.conteudos[note_id]
+
+
+class IndiceNotas:
+    """Índice invertido local das notas, atualizado a cada nota inserida ou excluída.
+
+    Ranqueia por BM25, com peso extra para o título, e trata o último termo da
+    consulta como prefixo para filtrar enquanto o usuário digita. `completo`
+    indica se todas as notas do usuário já foram indexadas.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1, self.b = k1, b
+        self.notas, self.tamanhos, self.termos_nota = {}, {}, {}  # id -> metadados / número de termos / termos distintos
+        self.postings = defaultdict(dict)  # termo -> {id: frequência}
+        self.vocabulario = []  # Termos ordenados, para a busca por prefixo
+        self.completo = False
+
+    def adicionar(self, nota):
+        self.remover(nota["id"])
+        termos = tokenizar(nota.get("title") or "") * PESO_TITULO + tokenizar(nota.get("content") or "")
+        self.notas[nota["id"]] = {"id": nota["id"], "title": nota.get("title"), "created_at": nota.get("created_at")}
+        self.tamanhos[nota["id"]], self.termos_nota[nota["id"]] = len(termos), set(termos)
+        for termo in termos:
+            if termo not in self.postings: insort(self.vocabulario, termo)
+            self.postings[termo][nota["id"]] = self.postings[termo].get(nota["id"], 0) + 1
+
+    def remover(self, note_id):
+        if self.notas.pop(note_id, None) is None: return
+        self.tamanhos.pop(note_id)
+        for termo in self.termos_nota.pop(note_id):
+            del self.postings[termo][note_id]
+            if not self.postings[termo]:
+                del self.postings[termo]
+                self.vocabulario.pop(bisect_left(self.vocabulario, termo))
+
+    def _expandir_prefixo(self, prefixo):
+        inicio = bisect_left(self.vocabulario, prefixo)
+        termos = []
+        for termo in self.vocabulario[inicio:inicio + MAX_TERMOS_PREFIXO]:
+            if not termo.startswith(prefixo): break
+            termos.append(termo)
+        return termos
+
+    def buscar(self, consulta, k=20, ids=None):
+        """Notas mais relevantes (metadados, sem conteúdo), opcionalmente restritas a `ids`."""
+        termos = tokenizar(consulta)
+        if not termos or not self.notas: return []
+        grupos = [[t] for t in termos[:-1]] + [self._expandir_prefixo(termos[-1]) or [termos[-1]]]
+        total, medio = len(self.notas), sum(self.tamanhos.values()) / len(self.notas) or 1
+        pontuacoes = defaultdict(float)
+        for grupo in grupos:
+            for termo in grupo:
+                docs = self.postings.get(termo, {})
+                idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+                for note_id, frequencia in docs.items():
+                    if ids is not None and note_id not in ids: continue
+                    normalizacao = self.k1 * (1 - self.b + self.b * self.tamanhos[note_id] / medio)
+                    pontuacoes[note_id] += idf * frequencia * (self.k1 + 1) / (frequencia + normalizacao)
+        melhores = sorted(pontuacoes.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [self.notas[note_id] for note_id, _ in melhores]
+
+
+def indexar_todas_as_notas(cliente, user_id, indice, tamanho_lote=500):
+    """Carrega título e conteúdo de todas as notas, em páginas, para o índice local."""
+    cursor = None
+    while True:
+        notas, cursor = listar_pagina_notas(cliente, user_id, cursor, tamanho_lote, colunas="id, title, created_at, content")
+        for nota in notas: indice.adicionar(nota)
+        if cursor is None: break
+    indice.completo = True
+
+
+def consulta_tsquery(consulta):
+    """Consulta no formato do `to_tsquery`: todos os termos, e o último, ainda sendo digitado, como prefixo (`termo:*`)."""
+    termos = re.findall(r"\w+", consulta.lower())
+    if not termos: return None
+    return " & ".join(termos[:-1] + [f"{termos[-1]}:*"])
+
+
+def buscar_notas(cliente, user_id, consulta, indice, k=20):
+    """Busca notas por título e conteúdo, da mais à menos relevante.
+
+    Com o índice local completo a busca não vai ao servidor. Caso contrário usa
+    a busca textual do Postgres (coluna `fts`, com o último termo como prefixo)
+    e ranqueia os resultados no índice local; sem essa coluna, indexa todas as
+    notas localmente uma única vez.
+    """
+    if not indice.completo:
+        if (tsquery := consulta_tsquery(consulta)) is None: return []
+        try:
+            encontradas = (cliente.table("user_notes").select("id, title, created_at, content").eq("user_id", user_id)
+                           .text_search("fts", tsquery, options={"config": "portuguese"})
+                           .limit(LIMITE_BUSCA_SERVIDOR).execute().data)
+            for nota in encontradas: indice.adicionar(nota)
+            # Prefixo digitado sem acento ("orca") não casa no servidor; o índice local ignora acentos
+            if not encontradas: return indice.buscar(consulta, k)
+            # O Postgres aplica radicais que o índice local não conhece: mantém a ordem dele nesses casos
+            return indice.buscar(consulta, k, ids={nota["id"] for nota in encontradas}) or [indice.notas[nota["id"]] for nota in encontradas[:k]]
+        except Exception:
+            logger.info("Busca textual no servidor indisponível; indexando as notas localmente")
+            indexar_todas_as_notas(cliente, user_id, indice)
+    return indice.buscar(consulta, k)
+
+
+def excluir_notas(cliente, user_id, ids):
+    """Exclui várias notas do usuário numa única requisição. Retorna quantas linhas foram removidas."""
+    ids = list(ids)
+    if not ids: return 0
+    resposta = cliente.table("user_notes").delete().eq("user_id", user_id).in_("id", ids).execute()
+    return len(resposta.data or [])
+
+
+def iterar_notas_completas(cliente, user_id, ids=None, tamanho_lote=TAMANHO_LOTE_EXPORTACAO):
+    """Gera as notas com conteúdo em lotes, sem carregar todas de uma vez."""
+    colunas = "id, title, created_at, content"
+    if ids is not None:
+        ids = list(ids)
+        for i in range(0, len(ids), tamanho_lote):
+            yield from cliente.table("user_notes").select(colunas).eq("user_id", user_id).in_("id", ids[i:i + tamanho_lote]).execute().data
+        return
+    cursor = None
+    while True:
+        notas, cursor = listar_pagina_notas(cliente, user_id, cursor, tamanho_lote, colunas=colunas)
+        yield from notas
+        if cursor is None: return
+
+
+def _nome_arquivo(titulo, usados):
+    base = re.sub(r'[\\/:*?"<>|\r\n\t]+', "_", (titulo or "").strip())[:100] or "nota"
+    nome, n = f"{base}.txt", 2
+    while nome in usados:
+        nome, n = f"{base} ({n}).txt", n + 1
+    usados.add(nome)
+    return nome
+
+
+def exportar_notas_zip(cliente, user_id, ids=None):
+    """Monta um ZIP com um .txt por nota (todas, ou só `ids`), lote a lote.
+
+    Retorna (bytes do ZIP, quantidade de notas). São bytes porque o
+    `download_button` do Streamlit não aceita arquivos temporários.
+    """
+    arquivo, usados, quantidade = io.BytesIO(), set(), 0
+    with zipfile.ZipFile(arquivo, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nota in iterar_notas_completas(cliente, user_id, ids):
+            zf.writestr(_nome_arquivo(nota["title"], usados), nota["content"] or "")
+            quantidade += 1
+    return arquivo.getvalue(), quantidade
@@ -0,0 +1,157 @@
+"""Portão global das chamadas ao Gemini: concorrência adaptativa (AIMD), fila justa entre usuários e novas tentativas."""
+from collections import OrderedDict, deque
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CONCORRENCIA_INICIAL = 8
+CONCORRENCIA_MINIMA = 1
+CONCORRENCIA_MAXIMA = 32
+FATOR_REDUCAO = 0.5  # Corte multiplicativo a cada limitação (429) observada
+INTERVALO_REDUCAO = 1.0  # segundos: várias limitações seguidas contam como uma só
+MAX_TENTATIVAS = 5
+ESPERA_BASE = 1.0  # segundos; o teto da espera dobra a cada tentativa
+ESPERA_MAXIMA = 30.0
+
+
+def erros_retentaveis():
+    """(erros que indicam limitação de taxa, todos os erros que valem nova tentativa) do google.api_core."""
+    from google.api_core import exceptions as google_exceptions  # Importado só na primeira falha
+    limitacao = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+    transitorios = (google_exceptions.InternalServerError, google_exceptions.ServiceUnavailable,
+                    google_exceptions.DeadlineExceeded, google_exceptions.GatewayTimeout)
+    return limitacao, limitacao + transitorios
+
+
+class PortaoGemini:
+    """Limita as chamadas simultâneas ao Gemini no processo todo.
+
+    O limite segue AIMD: cresce de forma aditiva (cerca de +1 a cada `limite`
+    sucessos) e cai pela metade quando a API responde com limitação de taxa.
+    Quem espera fica numa fila por usuário, e as vagas são distribuídas em
+    rodízio entre os usuários, então uma sessão com muitas chamadas não atrasa
+    as demais. Registra espera na fila, retentativas e limitações.
+    """
+
+    def __init__(self, inicial=CONCORRENCIA_INICIAL, minimo=CONCORRENCIA_MINIMA, maximo=CONCORRENCIA_MAXIMA,
+                 fator_reducao=FATOR_REDUCAO, intervalo_reducao=INTERVALO_REDUCAO, relogio=time.monotonic):
+        self.limite, self.minimo, self.maximo = float(inicial), minimo, maximo
+        self.fator_reducao, self.intervalo_reducao, self.relogio = fator_reducao, intervalo_reducao, relogio
+        self.em_uso, self.retentativas, self.limitacoes, self.chamadas = 0, 0, 0, 0
+        self._ultima_reducao = float("-inf")
+        self._filas = OrderedDict()  # usuario -> deque de pedidos; a ordem é o rodízio
+        self._esperas = deque(maxlen=1000)
+        self._condicao = threading.Condition()
+
+    def _distribuir(self):
+        """Libera pedidos em rodízio entre os usuários enquanto houver vaga. Chamado com a condição travada."""
+        while self._filas and self.em_uso < int(self.limite):
+            usuario, fila = next(iter(self._filas.items()))
+            pedido = fila.popleft()
+            self._filas.pop(usuario)
+            if fila: self._filas[usuario] = fila  # Volta para o fim do rodízio
+            pedido["liberado"] = True
+            self.em_uso += 1
+        self._condicao.notify_all()
+
+    def adquirir(self, usuario):
+        """Bloqueia até haver vaga para o usuário. Retorna os segundos de espera."""
+        inicio, pedido = time.perf_counter(), {"liberado": False}
+        with self._condicao:
+            self._filas.setdefault(usuario, deque()).append(pedido)
+            self._distribuir()
+            while not pedido["liberado"]: self._condicao.wait()
+            espera = time.perf_counter() - inicio
+            self._esperas.append(espera)
+            self.chamadas += 1
+        return espera
+
+    def liberar(self, sucesso=True):
+        with self._condicao:
+            self.em_uso -= 1
+            if sucesso: self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self._distribuir()
+
+    def registrar_limitacao(self):
+        """A API respondeu 429: reduz o limite (no máximo uma vez por `intervalo_reducao`)."""
+        with self._condicao:
+            self.limitacoes += 1
+            agora = self.relogio()
+            if agora - self._ultima_reducao < self.intervalo_reducao: return
+            self._ultima_reducao = agora
+            self.limite = max(self.minimo, self.limite * self.fator_reducao)
+            logger.warning("Gemini limitou a taxa; concorrência reduzida para %d", int(self.limite))
+
+    def registrar_retentativa(self):
+        with self._condicao: self.retentativas += 1
+
+    def estatisticas(self):
+        with self._condicao:
+            esperas = sorted(self._esperas)
+            na_fila = sum(len(fila) for fila in self._filas.values())
+            return {"limite": int(self.limite), "em_uso": self.em_uso, "na_fila": na_fila, "chamadas": self.chamadas,
+                    "retentativas": self.retentativas, "limitacoes": self.limitacoes,
+                    "espera_p50": esperas[len(esperas) // 2] if esperas else None,
+                    "espera_p95": esperas[min(len(esperas) - 1, int(len(esperas) * 0.95))] if esperas else None}
+
+
+class ModeloComPortao:
+    """Repassa as chamadas ao modelo passando pelo portão, com novas tentativas e espera exponencial com jitter.
+
+    Erros retentáveis (limitação de taxa e 5xx transitórios) são repetidos até
+    `max_tentativas` vezes, esperando um tempo aleatório entre zero e
+    min(`espera_maxima`, `espera_base` * 2^tentativa). No stream, só é repetida
+    uma falha que acontece antes do primeiro trecho.
+    """
+
+    def __init__(self, modelo, portao, usuario, max_tentativas=MAX_TENTATIVAS, espera_base=ESPERA_BASE,
+                 espera_maxima=ESPERA_MAXIMA, erros=None, aleatorio=random.uniform, dormir=time.sleep):
+        self._modelo, self._portao, self.usuario = modelo, portao, usuario
+        self.max_tentativas, self.espera_base, self.espera_maxima = max_tentativas, espera_base, espera_maxima
+        self._erros, self._aleatorio, self._dormir = erros, aleatorio, dormir
+
+    def _tratar_falha(self, erro, tentativa):
+        """Decide se a falha será repetida; se sim, espera antes de retornar."""
+        limitacao, retentaveis = self._erros or erros_retentaveis()
+        if isinstance(erro, limitacao): self._portao.registrar_limitacao()
+        if not isinstance(erro, retentaveis) or tentativa == self.max_tentativas - 1: return False
+        self._portao.registrar_retentativa()
+        espera = self._aleatorio(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+        logger.info("Chamada ao Gemini falhou (%s); nova tentativa em %.1f s", type(erro).__name__, espera)
+        self._dormir(espera)
+        return True
+
+    def generate_content(self, conteudo, *args, stream=False, **kwargs):
+        if stream: return self._stream(conteudo, *args, **kwargs)
+        for tentativa in range(self.max_tentativas):
+            self._portao.adquirir(self.usuario)
+            try:
+                resposta = self._modelo.generate_content(conteudo, *args, **kwargs)
+            except Exception as e:
+                self._portao.liberar(sucesso=False)
+                if not self._tratar_falha(e, tentativa): raise
+                continue
+            self._portao.liberar()
+            return resposta
+
+    def _stream(self, conteudo, *args, **kwargs):
+        for tentativa in range(self.max_tentativas):
+            self._portao.adquirir(self.usuario)
+            entregou, falha = False, None
+            try:
+                for trecho in self._modelo.generate_content(conteudo, *args, stream=True, **kwargs):
+                    entregou = True
+                    yield trecho
+            except Exception as e:
+                falha = e
+            finally:
+                # Também roda quando o consumidor abandona o stream no meio
+                self._portao.liberar(sucesso=falha is None)
+            if falha is None: return
+            if entregou or not self._tratar_falha(falha, tentativa): raise falha
+
+    def __getattr__(self, nome):
+        return getattr(self._modelo, nome)
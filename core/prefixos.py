@@ -0,0 +1,189 @@
+"""Cache de prefixos de prompt: registra um documento uma vez e o reaproveita em todos os turnos."""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timedelta
+
+from core.extracao import CARACTERES_POR_TOKEN
+
+logger = logging.getLogger(__name__)
+
+TTL_PREFIXO = 60 * 60  # segundos
+MAX_PREFIXOS = 32
+MIN_TOKENS_PREFIXO = 1024  # Abaixo disso a API não aceita cache explícito
+
+
+class BackendGemini:
+    """Usa o cached content da API do Gemini."""
+
+    def criar(self, modelo, system_instruction, ttl):
+        import google.generativeai as genai
+        return genai.caching.CachedContent.create(model=modelo, system_instruction=system_instruction, ttl=timedelta(seconds=ttl))
+
+    def modelo(self, handle):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(handle)
+
+    def modelo_sem_cache(self, modelo, system_instruction):
+        import google.generativeai as genai
+        return genai.GenerativeModel(modelo, system_instruction=system_instruction)
+
+    def renovar(self, handle, ttl):
+        handle.update(ttl=timedelta(seconds=ttl))
+
+    def excluir(self, handle):
+        handle.delete()
+
+
+class BackendFalso:
+    """Backend local para testes e medições: conta os tokens que seriam enviados à API."""
+
+    def __init__(self, fabrica_modelo):
+        self.fabrica_modelo = fabrica_modelo  # fabrica_modelo(system_instruction) -> modelo
+        self.criados, self.excluidos, self.renovados, self.tokens_enviados = 0, 0, 0, 0
+
+    def criar(self, modelo, system_instruction, ttl):
+        self.criados += 1
+        self.tokens_enviados += len(system_instruction) // CARACTERES_POR_TOKEN
+        return {"modelo": modelo, "system_instruction": system_instruction}
+
+    def modelo(self, handle):
+        return self.fabrica_modelo(handle["system_instruction"])
+
+    def modelo_sem_cache(self, modelo, system_instruction):
+        return self.fabrica_modelo(system_instruction)
+
+    def renovar(self, handle, ttl):
+        self.renovados += 1
+
+    def excluir(self, handle):
+        self.excluidos += 1
+
+
+class _ModeloComPrefixo:
+    """Modelo de um documento em cache que resolve o prefixo a cada chamada.
+
+    Nada é enviado ao backend até a primeira chamada, então abrir um resultado
+    sem conversar não registra o documento. O handle não fica preso ao chat: se
+    o prefixo expirou ou foi despejado por outras sessões, a próxima chamada
+    registra o documento de novo.
+    """
+
+    def __init__(self, cache, modelo, system_instruction, chave, tokens_prefixo):
+        self._cache, self._modelo, self._system_instruction, self._chave, self._tokens_prefixo = cache, modelo, system_instruction, chave, tokens_prefixo
+        self._primeira_chamada = True
+
+    def generate_content(self, *args, **kwargs):
+        modelo, em_cache = self._cache._resolver(self._modelo, self._system_instruction, self._chave, self._tokens_prefixo, contar_reuso=self._primeira_chamada)
+        self._primeira_chamada = False
+        if em_cache: self._cache._contabilizar_turno(self._tokens_prefixo)
+        return modelo.generate_content(*args, **kwargs)
+
+    def __getattr__(self, nome):
+        # Atributos não justificam um registro no backend: vêm do modelo comum, que é local
+        return getattr(self._cache.backend.modelo_sem_cache(self._modelo, self._system_instruction), nome)
+
+
+class CachePrefixos:
+    """Registro, compartilhado pelo processo, de prefixos em cache indexados pelo hash do conteúdo.
+
+    Entradas expiram após `ttl` segundos sem uso: cada reutilização na segunda
+    metade do prazo renova o TTL também no backend. Acima de `max_entradas`, as
+    menos usadas são removidas do backend. O registro de um documento acontece
+    fora do lock, e sessões que pedem o mesmo documento ao mesmo tempo esperam
+    um único registro. Prefixos curtos ou falhas do backend recaem num modelo
+    comum com `system_instruction`.
+    """
+
+    def __init__(self, backend, ttl=TTL_PREFIXO, max_entradas=MAX_PREFIXOS, min_tokens=MIN_TOKENS_PREFIXO, relogio=time.time):
+        self.backend, self.ttl, self.max_entradas, self.min_tokens, self.relogio = backend, ttl, max_entradas, min_tokens, relogio
+        self._entradas = OrderedDict()  # chave -> (handle, expira_em, tokens)
+        self._em_andamento = {}  # chave -> Future com o handle sendo registrado
+        self._lock = threading.Lock()
+        self.registros = self.reutilizacoes = self.renovacoes = self.turnos = self.tokens_economizados = 0
+
+    def modelo_para(self, modelo, system_instruction):
+        """Modelo que referencia o prefixo em cache; o registro acontece na primeira chamada."""
+        tokens = len(system_instruction) // CARACTERES_POR_TOKEN
+        if tokens < self.min_tokens:
+            return self.backend.modelo_sem_cache(modelo, system_instruction)
+        chave = hashlib.sha256(f"{modelo}\0{system_instruction}".encode("utf-8")).hexdigest()
+        return _ModeloComPrefixo(self, modelo, system_instruction, chave, tokens)
+
+    def _resolver(self, modelo, system_instruction, chave, tokens, contar_reuso=False):
+        """(modelo, está em cache) para o prefixo, renovando ou registrando de novo se preciso."""
+        renovar = None
+        with self._lock:
+            entrada, agora = self._entradas.get(chave), self.relogio()
+            if entrada and entrada[1] <= agora:
+                self._entradas.pop(chave)  # O backend já descartou o prefixo
+                entrada = None
+            if entrada:
+                if contar_reuso: self.reutilizacoes += 1
+                self._entradas.move_to_end(chave)
+                if entrada[1] - agora < self.ttl / 2:
+                    self._entradas[chave] = (entrada[0], agora + self.ttl, tokens)
+                    self.renovacoes += 1
+                    renovar = entrada[0]
+        handle = entrada[0] if entrada else None
+        if renovar is not None:
+            try: self.backend.renovar(renovar, self.ttl)
+            except Exception:
+                logger.exception("Falha ao renovar o prefixo em cache; registrando de novo")
+                with self._lock:
+                    if self._entradas.get(chave, (None,))[0] is renovar: self._entradas.pop(chave)
+                handle = None
+        if handle is None: handle = self._registrar_compartilhado(modelo, system_instruction, chave, tokens)
+        if handle is None: return self.backend.modelo_sem_cache(modelo, system_instruction), False
+        return self.backend.modelo(handle), True
+
+    def _registrar_compartilhado(self, modelo, system_instruction, chave, tokens):
+        """Registra o prefixo no backend sem segurar o lock; quem chega durante o registro espera o mesmo resultado."""
+        with self._lock:
+            if (entrada := self._entradas.get(chave)) and entrada[1] > self.relogio(): return entrada[0]
+            futuro, dono = self._em_andamento.get(chave), False
+            if futuro is None:
+                futuro, dono = Future(), True
+                self._em_andamento[chave] = futuro
+        if not dono: return futuro.result()
+        excluir = []
+        try:
+            handle = self.backend.criar(modelo, system_instruction, self.ttl)
+            with self._lock:
+                self._entradas[chave] = (handle, self.relogio() + self.ttl, tokens)
+                self.registros += 1
+                excluir = self._despejar()
+        except Exception:
+            logger.exception("Falha ao registrar o prefixo em cache; usando o modelo sem cache")
+            handle = None
+        finally:
+            with self._lock: self._em_andamento.pop(chave, None)
+            futuro.set_result(handle)
+        for antigo in excluir:
+            try: self.backend.excluir(antigo)
+            except Exception: logger.exception("Falha ao excluir prefixo em cache")
+        return handle
+
+    def _despejar(self):
+        """Remove as entradas expiradas e as excedentes. Retorna os handles a excluir no backend, fora do lock."""
+        agora = self.relogio()
+        for chave in [c for c, (_, expira_em, _) in self._entradas.items() if expira_em <= agora]:
+            self._entradas.pop(chave)  # Expirados já foram descartados pelo backend
+        excluir = []
+        while len(self._entradas) > self.max_entradas:
+            _, (handle, _, _) = self._entradas.popitem(last=False)
+            excluir.append(handle)
+        return excluir
+
+    def _contabilizar_turno(self, tokens_prefixo):
+        with self._lock:
+            self.turnos += 1
+            self.tokens_economizados += tokens_prefixo
+
+    def estatisticas(self):
+        with self._lock:
+            return {"entradas": len(self._entradas), "registros": self.registros, "reutilizacoes": self.reutilizacoes,
+                    "renovacoes": self.renovacoes, "turnos": self.turnos, "tokens_economizados": self.tokens_economizados}
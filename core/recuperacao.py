@@ -0,0 +1,125 @@
+"""Recuperação de trechos relevantes para o chat multi-documentos."""
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+from core.chat import ChatLimitado
+
+TAMANHO_TRECHO = 1500  # caracteres
+SOBREPOSICAO_TRECHO = 200
+STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das em no na nos nas por para com sem que se e ou ao aos "
+    "the of and to in is are for on with it this that".split()
+)
+
+
+def tokenizar(texto):
+    """Minúsculas, sem acentos e sem stopwords."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [termo for termo in re.findall(r"\w+", texto) if termo not in STOPWORDS]
+
+
+def dividir_em_trechos(texto, fonte, inicios_paginas=None, tamanho=TAMANHO_TRECHO, sobreposicao=SOBREPOSICAO_TRECHO):
+    """Divide o texto em trechos sobrepostos, cortando em espaços, com fonte e página de início."""
+    trechos, inicio, n = [], 0, len(texto)
+    while inicio < n:
+        fim = min(inicio + tamanho, n)
+        if fim < n:
+            corte = max(texto.rfind(" ", inicio + tamanho // 2, fim), texto.rfind("\n", inicio + tamanho // 2, fim))
+            if corte != -1: fim = corte
+        conteudo = texto[inicio:fim].strip()
+        if conteudo:
+            pagina = bisect_right(inicios_paginas, inicio) if inicios_paginas else None
+            trechos.append({"fonte": fonte, "pagina": pagina, "texto": conteudo})
+        if fim >= n: break
+        inicio = max(fim - sobreposicao, inicio + 1)
+    return trechos
+
+
+def dividir_documentos(resultados, **kwargs):
+    """Trechos de todos os documentos extraídos com sucesso por `extrair_documentos`."""
+    trechos = []
+    for resultado in resultados:
+        if resultado["erro"] is None:
+            trechos.extend(dividir_em_trechos(resultado["texto"], resultado["nome"], resultado.get("inicios_paginas"), **kwargs))
+    return trechos
+
+
+class IndiceBM25:
+    """Índice invertido em memória com ranqueamento BM25."""
+
+    def __init__(self, trechos, k1=1.5, b=0.75):
+        self.trechos, self.k1, self.b = trechos, k1, b
+        self.postings = defaultdict(list)  # termo -> [(id_trecho, frequencia)]
+        self.tamanhos = []
+        for i, trecho in enumerate(trechos):
+            termos = tokenizar(trecho["texto"])
+            self.tamanhos.append(len(termos))
+            for termo, frequencia in Counter(termos).items():
+                self.postings[termo].append((i, frequencia))
+        self.tamanho_medio = (sum(self.tamanhos) / len(self.tamanhos)) if self.tamanhos else 1.0
+
+    def buscar(self, consulta, k=5):
+        """Retorna até k pares (trecho, pontuação), do mais ao menos relevante."""
+        total, pontuacoes = len(self.trechos), defaultdict(float)
+        for termo in set(tokenizar(consulta)):
+            postings = self.postings.get(termo)
+            if not postings: continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, frequencia in postings:
+                normalizacao = self.k1 * (1 - self.b + self.b * self.tamanhos[i] / self.tamanho_medio)
+                pontuacoes[i] += idf * frequencia * (self.k1 + 1) / (frequencia + normalizacao)
+        melhores = heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
+        return [(self.trechos[i], pontuacao) for i, pontuacao in melhores]
+
+
+class BuscaHibrida:
+    """Combina vários índices (ex.: BM25 e vetorial) por Reciprocal Rank Fusion."""
+
+    def __init__(self, *indices, k_rrf=60):
+        self.indices, self.k_rrf = indices, k_rrf
+
+    def buscar(self, consulta, k=5):
+        pontuacoes, trechos = defaultdict(float), {}
+        for indice in self.indices:
+            for posicao, (trecho, _) in enumerate(indice.buscar(consulta, 2 * k), start=1):
+                chave = (trecho["fonte"], trecho.get("pagina"), trecho["texto"])
+                trechos[chave] = trecho
+                pontuacoes[chave] += 1 / (self.k_rrf + posicao)
+        melhores = heapq.nlargest(k, pontuacoes.items(), key=lambda item: item[1])
+        return [(trechos[chave], pontuacao) for chave, pontuacao in melhores]
+
+
+def citacao(trecho):
+    return f"{trecho['fonte']}, p. {trecho['pagina']}" if trecho.get("pagina") else trecho["fonte"]
+
+
+def montar_prompt_com_trechos(pergunta, encontrados):
+    """Prompt com os trechos numerados e a fonte de cada um."""
+    if not encontrados:
+        return f"Nenhum trecho dos documentos corresponde à pergunta. Diga isso ao usuário se não puder respondê-la.\n\nPergunta: {pergunta}"
+    contexto = "\n\n".join(f"[{i}] ({citacao(trecho)})\n{trecho['texto']}" for i, (trecho, _) in enumerate(encontrados, start=1))
+    return (
+        "Use apenas os trechos abaixo para responder e cite as fontes entre colchetes, por exemplo [arquivo.pdf, p. 3].\n\n"
+        f"Trechos:\n{contexto}\n\nPergunta: {pergunta}"
+    )
+
+
+class ChatComRecuperacao(ChatLimitado):
+    """Chat que envia a cada turno só os trechos mais relevantes, em vez de todo o corpus.
+
+    O histórico guarda apenas as perguntas e respostas, sem os trechos.
+    """
+
+    def __init__(self, model, indice, k=6, **kwargs):
+        super().__init__(model, **kwargs)
+        self.indice, self.k, self.ultimas_fontes = indice, k, []
+
+    def _preparar(self, mensagem):
+        encontrados = self.indice.buscar(mensagem, self.k)
+        self.ultimas_fontes = list(dict.fromkeys(citacao(trecho) for trecho, _ in encontrados))
+        return montar_prompt_com_trechos(mensagem, encontrados)
@@ -0,0 +1,125 @@
+"""Execução de tarefas demoradas (análises, ingestão) fora da thread do script do Streamlit."""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_TRABALHADORES = 4
+MAX_TAREFAS_CONCLUIDAS = 32  # Terminadas e não recolhidas (a página foi fechada); as mais antigas saem primeiro
+
+NA_FILA, EXECUTANDO, CONCLUIDA, FALHOU = "na_fila", "executando", "concluida", "falhou"
+
+
+class Tarefa:
+    """Estado de uma tarefa. `progresso` é atualizado pela própria tarefa e lido pela página."""
+
+    def __init__(self, sessao, tipo, chave):
+        self.sessao, self.tipo, self.chave = sessao, tipo, chave
+        self.estado, self.resultado, self.erro, self.progresso = NA_FILA, None, None, {}
+        self.criada_em, self.iniciada_em, self.concluida_em = time.time(), None, None
+
+    @property
+    def terminada(self):
+        return self.estado in (CONCLUIDA, FALHOU)
+
+    def informar_progresso(self, **dados):
+        self.progresso = {**self.progresso, **dados}
+
+    @property
+    def espera(self):
+        """Segundos na fila até começar a executar."""
+        return (self.iniciada_em or time.time()) - self.criada_em
+
+    @property
+    def duracao(self):
+        """Segundos de execução (até agora, se ainda estiver rodando)."""
+        return None if self.iniciada_em is None else (self.concluida_em or time.time()) - self.iniciada_em
+
+
+class ExecutorTarefas:
+    """Pool limitado de threads com uma tabela de tarefas por (sessão, tipo, chave de conteúdo).
+
+    Enviar de novo a mesma tarefa (depois de um rerun, de uma reconexão ou de
+    navegar entre páginas) devolve a que já existe, inclusive se ela falhou,
+    em vez de recomeçar o trabalho. A página consulta o estado sem bloquear e,
+    quando a tarefa termina, recolhe o resultado (ou o erro) com `recolher`,
+    que também a tira da tabela: só depois disso um novo envio executa o
+    trabalho outra vez, e o executor não guarda o que já foi copiado para a sessão.
+    """
+
+    def __init__(self, max_trabalhadores=MAX_TRABALHADORES, max_concluidas=MAX_TAREFAS_CONCLUIDAS):
+        self.max_concluidas = max_concluidas
+        self._pool = ThreadPoolExecutor(max_workers=max_trabalhadores, thread_name_prefix="tarefa")
+        self._lock = threading.Lock()
+        self._tarefas = {}  # (sessao, tipo, chave) -> Tarefa
+
+    def enviar(self, sessao, tipo, chave, funcao):
+        """Agenda `funcao(tarefa)` e retorna a Tarefa; o valor retornado vira `tarefa.resultado`."""
+        with self._lock:
+            tarefa = self._tarefas.get((sessao, tipo, chave))
+            if tarefa is not None: return tarefa  # Mesmo com falha: a página precisa ver o erro antes de tentar de novo
+            tarefa = self._tarefas[(sessao, tipo, chave)] = Tarefa(sessao, tipo, chave)
+            self._despejar()
+        self._pool.submit(self._executar, tarefa, funcao)
+        return tarefa
+
+    def _executar(self, tarefa, funcao):
+        tarefa.estado, tarefa.iniciada_em = EXECUTANDO, time.time()
+        try:
+            tarefa.resultado = funcao(tarefa)
+            tarefa.estado = CONCLUIDA
+        except Exception as e:
+            logger.exception("Tarefa %s falhou", tarefa.tipo)
+            tarefa.erro, tarefa.estado = e, FALHOU
+        finally:
+            tarefa.concluida_em = time.time()
+
+    def _despejar(self):
+        concluidas = sorted((t for t in self._tarefas.values() if t.terminada), key=lambda t: t.concluida_em)
+        for tarefa in concluidas[:max(0, len(concluidas) - self.max_concluidas)]:
+            del self._tarefas[(tarefa.sessao, tarefa.tipo, tarefa.chave)]
+
+    def obter(self, sessao, tipo, chave):
+        """A tarefa, se existir. Não bloqueia."""
+        with self._lock: return self._tarefas.get((sessao, tipo, chave))
+
+    def recolher(self, tarefa):
+        """Tira da tabela uma tarefa terminada e devolve o resultado, que o executor deixa de guardar.
+
+        Enviar a mesma tarefa depois disso executa o trabalho de novo.
+        """
+        with self._lock:
+            if self._tarefas.get((tarefa.sessao, tarefa.tipo, tarefa.chave)) is tarefa:
+                del self._tarefas[(tarefa.sessao, tarefa.tipo, tarefa.chave)]
+        resultado, tarefa.resultado = tarefa.resultado, None
+        return resultado
+
+    def descartar(self, sessao, tipo, chave):
+        """Remove a tarefa da tabela; se ainda estiver rodando, o resultado é ignorado."""
+        with self._lock: self._tarefas.pop((sessao, tipo, chave), None)
+
+    def estatisticas(self):
+        """Profundidade da fila e latências (espera na fila e execução) das tarefas na tabela, por tipo."""
+        with self._lock: tarefas = list(self._tarefas.values())
+        por_tipo = {}
+        for tarefa in tarefas: por_tipo.setdefault(tarefa.tipo, []).append(tarefa)
+        resumo = []
+        for tipo, lista in sorted(por_tipo.items()):
+            duracoes = sorted(t.duracao for t in lista if t.terminada)
+            esperas = sorted(t.espera for t in lista if t.iniciada_em is not None)
+            resumo.append({
+                "tipo": tipo, "na_fila": sum(t.estado == NA_FILA for t in lista), "executando": sum(t.estado == EXECUTANDO for t in lista),
+                "concluidas": sum(t.estado == CONCLUIDA for t in lista), "falhas": sum(t.estado == FALHOU for t in lista),
+                "espera_p50": _percentil(esperas, 50), "duracao_p50": _percentil(duracoes, 50), "duracao_p95": _percentil(duracoes, 95),
+            })
+        return resumo
+
+    def encerrar(self, esperar=True):
+        self._pool.shutdown(wait=esperar)
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados: return None
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(len(valores_ordenados) * p / 100))]
@@ -0,0 +1,179 @@
+"""Serviço de transcrições do YouTube com cache persistente, limite de taxa global e backoff."""
+from concurrent.futures import Future
+from contextlib import contextmanager
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+IDIOMAS_PADRAO = ("pt", "en")
+REQUISICOES_POR_MINUTO = 20  # Para todas as sessões do processo
+RAJADA_MAXIMA = 5
+MAX_TENTATIVAS = 4
+ESPERA_BASE = 2.0  # segundos; dobra a cada tentativa
+ESPERA_MAXIMA = 30.0
+
+_PADRAO_ID = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})")
+
+
+class MuitasRequisicoes(Exception):
+    """O YouTube recusou a requisição por excesso de acessos ou bloqueio temporário."""
+
+
+class TranscricaoIndisponivel(Exception):
+    """O vídeo não tem legendas nos idiomas pedidos, ou elas estão desativadas."""
+
+
+def extrair_id_video(url):
+    """ID de 11 caracteres a partir dos formatos comuns de URL do YouTube (ou do próprio ID)."""
+    url = (url or "").strip()
+    if re.fullmatch(r"[A-Za-z0-9_-]{11}", url): return url
+    encontrado = _PADRAO_ID.search(url)
+    return encontrado.group(1) if encontrado else None
+
+
+class BaldeDeFichas:
+    """Limitador de taxa token bucket: `taxa` fichas por segundo, acumulando até `capacidade`."""
+
+    def __init__(self, taxa, capacidade, relogio=time.monotonic, dormir=time.sleep):
+        self.taxa, self.capacidade, self.relogio, self.dormir = taxa, capacidade, relogio, dormir
+        self.fichas, self.atualizado_em = float(capacidade), relogio()
+        self._lock = threading.Lock()
+
+    def _reservar(self):
+        """Consome uma ficha, se houver. Retorna quantos segundos faltam para a próxima."""
+        with self._lock:
+            agora = self.relogio()
+            self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado_em) * self.taxa)
+            self.atualizado_em = agora
+            if self.fichas >= 1:
+                self.fichas -= 1
+                return 0.0
+            return (1 - self.fichas) / self.taxa
+
+    def adquirir(self):
+        """Bloqueia até haver uma ficha disponível. Retorna o tempo total de espera."""
+        esperado = 0.0
+        while (espera := self._reservar()) > 0:
+            self.dormir(espera)
+            esperado += espera
+        return esperado
+
+
+class CacheTranscricoes:
+    """Transcrições em SQLite, por ID do vídeo e lista de idiomas pedidos."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        if os.path.dirname(caminho): os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with self._conectar() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS transcricoes (video_id TEXT, idiomas TEXT, texto TEXT, criado_em REAL, PRIMARY KEY (video_id, idiomas))")
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con: yield con
+        finally: con.close()
+
+    def obter(self, video_id, idiomas):
+        with self._lock, self._conectar() as con:
+            linha = con.execute("SELECT texto FROM transcricoes WHERE video_id = ? AND idiomas = ?", (video_id, ",".join(idiomas))).fetchone()
+        return linha[0] if linha else None
+
+    def guardar(self, video_id, idiomas, texto):
+        with self._lock, self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO transcricoes VALUES (?, ?, ?, ?)", (video_id, ",".join(idiomas), texto, time.time()))
+
+
+class ProvedorYouTube:
+    """Busca a transcrição com o youtube-transcript-api, traduzindo os erros da biblioteca."""
+
+    def __init__(self, http_client=None):
+        from youtube_transcript_api import YouTubeTranscriptApi  # Só é carregado quando há vídeo para transcrever
+        self.api = YouTubeTranscriptApi(http_client=http_client)
+
+    def buscar(self, video_id, idiomas):
+        from youtube_transcript_api import NoTranscriptFound, RequestBlocked, TranscriptsDisabled, YouTubeRequestFailed
+        try:
+            transcricao = self.api.fetch(video_id, languages=list(idiomas))
+        except (TranscriptsDisabled, NoTranscriptFound) as e:
+            raise TranscricaoIndisponivel(str(e)) from e
+        except RequestBlocked as e:
+            raise MuitasRequisicoes(str(e)) from e
+        except YouTubeRequestFailed as e:
+            if "429" in e.reason or "Too Many Requests" in e.reason: raise MuitasRequisicoes(e.reason) from e
+            raise
+        return " ".join(trecho.text for trecho in transcricao)
+
+
+class ProvedorFalso:
+    """Provedor local para testes: responde de um dicionário e simula bloqueios e latência."""
+
+    def __init__(self, transcricoes, falhas_429=0, atraso=0.0):
+        self.transcricoes, self.falhas_429, self.atraso = transcricoes, falhas_429, atraso
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def buscar(self, video_id, idiomas):
+        with self._lock:
+            self.chamadas += 1
+            if self.falhas_429 > 0:
+                self.falhas_429 -= 1
+                raise MuitasRequisicoes("429 Too Many Requests")
+        if self.atraso: time.sleep(self.atraso)
+        if video_id not in self.transcricoes: raise TranscricaoIndisponivel(video_id)
+        return self.transcricoes[video_id]
+
+
+class ServicoTranscricoes:
+    """Entrega transcrições do cache ou do provedor, respeitando o limite de taxa global.
+
+    Um "Too Many Requests" é repetido com espera exponencial (`espera_base`,
+    dobrando até `espera_maxima`) por até `max_tentativas` vezes. Pedidos
+    simultâneos do mesmo vídeo compartilham uma única busca.
+    """
+
+    def __init__(self, provedor, cache=None, balde=None, max_tentativas=MAX_TENTATIVAS, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA, dormir=time.sleep):
+        self.provedor, self.cache, self.dormir = provedor, cache, dormir
+        self.balde = balde or BaldeDeFichas(REQUISICOES_POR_MINUTO / 60, RAJADA_MAXIMA)
+        self.max_tentativas, self.espera_base, self.espera_maxima = max_tentativas, espera_base, espera_maxima
+        self._lock = threading.Lock()
+        self._em_andamento = {}  # (video_id, idiomas) -> Future
+
+    def _buscar_com_backoff(self, video_id, idiomas):
+        for tentativa in range(self.max_tentativas):
+            self.balde.adquirir()
+            try:
+                return self.provedor.buscar(video_id, idiomas)
+            except MuitasRequisicoes:
+                if tentativa == self.max_tentativas - 1: raise
+                espera = min(self.espera_maxima, self.espera_base * 2 ** tentativa)
+                logger.warning("YouTube recusou a transcrição de %s; nova tentativa em %.1f s", video_id, espera)
+                self.dormir(espera)
+
+    def obter(self, video_id, idiomas=IDIOMAS_PADRAO):
+        """Texto da transcrição do vídeo. Pode levantar MuitasRequisicoes ou TranscricaoIndisponivel."""
+        idiomas = tuple(idiomas)
+        if self.cache and (texto := self.cache.obter(video_id, idiomas)) is not None: return texto
+        chave = (video_id, idiomas)
+        with self._lock:
+            futuro, dono = self._em_andamento.get(chave), False
+            if futuro is None:
+                futuro, dono = Future(), True
+                self._em_andamento[chave] = futuro
+        if not dono: return futuro.result()
+        try:
+            texto = self._buscar_com_backoff(video_id, idiomas)
+            if self.cache: self.cache.guardar(video_id, idiomas, texto)
+            futuro.set_result(texto)
+        except Exception as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock: self._em_andamento.pop(chave, None)
+        return futuro.result()
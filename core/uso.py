@@ -0,0 +1,167 @@
+"""Registro de uso do Gemini por chamada: latência, tokens e cotas diárias por usuário."""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from core.extracao import CARACTERES_POR_TOKEN
+
+LIMITE_TOKENS_DIARIO = 2_000_000  # Por usuário; None desativa a cota
+TAMANHO_LOTE = 20  # Registros acumulados antes de gravar no disco
+INTERVALO_GRAVACAO = 10.0  # segundos
+
+
+class CotaExcedida(Exception):
+    """A cota diária de tokens do usuário foi atingida."""
+
+
+def estimar_tokens_entrada(conteudo):
+    """Estimativa dos tokens de um prompt em texto ou lista de mensagens {"role", "parts"}."""
+    if isinstance(conteudo, str): return len(conteudo) // CARACTERES_POR_TOKEN
+    total = 0
+    for item in conteudo or []:
+        partes = item.get("parts", []) if isinstance(item, dict) else [item]
+        total += sum(len(p) for p in partes if isinstance(p, str))
+    return total // CARACTERES_POR_TOKEN
+
+
+class RegistroUso:
+    """Livro-razão das chamadas ao modelo, gravado em SQLite em lotes.
+
+    Uma instância é compartilhada pelo processo. O consumo do dia de cada
+    usuário fica em memória para que a cota seja verificada antes de cada
+    requisição, sem consultar o disco; só o dia corrente é mantido.
+    """
+
+    def __init__(self, caminho, limite_tokens_diario=LIMITE_TOKENS_DIARIO, tamanho_lote=TAMANHO_LOTE, intervalo=INTERVALO_GRAVACAO):
+        self.caminho, self.limite_tokens_diario = caminho, limite_tokens_diario
+        self.tamanho_lote, self.intervalo = tamanho_lote, intervalo
+        self._pendentes, self._ultima_gravacao = [], time.monotonic()
+        self._consumo, self._dia_consumo = {}, ""  # usuario -> tokens em _dia_consumo
+        self._lock = threading.Lock()
+        if os.path.dirname(caminho): os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with self._conectar() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS chamadas (momento REAL, dia TEXT, usuario TEXT, modelo TEXT, tipo TEXT, "
+                "tokens_entrada INTEGER, tokens_saida INTEGER, latencia REAL, sucesso INTEGER)"
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_chamadas_usuario_dia ON chamadas (usuario, dia)")
+        atexit.register(self.gravar)
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with con: yield con
+        finally: con.close()
+
+    def _consumo_em(self, dia):
+        """Consumo em memória no dia dado; ao virar o dia, descarta o dos dias anteriores. Chamar com o lock."""
+        if dia > self._dia_consumo: self._consumo, self._dia_consumo = {}, dia
+        return self._consumo if dia == self._dia_consumo else {}
+
+    def consumo_do_dia(self, usuario):
+        dia = date.today().isoformat()
+        with self._lock:
+            consumo = self._consumo_em(dia)
+            if usuario not in consumo:
+                with self._conectar() as con:
+                    total = con.execute(
+                        "SELECT COALESCE(SUM(tokens_entrada + tokens_saida), 0) FROM chamadas WHERE usuario = ? AND dia = ?", (usuario, dia)
+                    ).fetchone()[0]
+                consumo[usuario] = total + sum(r[5] + r[6] for r in self._pendentes if r[2] == usuario and r[1] == dia)
+            return consumo[usuario]
+
+    def verificar_cota(self, usuario, tokens_previstos=0):
+        """Levanta CotaExcedida se a requisição ultrapassaria a cota diária do usuário."""
+        if self.limite_tokens_diario is None or usuario is None: return
+        if self.consumo_do_dia(usuario) + tokens_previstos > self.limite_tokens_diario:
+            raise CotaExcedida(f"Você atingiu o limite diário de {self.limite_tokens_diario} tokens. Tente novamente amanhã.")
+
+    def registrar(self, usuario, modelo, tipo, tokens_entrada, tokens_saida, latencia, sucesso=True):
+        momento, dia = time.time(), date.today().isoformat()
+        with self._lock:
+            self._pendentes.append((momento, dia, usuario, modelo, tipo, tokens_entrada or 0, tokens_saida or 0, latencia, int(sucesso)))
+            consumo = self._consumo_em(dia)
+            if usuario in consumo: consumo[usuario] += (tokens_entrada or 0) + (tokens_saida or 0)
+            gravar = len(self._pendentes) >= self.tamanho_lote or time.monotonic() - self._ultima_gravacao >= self.intervalo
+        if gravar: self.gravar()
+
+    def gravar(self):
+        """Grava no disco os registros pendentes."""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+            self._ultima_gravacao = time.monotonic()
+        if not pendentes: return
+        with self._conectar() as con:
+            con.executemany("INSERT INTO chamadas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", pendentes)
+
+    def resumo_por_tipo(self, desde=None):
+        """Latência p50/p95 e tokens gastos por funcionalidade, desde o instante `desde` (epoch)."""
+        self.gravar()
+        with self._conectar() as con:
+            linhas = con.execute(
+                "SELECT tipo, latencia, tokens_entrada, tokens_saida, sucesso FROM chamadas WHERE momento >= ?", (desde or 0,)
+            ).fetchall()
+        por_tipo = {}
+        for tipo, latencia, entrada, saida, sucesso in linhas:
+            por_tipo.setdefault(tipo, []).append((latencia, entrada, saida, sucesso))
+        resumo = []
+        import numpy as np  # Só o painel de administração usa; não carrega na tela de login
+        for tipo, chamadas in sorted(por_tipo.items()):
+            latencias = np.array([c[0] for c in chamadas])
+            resumo.append({
+                "tipo": tipo, "chamadas": len(chamadas), "falhas": sum(1 for c in chamadas if not c[3]),
+                "latencia_p50": float(np.percentile(latencias, 50)), "latencia_p95": float(np.percentile(latencias, 95)),
+                "tokens_entrada": sum(c[1] for c in chamadas), "tokens_saida": sum(c[2] for c in chamadas),
+            })
+        return resumo
+
+
+def _tokens_da_resposta(resposta):
+    uso = getattr(resposta, "usage_metadata", None)
+    return getattr(uso, "prompt_token_count", None), getattr(uso, "candidates_token_count", None)
+
+
+class ModeloRegistrado:
+    """Envolve um GenerativeModel: verifica a cota antes de enviar e registra cada chamada."""
+
+    def __init__(self, modelo, registro, usuario, tipo, nome_modelo=""):
+        self._modelo, self._registro = modelo, registro
+        self.usuario, self.tipo, self.nome_modelo = usuario, tipo, nome_modelo
+
+    def generate_content(self, conteudo, *args, stream=False, **kwargs):
+        tokens_previstos = estimar_tokens_entrada(conteudo)
+        self._registro.verificar_cota(self.usuario, tokens_previstos)
+        inicio = time.perf_counter()
+        try:
+            resposta = self._modelo.generate_content(conteudo, *args, stream=stream, **kwargs)
+        except Exception:
+            self._registrar(tokens_previstos, 0, inicio, sucesso=False)
+            raise
+        if stream: return self._acompanhar(resposta, tokens_previstos, inicio)
+        entrada, saida = _tokens_da_resposta(resposta)
+        self._registrar(entrada if entrada is not None else tokens_previstos, saida, inicio)
+        return resposta
+
+    def _acompanhar(self, resposta, tokens_previstos, inicio):
+        entrada = saida = None
+        sucesso = False
+        try:
+            for trecho in resposta:
+                # Os contadores chegam acumulados; o último trecho tem os totais
+                e, s = _tokens_da_resposta(trecho)
+                entrada, saida = (e, s) if e is not None else (entrada, saida)
+                yield trecho
+            sucesso = True
+        finally:
+            self._registrar(entrada if entrada is not None else tokens_previstos, saida, inicio, sucesso)
+
+    def _registrar(self, entrada, saida, inicio, sucesso=True):
+        self._registro.registrar(self.usuario, self.nome_modelo, self.tipo, entrada, saida, time.perf_counter() - inicio, sucesso)
+
+    def __getattr__(self, nome):
+        return getattr(self._modelo, nome)
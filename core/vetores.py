@@ -0,0 +1,172 @@
+"""Índice vetorial em NumPy para busca semântica de trechos, persistido em disco."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+from core.config import LIMITE_CARACTERES_EXTRACAO
+from core.extracao import VERSAO_EXTRATOR
+from core.recuperacao import SOBREPOSICAO_TRECHO, TAMANHO_TRECHO, tokenizar
+
+
+class EmbeddingHash:
+    """Vetorização local por hashing de palavras e n-gramas de caracteres.
+
+    Qualquer objeto com `nome`, `dimensoes` e `__call__(textos) -> ndarray (n, d)`
+    pode substituí-la (por exemplo, um modelo de embeddings local). Os n-gramas
+    aproximam variações da mesma palavra ("inflação", "inflacionário").
+    """
+
+    def __init__(self, dimensoes=1024, ngrama=4):
+        self.dimensoes, self.ngrama = dimensoes, ngrama
+        self.nome = f"hash-{dimensoes}-{ngrama}"
+
+    def _atributos(self, texto):
+        for termo in tokenizar(texto):
+            yield termo
+            marcado = f"<{termo}>"
+            for i in range(max(1, len(marcado) - self.ngrama + 1)):
+                yield marcado[i:i + self.ngrama]
+
+    def __call__(self, textos):
+        import numpy as np  # Carregado só quando há trechos a vetorizar; não na tela de login
+        matriz = np.zeros((len(textos), self.dimensoes), dtype=np.float32)
+        for linha, texto in enumerate(textos):
+            for atributo in self._atributos(texto):
+                h = zlib.crc32(atributo.encode("utf-8"))
+                # O bit de sinal reduz o viés das colisões
+                matriz[linha, h % self.dimensoes] += 1.0 if h & 0x80000000 else -1.0
+        # Frequência sublinear: termos repetidos não dominam o vetor
+        return np.sign(matriz) * np.log1p(np.abs(matriz))
+
+
+def _normalizar(matriz):
+    import numpy as np
+    matriz = np.asarray(matriz, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return np.ascontiguousarray(matriz / normas, dtype=np.float32)
+
+
+def chave_documentos(arquivos, embedding, textos=(), limite_caracteres=LIMITE_CARACTERES_EXTRACAO,
+                     tamanho_trecho=TAMANHO_TRECHO, sobreposicao=SOBREPOSICAO_TRECHO):
+    """Hash do conteúdo dos arquivos, na ordem enviada, e de tudo que muda os trechos indexados.
+
+    Além da função de embedding, entram a versão do extrator, o limite de
+    caracteres da extração e o tamanho e a sobreposição dos trechos: mudar
+    qualquer um deles gera outro índice em vez de reabrir um antigo. `textos`
+    são pares (nome, texto) de documentos que não vieram de arquivos, como
+    artigos da web.
+    """
+    parametros = [embedding.nome, VERSAO_EXTRATOR, limite_caracteres, tamanho_trecho, sobreposicao]
+    h = hashlib.sha256(json.dumps(parametros).encode("utf-8"))
+    for arquivo in arquivos:
+        h.update(arquivo.name.encode("utf-8") + b"\0")
+        h.update(hashlib.sha256(arquivo.getbuffer()).digest())
+    for nome, texto in textos:
+        h.update(nome.encode("utf-8") + b"\0")
+        h.update(hashlib.sha256(texto.encode("utf-8")).digest())
+    return h.hexdigest()
+
+
+class IndiceVetorial:
+    """Vetores normalizados numa matriz float32 contígua; a busca é um único produto matriz-vetor."""
+
+    def __init__(self, trechos, vetores, embedding):
+        self.trechos, self.vetores, self.embedding = trechos, vetores, embedding
+
+    @classmethod
+    def construir(cls, trechos, embedding, tamanho_lote=256):
+        import numpy as np
+        partes = [embedding([t["texto"] for t in trechos[i:i + tamanho_lote]]) for i in range(0, len(trechos), tamanho_lote)]
+        vetores = _normalizar(np.concatenate(partes)) if partes else np.zeros((0, embedding.dimensoes), dtype=np.float32)
+        return cls(trechos, vetores, embedding)
+
+    def buscar_lote(self, consultas, k=5):
+        """Top-k por similaridade de cosseno para várias consultas de uma vez."""
+        import numpy as np
+        if not len(self.trechos): return [[] for _ in consultas]
+        similaridades = _normalizar(self.embedding(consultas)) @ self.vetores.T  # (consultas, trechos)
+        k = min(k, len(self.trechos))
+        resultados = []
+        for linha in similaridades:
+            melhores = np.argpartition(-linha, k - 1)[:k]
+            melhores = melhores[np.argsort(-linha[melhores])]
+            resultados.append([(self.trechos[i], float(linha[i])) for i in melhores if linha[i] > 0])
+        return resultados
+
+    def buscar(self, consulta, k=5):
+        """Retorna até k pares (trecho, similaridade), do mais ao menos parecido."""
+        return self.buscar_lote([consulta], k)[0]
+
+    def salvar(self, diretorio):
+        """Grava o índice de forma atômica: os arquivos só aparecem completos."""
+        import numpy as np
+        os.makedirs(os.path.dirname(os.path.abspath(diretorio)), exist_ok=True)
+        temporario = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(os.path.abspath(diretorio)))  # Ignorado por `podar_indices`
+        try:
+            np.save(os.path.join(temporario, "vetores.npy"), self.vetores)
+            with open(os.path.join(temporario, "trechos.json"), "w", encoding="utf-8") as f:
+                json.dump({"embedding": self.embedding.nome, "trechos": self.trechos}, f, ensure_ascii=False)
+            os.replace(temporario, diretorio)
+        except OSError:
+            shutil.rmtree(temporario, ignore_errors=True)
+            if not os.path.isdir(diretorio): raise  # Outro processo pode ter gravado o mesmo índice
+
+    @classmethod
+    def carregar(cls, diretorio, embedding):
+        """Abre os vetores por memory-map, sem lê-los inteiros para a memória."""
+        import numpy as np
+        with open(os.path.join(diretorio, "trechos.json"), encoding="utf-8") as f:
+            dados = json.load(f)
+        if dados["embedding"] != embedding.nome:
+            raise ValueError(f"Índice criado com outro embedding: {dados['embedding']}")
+        vetores = np.load(os.path.join(diretorio, "vetores.npy"), mmap_mode="r")
+        return cls(dados["trechos"], vetores, embedding)
+
+
+def podar_indices(diretorio_base, limite_bytes, manter=()):
+    """Remove os índices usados há mais tempo até o total em disco caber em `limite_bytes`.
+
+    O uso é a data de modificação do diretório, atualizada a cada carregamento.
+    Diretórios temporários de gravações em andamento e os de `manter` nunca são
+    removidos. Retorna quantos índices foram removidos.
+    """
+    if not os.path.isdir(diretorio_base): return 0
+    indices = []
+    for entrada in os.scandir(diretorio_base):
+        if entrada.name.startswith(".") or not entrada.is_dir(): continue
+        try:
+            tamanho = sum(arquivo.stat().st_size for arquivo in os.scandir(entrada.path) if arquivo.is_file())
+            indices.append((entrada.stat().st_mtime, tamanho, entrada.name))
+        except OSError: continue  # Removido por outro processo no meio da varredura
+    total, removidos = sum(tamanho for _, tamanho, _ in indices), 0
+    for _, tamanho, nome in sorted(indices):
+        if total <= limite_bytes: break
+        if nome in manter: continue
+        # Uma sessão com os vetores abertos por memory-map continua lendo a cópia já mapeada
+        shutil.rmtree(os.path.join(diretorio_base, nome), ignore_errors=True)
+        total -= tamanho
+        removidos += 1
+    return removidos
+
+
+def carregar_ou_construir(diretorio_base, chave, obter_trechos, embedding, limite_bytes=None):
+    """Carrega o índice da chave se já existir; senão o constrói e persiste.
+
+    Com `limite_bytes`, cada índice novo poda os usados há mais tempo (`podar_indices`).
+    Retorna (indice, carregado_do_disco).
+    """
+    diretorio = os.path.join(diretorio_base, chave)
+    if os.path.isdir(diretorio):
+        try:
+            indice = IndiceVetorial.carregar(diretorio, embedding)
+            os.utime(diretorio)  # Marca o uso para a poda por LRU
+            return indice, True
+        except (OSError, ValueError, KeyError): shutil.rmtree(diretorio, ignore_errors=True)
+    indice = IndiceVetorial.construir(obter_trechos(), embedding)
+    indice.salvar(diretorio)
+    if limite_bytes is not None: podar_indices(diretorio_base, limite_bytes, manter=(chave,))
+    return indice, False
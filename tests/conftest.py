@@ -1,5 +1,64 @@
 # tests/conftest.py
+import sys
+import os
+import json
+import threading
+import time
+
+import pytest
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.analise import SECOES
+from core.uso import estimar_tokens_entrada
+
 def pytest_configure(config):
-    load_dotenv()
\ No newline at end of file
+    load_dotenv()
+
+
+class Uso:
+    def __init__(self, entrada, saida=0):
+        self.prompt_token_count, self.candidates_token_count, self.total_token_count = entrada, saida, entrada + saida
+
+
+class Resposta:
+    def __init__(self, text, uso=None):
+        self.text, self.usage_metadata = text, uso
+
+
+class ModeloFalso:
+    """Simula o GenerativeModel: guarda o que recebe, conta as chamadas e responde `texto`.
+
+    `texto` pode ser uma função do conteúdo enviado; no stream a resposta sai em
+    `trechos`, com o uso (tokens de entrada e de saída) só no último, como na API. Com `generation_config`
+    responde o JSON das três seções. `falhar_em` faz falhar os conteúdos que
+    contêm esse texto.
+    """
+    def __init__(self, system_instruction=None, texto="ok", trechos=None, uso=None, latencia=0.0, falhar_em=None):
+        self.system_instruction, self.texto, self.trechos, self.uso = system_instruction, texto, trechos, uso
+        self.latencia, self.falhar_em = latencia, falhar_em
+        self.conteudos, self.chamadas = [], 0
+        self._lock = threading.Lock()
+
+    def json_estruturado(self):
+        return json.dumps({secao: f"conteúdo de {secao}" for secao in SECOES})
+
+    def generate_content(self, conteudo, generation_config=None, stream=False, **kwargs):
+        with self._lock:
+            self.chamadas += 1
+            self.conteudos.append(conteudo)
+        time.sleep(self.latencia)
+        if self.falhar_em and self.falhar_em in str(conteudo):
+            raise RuntimeError("falha simulada")
+        if generation_config: texto = self.json_estruturado()
+        else: texto = self.texto(conteudo) if callable(self.texto) else self.texto
+        uso = Uso(*self.uso) if self.uso else Uso(estimar_tokens_entrada(conteudo), len(texto) // 4)
+        if not stream: return Resposta(texto, uso)
+        partes = self.trechos or [texto]
+        return iter([Resposta(parte, uso if i == len(partes) - 1 else None) for i, parte in enumerate(partes)])
+
+
+@pytest.fixture
+def modelo_falso():
+    """A classe `ModeloFalso`, para criar quantos modelos o teste precisar."""
+    return ModeloFalso
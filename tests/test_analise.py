@@ -0,0 +1,67 @@
+# tests/test_analise.py
+import sys
+import json
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.analise import SECOES, MOTOR_CHAMADA_UNICA, MOTOR_TRES_CHAMADAS, analisar, analisar_secoes
+
+
+def test_analise_paralela_leva_o_tempo_da_chamada_mais_lenta(modelo_falso):
+    """Testa se as três seções são geradas em paralelo."""
+    modelo = modelo_falso(latencia=0.2)
+    inicio = time.perf_counter()
+    resultados, erros = analisar_secoes(modelo, "texto " * 20, paralelo=True)
+    assert time.perf_counter() - inicio < 0.5
+    assert not erros and all(resultados[s] for s in SECOES)
+
+
+def test_falha_em_uma_secao_preserva_as_demais(modelo_falso):
+    """Testa se uma seção com erro não descarta as outras duas."""
+    concluidas = []
+    modelo = modelo_falso(falhar_em="ELI5")
+    resultados, erros = analisar_secoes(modelo, "texto " * 20, ao_concluir=lambda s, c, e: concluidas.append(s))
+    assert resultados["resumo_simples"] is None and "resumo_simples" in erros
+    assert resultados["analise_estruturada"] and resultados["perguntas_criticas"]
+    assert sorted(concluidas) == sorted(SECOES)
+
+
+def test_chamada_unica_envia_o_documento_uma_vez(modelo_falso):
+    """Testa se o motor de chamada única faz uma requisição e estima a economia."""
+    modelo = modelo_falso()
+    resultados, erros, uso = analisar(modelo, "texto " * 200, motor=MOTOR_CHAMADA_UNICA)
+    assert modelo.chamadas == 1 and not erros
+    assert resultados["perguntas_criticas"] == "conteúdo de perguntas_criticas"
+    assert uso["motor"] == MOTOR_CHAMADA_UNICA and uso["tokens_economizados"] > 0
+
+
+def test_chamada_unica_malformada_recorre_as_tres_chamadas(modelo_falso):
+    """Testa se um JSON sem todas as seções aciona o caminho de três chamadas."""
+    modelo = modelo_falso()
+    modelo.json_estruturado = lambda: json.dumps({"resumo_simples": "só isso"})
+    resultados, erros, uso = analisar(modelo, "texto " * 20, motor=MOTOR_CHAMADA_UNICA)
+    assert modelo.chamadas == 4 and not erros
+    assert uso["motor"] == MOTOR_TRES_CHAMADAS and "analise_estruturada" in uso["fallback"]
+    assert set(resultados) == set(SECOES)
+
+
+def test_chamada_unica_propaga_erros_da_api_sem_recorrer_as_tres_chamadas(modelo_falso):
+    """Testa se uma falha da requisição (cota, 429 esgotado) não vira mais três requisições."""
+    modelo = modelo_falso(falhar_em="JSON")
+    with pytest.raises(RuntimeError, match="falha simulada"):
+        analisar(modelo, "texto " * 20, motor=MOTOR_CHAMADA_UNICA)
+    assert modelo.chamadas == 1
+
+
+def test_texto_acima_do_limiar_passa_por_map_reduce(modelo_falso):
+    """Testa se um texto grande é resumido por partes antes das três seções."""
+    progresso = []
+    modelo = modelo_falso()
+    texto = "palavra " * 1000  # cerca de 2000 tokens estimados
+    resultados, erros, uso = analisar(modelo, texto, limiar_tokens=500, ao_progredir_blocos=lambda c, t: progresso.append((c, t)))
+    assert not erros and all(resultados[s] for s in SECOES)
+    assert uso["blocos_map_reduce"] and progresso[-1][0] == progresso[-1][1]
+    assert modelo.chamadas == uso["blocos_map_reduce"][0] + len(SECOES)
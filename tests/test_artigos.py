@@ -0,0 +1,98 @@
+# tests/test_artigos.py
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.artigos import BuscadorArtigos, CachePaginas, decodificar_html, separar_urls
+
+PARAGRAFOS = "".join(f"<p>This is paragraph {i} of the test article, with enough plain text for the extractor to find the main body of the page.</p>" for i in range(6))
+HTML = f"<html><head><title>Test article</title></head><body><article>{PARAGRAFOS}</article></body></html>".encode()
+HTML_SEM_CHARSET = f"<html><head><title>Análise do café</title></head><body><article>{PARAGRAFOS}</article></body></html>".encode("utf-8")
+
+
+class Servidor(BaseHTTPRequestHandler):
+    pedidos = []
+    simultaneos = maximo_simultaneos = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        Servidor.pedidos.append((self.path, self.headers.get("If-None-Match")))
+        if self.path.startswith("/lento"):
+            with Servidor.lock:
+                Servidor.simultaneos += 1
+                Servidor.maximo_simultaneos = max(Servidor.maximo_simultaneos, Servidor.simultaneos)
+            time.sleep(0.05)
+            with Servidor.lock: Servidor.simultaneos -= 1
+        if self.path == "/ausente":
+            self.send_response(404); self.end_headers(); return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304); self.end_headers(); return
+        sem_charset = self.path == "/sem-charset"
+        corpo = HTML_SEM_CHARSET if sem_charset else HTML
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html" if sem_charset else "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args): pass
+
+
+@pytest.fixture
+def base_url():
+    Servidor.pedidos, Servidor.simultaneos, Servidor.maximo_simultaneos = [], 0, 0
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Servidor)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_port}"
+    servidor.shutdown()
+
+
+def test_cache_fresco_e_revalidacao_com_etag(base_url, tmp_path):
+    """Testa as três origens: rede, cache fresco (sem requisição) e revalidação 304."""
+    cache = CachePaginas(str(tmp_path / "paginas.sqlite3"))
+    url = f"{base_url}/artigo"
+    primeiro = BuscadorArtigos(cache).buscar_um(url)
+    assert primeiro["erro"] is None and primeiro["origem"] == "rede" and "paragraph 3" in primeiro["texto"]
+    assert BuscadorArtigos(cache).buscar_um(url)["origem"] == "cache" and len(Servidor.pedidos) == 1
+    revalidado = BuscadorArtigos(cache, ttl_fresco=0).buscar_um(url)
+    assert revalidado["origem"] == "revalidado" and revalidado["texto"] == primeiro["texto"]
+    assert Servidor.pedidos[-1] == ("/artigo", '"v1"')
+
+
+def test_lote_mantem_ordem_e_isola_falhas(base_url):
+    """Testa se uma URL com erro não impede as demais e se a ordem de entrada é mantida."""
+    urls = [f"{base_url}/a", f"{base_url}/ausente", f"{base_url}/b"]
+    progresso = []
+    resultados = BuscadorArtigos(por_host=1).buscar(urls, ao_concluir=lambda r, c, t: progresso.append((c, t)))
+    assert [r["nome"] for r in resultados] == urls
+    assert resultados[0]["erro"] is None and resultados[2]["erro"] is None
+    assert "404" in resultados[1]["erro"]
+    assert progresso[-1] == (3, 3)
+
+
+def test_limite_de_conexoes_vale_para_buscas_simultaneas(base_url):
+    """Testa se `max_conexoes` limita o total do processo, e não cada chamada de `buscar`."""
+    buscador = BuscadorArtigos(max_conexoes=2, por_host=10)
+    buscas = [threading.Thread(target=buscador.buscar, args=([f"{base_url}/lento/{n}/{i}" for i in range(4)],)) for n in range(3)]
+    for busca in buscas: busca.start()
+    for busca in buscas: busca.join()
+    assert len(Servidor.pedidos) == 12 and Servidor.maximo_simultaneos <= 2
+
+
+def test_pagina_utf8_sem_charset_no_cabecalho(base_url):
+    """Testa se `text/html` sem charset não é lido como ISO-8859-1 e se o `<meta charset>` é respeitado."""
+    resultado = BuscadorArtigos().buscar_um(f"{base_url}/sem-charset")
+    assert resultado["erro"] is None and resultado["titulo"] == "Análise do café"
+    latin1 = '<html><head><meta charset="iso-8859-1"><title>Análise</title></head></html>'.encode("latin-1")
+    assert "Análise" in decodificar_html(latin1, "text/html")
+    assert "Análise" in decodificar_html("<p>Análise</p>".encode("cp1252"), "text/html")
+
+
+def test_separar_urls_ignora_linhas_invalidas_e_repetidas():
+    assert separar_urls("https://a.com/x\n\n texto\nhttp://b.com\nhttps://a.com/x") == ["https://a.com/x", "http://b.com"]
@@ -0,0 +1,22 @@
+# tests/test_bench_etapas.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from bench_etapas import comparar, etapas, medir
+
+
+def test_etapas_rodam_com_os_falsos():
+    """Garante que os falsos continuam compatíveis com o código medido."""
+    todas = etapas()
+    for nome in ("analise_chamada_unica", "analise_tres_chamadas", "chat_5_turnos_recuperacao", "notas_listagem_e_busca_1000"):
+        resultado = medir(*todas[nome], repeticoes=1)
+        assert resultado["mediana_s"] > 0
+    assert resultado["notas"] == 1000
+
+
+def test_comparacao_aponta_so_regressoes_acima_da_tolerancia():
+    base = {"etapas": {"a": {"mediana_s": 1.0}, "b": {"mediana_s": 1.0}}}
+    atual = {"etapas": {"a": {"mediana_s": 1.2}, "b": {"mediana_s": 1.5}, "nova": {"mediana_s": 0.1}}}
+    linhas, regressoes = comparar(atual, base, tolerancia=0.25)
+    assert regressoes == ["b"] and linhas[-1] == ("nova", None, 0.1, None)
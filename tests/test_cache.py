@@ -0,0 +1,52 @@
+# tests/test_cache.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.cache import CacheAnalises, CacheExtracoes, chave_analise, chave_extracao
+
+
+def test_chave_ignora_diferencas_de_espaco():
+    """Testa se espaços extras não alteram a chave, mas o modelo e a versão sim."""
+    chave = chave_analise("Um  texto\n qualquer ", "gemini", "v1")
+    assert chave == chave_analise("Um texto qualquer", "gemini", "v1")
+    assert chave != chave_analise("Um texto qualquer", "outro-modelo", "v1")
+    assert chave != chave_analise("Um texto qualquer", "gemini", "v2")
+
+
+def test_cache_conta_acertos_e_despeja_o_menos_usado(tmp_path):
+    """Testa o despejo LRU por tamanho e os contadores de acerto/falha."""
+    cache = CacheAnalises(str(tmp_path / "cache.sqlite3"), limite_bytes=250)
+    cache.guardar("a", {"resumo_simples": "x" * 100})
+    cache.guardar("b", {"resumo_simples": "y" * 100})
+    assert cache.obter("a") is not None  # "a" passa a ser o mais recente
+    cache.guardar("c", {"resumo_simples": "z" * 100})
+    assert cache.obter("b") is None
+    assert cache.obter("a") and cache.obter("c")
+    assert cache.estatisticas()["acertos"] == 3 and cache.estatisticas()["falhas"] == 1
+
+
+def test_invalidar_remove_versoes_antigas(tmp_path):
+    """Testa se a troca de versão dos prompts descarta as análises anteriores."""
+    cache = CacheAnalises(str(tmp_path / "cache.sqlite3"))
+    cache.guardar("antiga", {"resumo_simples": "x"}, versao="v1")
+    cache.guardar("nova", {"resumo_simples": "y"}, versao="v2")
+    assert cache.invalidar("v2") == 1
+    assert cache.obter("antiga") is None and cache.obter("nova")
+
+
+def test_cache_de_extracoes_comprime_e_despeja_por_tamanho(tmp_path):
+    """Testa se os textos ficam comprimidos e se o limite em bytes despeja o menos usado."""
+    cache = CacheExtracoes(str(tmp_path / "extracoes.sqlite3"), limite_bytes=1500)
+    extracao = {"texto": "palavra " * 5000, "paginas_lidas": 1, "total_paginas": 1, "truncado": False, "inicios_paginas": [0]}
+    chave_a, chave_b = chave_extracao(b"arquivo a", "1"), chave_extracao(b"arquivo b", "1")
+    assert chave_a != chave_extracao(b"arquivo a", "2") != chave_extracao(b"arquivo a", "1", limite_caracteres=10)
+    cache.guardar(chave_a, extracao, versao="1")
+    estatisticas = cache.estatisticas()
+    assert estatisticas["bytes"] * 10 < estatisticas["bytes_originais"]
+    assert cache.obter(chave_a) == extracao
+    for i in range(30):
+        cache.guardar(chave_extracao(f"outro {i}".encode(), "1"), {**extracao, "texto": f"{i} " + "x" * 400 + os.urandom(100).hex()}, versao="1")
+    cache.guardar(chave_b, extracao, versao="1")
+    assert cache.obter(chave_a) is None and cache.obter(chave_b) == extracao
+    assert cache.estatisticas()["bytes"] <= 1500
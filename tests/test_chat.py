@@ -0,0 +1,60 @@
+# tests/test_chat.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.chat import ChatLimitado, RespostaEmStream
+
+
+class _Trecho:
+    def __init__(self, text):
+        self.text = text
+
+
+class ChatFalso:
+    """Simula o ChatSession do Gemini em modo stream."""
+    def __init__(self, trechos):
+        self.trechos, self.historico = trechos, []
+
+    def send_message(self, mensagem, stream=False):
+        self.historico.append(mensagem)
+        return (_Trecho(t) for t in self.trechos)
+
+    def rewind(self):
+        self.historico.pop()
+
+
+def test_stream_monta_a_resposta_completa():
+    """Testa se os trechos são entregues em ordem e as métricas registradas."""
+    resposta = RespostaEmStream(ChatFalso(["Olá", ", ", "mundo"]), "oi")
+    assert list(resposta) == ["Olá", ", ", "mundo"]
+    resposta.fechar()
+    assert resposta.texto == "Olá, mundo" and resposta.concluida
+    assert resposta.metricas["tempo_primeiro_token"] <= resposta.metricas["latencia_total"]
+
+
+def test_stream_interrompido_desfaz_o_turno():
+    """Testa se uma leitura interrompida remove o turno incompleto do histórico."""
+    chat = ChatFalso(["a", "b", "c"])
+    resposta = RespostaEmStream(chat, "oi")
+    iterador = iter(resposta)
+    assert next(iterador) == "a"
+    resposta.fechar()
+    assert not resposta.concluida and resposta.texto == "a"
+    assert chat.historico == []
+
+
+def test_historico_antigo_e_resumido_e_recentes_ficam_na_integra(modelo_falso):
+    """Testa a compactação do histórico mantendo contexto e trocas recentes."""
+    modelo = modelo_falso(texto=lambda conteudo: "RESUMO" if isinstance(conteudo, str) else "resposta " * 20)
+    contexto = [{"role": "user", "parts": ["DOCUMENTO"]}, {"role": "model", "parts": ["ok"]}]
+    chat = ChatLimitado(modelo, contexto=contexto, orcamento_tokens=50, turnos_recentes=2)
+    for i in range(6):
+        chat.send_message(f"pergunta {i}")
+        chat.historico.aguardar_compactacao(timeout=5)
+    enviado = chat.historico.conteudo("nova pergunta")
+    textos = [m["parts"][0] for m in enviado]
+    assert textos[0] == "DOCUMENTO" and "RESUMO" in textos[2]
+    assert "pergunta 0" not in textos and "pergunta 5" in textos
+    assert len(chat.historico.trocas) <= 3
+    assert chat.ultimo_prompt_tokens > 0
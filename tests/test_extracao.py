@@ -0,0 +1,103 @@
+# tests/test_extracao.py
+import sys
+import os
+from io import BytesIO
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import core.extracao
+from core.cache import CacheExtracoes
+from core.extracao import combinar_documentos, extrair_documentos, extrair_texto
+
+
+def gerar_pdf(paginas):
+    """Cria um PDF em memória com uma linha de texto por página."""
+    with fitz.open() as doc:
+        for i in range(paginas):
+            doc.new_page().insert_text((72, 72), f"Pagina {i + 1}")
+        return doc.tobytes()
+
+
+def test_extracao_reporta_progresso_por_pagina():
+    """Testa se todas as páginas são lidas, em ordem, com progresso."""
+    progresso = []
+    extracao = extrair_texto(BytesIO(gerar_pdf(3)), ao_progredir=lambda p, t: progresso.append((p, t)))
+    assert progresso == [(1, 3), (2, 3), (3, 3)]
+    assert extracao["texto"].index("Pagina 1") < extracao["texto"].index("Pagina 3")
+    assert not extracao["truncado"]
+
+
+def test_extracao_para_no_limite_de_caracteres():
+    """Testa se a extração interrompe a leitura ao atingir o orçamento."""
+    extracao = extrair_texto(gerar_pdf(50), limite_caracteres=25)
+    assert extracao["truncado"] and len(extracao["texto"]) == 25
+    assert extracao["paginas_lidas"] < extracao["total_paginas"] == 50
+
+
+def test_extracao_de_txt_respeita_limite_de_tokens():
+    """Testa a extração de TXT com orçamento em tokens."""
+    extracao = extrair_texto(BytesIO(("á" * 100).encode("utf-8")), "text/plain", limite_tokens=5)
+    assert extracao["texto"] == "á" * 20 and extracao["truncado"]
+
+
+def test_extracao_paralela_preserva_a_ordem_das_paginas():
+    """Testa se a extração em processos devolve o mesmo texto da serial."""
+    pdf = gerar_pdf(12)
+    serial = extrair_texto(pdf, paralelo=False)
+    paralela = extrair_texto(pdf, paralelo=True, processos=2)
+    assert paralela == serial
+
+
+class ArquivoFalso(BytesIO):
+    """Imita o UploadedFile do Streamlit."""
+    def __init__(self, name, type, dados):
+        super().__init__(dados)
+        self.name, self.type = name, type
+
+
+def test_ingestao_concorrente_mantem_ordem_e_isola_erros(monkeypatch):
+    """Testa se um arquivo inválido não interrompe o lote e a ordem é preservada."""
+    monkeypatch.setattr(core.extracao.os, "cpu_count", lambda: 2)
+    arquivos = [
+        ArquivoFalso("a.pdf", "application/pdf", gerar_pdf(2)),
+        ArquivoFalso("quebrado.pdf", "application/pdf", b"isto nao e um pdf"),
+        ArquivoFalso("c.txt", "text/plain", "texto simples".encode("utf-8")),
+    ]
+    resultados = extrair_documentos(arquivos, max_processos=2)
+    assert [r["nome"] for r in resultados] == ["a.pdf", "quebrado.pdf", "c.txt"]
+    assert resultados[1]["erro"] and not resultados[0]["erro"] and not resultados[2]["erro"]
+    combinado = combinar_documentos(resultados)
+    assert combinado.index("INÍCIO DO DOCUMENTO: a.pdf") < combinado.index("FIM DO DOCUMENTO: c.txt")
+    assert "quebrado.pdf" not in combinado
+
+
+def test_cache_de_extracoes_evita_extrair_o_mesmo_arquivo(tmp_path, monkeypatch):
+    """Testa se o mesmo upload, na análise única ou no multi-documentos, não é extraído de novo."""
+    cache = CacheExtracoes(str(tmp_path / "extracoes.sqlite3"))
+    pdf = gerar_pdf(3)
+    primeira = extrair_texto(ArquivoFalso("a.pdf", "application/pdf", pdf), paralelo=False, cache=cache)
+    monkeypatch.setattr(core.extracao, "iterar_paginas_pdf", lambda origem: (_ for _ in ()).throw(AssertionError("extraiu de novo")))
+    segunda = extrair_texto(BytesIO(pdf), paralelo=False, cache=cache)
+    assert segunda.pop("do_cache") and segunda == primeira
+    class SoLeitura:  # Objeto sem getbuffer(): os bytes só podem ser lidos uma vez
+        def __init__(self, dados): self.dados = BytesIO(dados)
+        def read(self): return self.dados.read()
+    texto = extrair_texto(SoLeitura("só leitura".encode("utf-8")), "text/plain", cache=cache)["texto"]
+    assert texto == "só leitura"
+    resultados = extrair_documentos([ArquivoFalso("copia.pdf", "application/pdf", pdf)], cache=cache)
+    assert resultados[0]["do_cache"] and resultados[0]["nome"] == "copia.pdf" and resultados[0]["texto"] == primeira["texto"]
+    # Outro limite de caracteres gera outra chave
+    assert extrair_documentos([ArquivoFalso("a.pdf", "application/pdf", pdf)], limite_caracteres=5, cache=cache)[0]["erro"]
+
+
+def test_ingestao_guarda_no_cache_so_extracoes_sem_erro(tmp_path, monkeypatch):
+    """Testa se a ingestão alimenta o cache usado pela análise única e ignora arquivos com erro."""
+    monkeypatch.setattr(core.extracao.os, "cpu_count", lambda: 2)
+    cache = CacheExtracoes(str(tmp_path / "extracoes.sqlite3"))
+    pdf = gerar_pdf(2)
+    arquivos = [ArquivoFalso("a.pdf", "application/pdf", pdf), ArquivoFalso("quebrado.pdf", "application/pdf", b"isto nao e um pdf")]
+    resultados = extrair_documentos(arquivos, max_processos=2, cache=cache)
+    assert not any(r.get("do_cache") for r in resultados)
+    assert cache.estatisticas()["entradas"] == 1
+    assert extrair_texto(pdf, cache=cache)["do_cache"]
@@ -0,0 +1,15 @@
+# tests/test_importacao.py
+import sys
+import os
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from bench_importacao import RAIZ, SOB_DEMANDA
+
+
+def test_app_nao_importa_dependencias_pesadas_na_inicializacao():
+    """Testa se a tela de login sobe sem carregar as bibliotecas usadas só por algumas páginas."""
+    codigo = f"import sys, app; print('carregados:', [m for m in {SOB_DEMANDA!r} if m in sys.modules])"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, timeout=120)
+    assert saida.returncode == 0, saida.stderr
+    assert "carregados: []" in saida.stdout
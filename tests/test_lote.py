@@ -0,0 +1,43 @@
+# tests/test_lote.py
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.cache import CacheAnalises
+from core.lote import analisar_com_cache, listar_arquivos, processar_lote
+
+
+def _pasta(tmp_path):
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    for nome in ("a.txt", "sub/b.txt"): (tmp_path / "docs" / nome).write_text(f"Conteúdo do documento {nome}. " * 10, encoding="utf-8")
+    (tmp_path / "docs" / "curto.txt").write_text("curto", encoding="utf-8")
+    (tmp_path / "docs" / "imagem.png").write_bytes(b"\x89PNG")
+    return str(tmp_path / "docs")
+
+
+def test_lote_grava_jsonl_e_retoma_do_checkpoint(modelo_falso, tmp_path):
+    """Testa a saída JSONL, os erros por arquivo e a retomada: só os que falharam são refeitos."""
+    arquivos = listar_arquivos(_pasta(tmp_path))
+    assert [os.path.basename(a) for a in arquivos] == ["a.txt", "curto.txt", "b.txt"]
+    modelo, saida = modelo_falso(), str(tmp_path / "saida" / "resultados.jsonl")
+    analisar_texto = lambda texto: analisar_com_cache(modelo, texto)
+    contagem = processar_lote(arquivos, analisar_texto, saida, max_simultaneos=2)
+    assert contagem == {"total": 3, "pulados": 0, "ok": 2, "erros": 1}
+    registros = [json.loads(linha) for linha in open(saida, encoding="utf-8")]
+    assert {os.path.basename(r["arquivo"]): r["status"] for r in registros} == {"a.txt": "ok", "b.txt": "ok", "curto.txt": "erro"}
+    chamadas = modelo.chamadas
+    with open(saida, "a", encoding="utf-8") as f: f.write('{"arquivo": "cortado')  # Execução interrompida no meio de uma linha
+    assert processar_lote(arquivos, analisar_texto, saida) == {"total": 3, "pulados": 2, "ok": 0, "erros": 1}
+    assert modelo.chamadas == chamadas
+    assert json.loads(open(saida, encoding="utf-8").read().splitlines()[-1])["status"] == "erro"
+
+
+def test_analise_compartilha_o_cache_do_app(modelo_falso, tmp_path):
+    cache, modelo = CacheAnalises(str(tmp_path / "analises.sqlite3")), modelo_falso()
+    texto = "Um documento qualquer com texto suficiente para a análise. " * 5
+    _, erros, uso = analisar_com_cache(modelo, texto, cache, nome_modelo="gemini-teste")
+    assert not erros and "cache" not in uso
+    chamadas = modelo.chamadas
+    resultados, _, uso = analisar_com_cache(modelo_falso(), texto, cache, nome_modelo="gemini-teste")
+    assert uso == {"cache": True} and resultados and modelo.chamadas == chamadas
@@ -0,0 +1,127 @@
+# tests/test_notas.py
+import sys
+import os
+from io import BytesIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+import zipfile
+
+from falsos import ConsultaFalsa, SupabaseFalso, TabelaFalsa
+from core.notas import CacheNotas, IndiceNotas, buscar_notas, consulta_tsquery, excluir_notas, exportar_notas_zip, listar_pagina_notas
+
+
+
+def _notas(n):
+    # Pares de notas com o mesmo created_at testam o desempate pelo id
+    return [{"id": f"{i:03d}", "user_id": "u1", "title": f"Nota {i}", "content": f"Conteúdo {i}",
+             "created_at": f"2025-01-{i // 2 + 1:02d}T10:00:00+00:00"} for i in range(n)]
+
+
+def _cliente(notas, tabela=TabelaFalsa):
+    cliente = SupabaseFalso(latencia=0)
+    cliente.tabelas["user_notes"] = tabela(latencia=0)
+    cliente.tabelas["user_notes"].linhas = notas
+    return cliente
+
+
+def test_paginacao_por_chave_percorre_todas_as_notas_sem_repetir():
+    """Testa a paginação keyset, inclusive com datas iguais."""
+    cliente = _cliente(_notas(7))
+    vistas, cursor = [], None
+    while True:
+        pagina, cursor = listar_pagina_notas(cliente, "u1", cursor, tamanho=3)
+        vistas += [n["id"] for n in pagina]
+        assert all("content" not in n for n in pagina)
+        if cursor is None: break
+    assert vistas == sorted(vistas, reverse=True) and len(set(vistas)) == 7
+
+
+def test_conteudo_e_buscado_sob_demanda_e_fica_em_cache():
+    """Testa se o conteúdo é consultado só uma vez, ao abrir a nota."""
+    cliente = _cliente(_notas(3))
+    cache = CacheNotas(cliente, "u1", tamanho_pagina=2)
+    assert len(cache.notas()) == 2 and cache.tem_mais
+    cache.carregar_mais()
+    assert len(cache.notas()) == 3 and not cache.tem_mais
+    assert cache.conteudo("001") == "Conteúdo 1"
+    requisicoes = cliente.requisicoes
+    cache.conteudo("001")
+    assert cliente.requisicoes == requisicoes
+
+
+def test_indice_ranqueia_titulo_e_filtra_por_prefixo():
+    """Testa o peso do título, a busca por prefixo e a remoção incremental."""
+    indice = IndiceNotas()
+    indice.adicionar({"id": 1, "title": "Reunião de orçamento", "content": "Discutimos metas."})
+    indice.adicionar({"id": 2, "title": "Diário", "content": "O orçamento da casa apertou este mês."})
+    indice.adicionar({"id": 3, "title": "Receitas", "content": "Bolo de cenoura."})
+    assert [n["id"] for n in indice.buscar("orçamento")] == [1, 2]
+    assert [n["id"] for n in indice.buscar("orca")] == [1, 2]  # Prefixo, sem acento
+    indice.remover(1)
+    assert [n["id"] for n in indice.buscar("orçamento")] == [2]
+    assert "reuniao" not in indice.vocabulario
+
+
+def test_busca_sem_fts_no_servidor_indexa_todas_as_notas_uma_vez():
+    """Testa o fallback para o índice local quando o servidor não tem busca textual."""
+    cliente = _cliente(_notas(5))
+    indice = IndiceNotas()
+    assert [n["id"] for n in buscar_notas(cliente, "u1", "Conteúdo 3", indice)][0] == "003"
+    requisicoes = cliente.requisicoes
+    buscar_notas(cliente, "u1", "Nota", indice)
+    assert indice.completo and cliente.requisicoes == requisicoes
+
+
+def test_busca_no_servidor_trata_o_ultimo_termo_como_prefixo():
+    """Testa se a consulta enviada ao Postgres casa palavras ainda incompletas."""
+    assert consulta_tsquery("Reunião orça") == "reunião & orça:*"
+    assert consulta_tsquery(" !? ") is None
+    enviadas = []
+    class ConsultaComFts(ConsultaFalsa):
+        def text_search(self, coluna, consulta, options):
+            enviadas.append((coluna, consulta, options))
+            prefixo = consulta.split(":*")[0]
+            self.filtros.append(lambda n: any(p.startswith(prefixo) for p in n["content"].lower().split()))
+            return self
+    class TabelaComFts(TabelaFalsa):
+        def select(self, colunas):
+            return ConsultaComFts(self, "select", colunas)
+    cliente = _cliente(_notas(3), TabelaComFts)
+    cliente.table("user_notes").linhas[1]["content"] = "Planilha de orçamento"
+    assert [n["id"] for n in buscar_notas(cliente, "u1", "orça", IndiceNotas())] == ["001"]
+    assert enviadas == [("fts", "orça:*", {"config": "portuguese"})]
+
+
+def test_exclusao_em_lote_remove_so_notas_do_usuario():
+    """Testa se a exclusão em lote respeita o user_id e retorna as linhas afetadas."""
+    notas = _notas(4)
+    notas[1]["user_id"] = "u2"
+    cliente = _cliente(notas)
+    assert excluir_notas(cliente, "u1", ["000", "001", "002"]) == 2
+    assert [n["id"] for n in cliente.table("user_notes").linhas] == ["001", "003"]
+    assert excluir_notas(cliente, "u1", []) == 0
+
+
+def test_exportacao_zip_em_lotes_com_titulos_repetidos():
+    """Testa o ZIP exportado: um arquivo por nota, sem colisão de nomes."""
+    notas = _notas(5)
+    notas[3]["title"] = notas[4]["title"] = "Plano: Q1/Q2"
+    cliente = _cliente(notas)
+    dados, quantidade = exportar_notas_zip(cliente, "u1")
+    with zipfile.ZipFile(BytesIO(dados)) as zf:
+        assert quantidade == 5 and len(zf.namelist()) == 5
+        assert {"Plano_ Q1_Q2.txt", "Plano_ Q1_Q2 (2).txt"} <= set(zf.namelist())
+        assert zf.read("Nota 0.txt").decode() == "Conteúdo 0"
+    dados, quantidade = exportar_notas_zip(cliente, "u1", ids=["001", "002"])
+    with zipfile.ZipFile(BytesIO(dados)) as zf:
+        assert quantidade == 2 and sorted(zf.namelist()) == ["Nota 1.txt", "Nota 2.txt"]
+
+
+def test_exportacao_zip_e_aceita_pelo_download_button():
+    """Testa se o retorno usado no `data=` adiado do download_button passa pelo conversor do Streamlit."""
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+    dados, quantidade = exportar_notas_zip(_cliente(_notas(3)), "u1")
+    convertido, _ = convert_data_to_bytes_and_infer_mime(dados, unsupported_error=TypeError("tipo não suportado"))
+    with zipfile.ZipFile(BytesIO(convertido)) as zf:
+        assert quantidade == 3 and len(zf.namelist()) == 3
@@ -0,0 +1,67 @@
+# tests/test_portao.py
+import sys
+import os
+import threading
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.portao import ModeloComPortao, PortaoGemini
+
+
+class ModeloInstavel:
+    """Falha com as exceções dadas, na ordem, antes de responder."""
+    def __init__(self, falhas=(), trechos=("a", "b")):
+        self.falhas, self.trechos, self.chamadas = list(falhas), trechos, 0
+
+    def generate_content(self, conteudo, stream=False):
+        self.chamadas += 1
+        if self.falhas: raise self.falhas.pop(0)
+        if stream: return iter(type("Trecho", (), {"text": t})() for t in self.trechos)
+        return type("Resposta", (), {"text": "ok"})()
+
+
+def test_retentativas_com_jitter_e_reducao_aimd():
+    """Testa as novas tentativas após 429/503, o teto exponencial do jitter e o corte do limite."""
+    portao, tetos = PortaoGemini(inicial=8), []
+    modelo = ModeloInstavel([google_exceptions.ResourceExhausted("cota"), google_exceptions.ServiceUnavailable("503")])
+    envoltorio = ModeloComPortao(modelo, portao, "u1", espera_base=1.0, aleatorio=lambda a, b: tetos.append(b) or 0, dormir=lambda s: None)
+    assert envoltorio.generate_content("oi").text == "ok"
+    assert modelo.chamadas == 3 and tetos == [1.0, 2.0]
+    estatisticas = portao.estatisticas()
+    assert estatisticas["limite"] == 4 and estatisticas["retentativas"] == 2 and estatisticas["limitacoes"] == 1 and estatisticas["em_uso"] == 0
+
+    nao_retentavel = ModeloComPortao(ModeloInstavel([google_exceptions.InvalidArgument("ruim")]), portao, "u1", dormir=lambda s: None)
+    with pytest.raises(google_exceptions.InvalidArgument): nao_retentavel.generate_content("oi")
+    assert portao.estatisticas()["em_uso"] == 0
+
+
+def test_stream_so_repete_falha_antes_do_primeiro_trecho():
+    portao = PortaoGemini()
+    modelo = ModeloInstavel([google_exceptions.InternalServerError("500")])
+    trechos = ModeloComPortao(modelo, portao, "u1", aleatorio=lambda a, b: 0, dormir=lambda s: None).generate_content("oi", stream=True)
+    assert [t.text for t in trechos] == ["a", "b"] and modelo.chamadas == 2
+    abandonado = ModeloComPortao(ModeloInstavel(), portao, "u1").generate_content("oi", stream=True)
+    next(abandonado); abandonado.close()
+    assert portao.estatisticas()["em_uso"] == 0
+
+
+def test_fila_justa_alterna_entre_usuarios():
+    """Com uma vaga, um usuário com muitas chamadas na fila não passa na frente dos outros."""
+    portao, ordem = PortaoGemini(inicial=1, maximo=1), []
+    portao.adquirir("ocupante")
+    def chamar(usuario):
+        portao.adquirir(usuario)
+        ordem.append(usuario)
+        portao.liberar()
+    threads = []
+    for usuario in ["a", "a", "a", "b", "c"]:
+        threads.append(threading.Thread(target=chamar, args=(usuario,)))
+        threads[-1].start()
+        time.sleep(0.02)  # Garante a ordem de chegada na fila
+    assert portao.estatisticas()["na_fila"] == 5
+    portao.liberar()
+    for t in threads: t.join(5)
+    assert ordem == ["a", "b", "c", "a", "a"]
@@ -0,0 +1,77 @@
+# tests/test_prefixos.py
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.chat import ChatLimitado
+from core.prefixos import BackendFalso, CachePrefixos
+
+
+def test_documento_registrado_uma_vez_e_reaproveitado_entre_sessoes(modelo_falso):
+    """Testa o reaproveitamento do prefixo e a economia de tokens por turno."""
+    backend = BackendFalso(modelo_falso)
+    cache = CachePrefixos(backend, min_tokens=10)
+    documento = "conteúdo do documento " * 100
+    for _ in range(2):  # Duas sessões abrindo o mesmo documento
+        chat = ChatLimitado(cache.modelo_para("gemini", documento))
+        for pergunta in ("a", "b", "c"):
+            chat.send_message(pergunta)
+    estatisticas = cache.estatisticas()
+    assert backend.criados == 1 and estatisticas["reutilizacoes"] == 1
+    assert estatisticas["turnos"] == 6
+    assert estatisticas["tokens_economizados"] == 6 * (len(documento) // 4)
+
+
+def test_lru_exclui_prefixos_excedentes_e_ignora_textos_curtos(modelo_falso):
+    """Testa o despejo no backend e o modelo comum para prefixos curtos."""
+    backend = BackendFalso(modelo_falso)
+    cache = CachePrefixos(backend, max_entradas=1, min_tokens=10)
+    modelo_a = cache.modelo_para("gemini", "a" * 100)
+    assert backend.criados == 0  # Nada é registrado antes da primeira pergunta
+    modelo_a.generate_content("pergunta")
+    cache.modelo_para("gemini", "b" * 100).generate_content("pergunta")
+    assert backend.excluidos == 1 and cache.estatisticas()["entradas"] == 1
+    assert isinstance(cache.modelo_para("gemini", "curto"), modelo_falso)
+
+
+def test_chat_sobrevive_a_expiracao_e_ao_despejo_do_prefixo(modelo_falso):
+    """Testa a renovação do TTL no reuso e o novo registro quando o prefixo some."""
+    agora = [0.0]
+    backend = BackendFalso(modelo_falso)
+    cache = CachePrefixos(backend, ttl=100, max_entradas=1, min_tokens=10, relogio=lambda: agora[0])
+    chat = ChatLimitado(cache.modelo_para("gemini", "a" * 100))
+    chat.send_message("primeira")  # Registra o documento
+    agora[0] = 60  # Segunda metade do prazo: o reuso renova o TTL
+    chat.send_message("segunda")
+    assert backend.renovados == 1 and backend.criados == 1
+    agora[0] = 150  # Ainda válido graças à renovação
+    chat.send_message("terceira")
+    assert backend.criados == 1
+    cache.modelo_para("gemini", "b" * 100).generate_content("x")  # Outra sessão despeja o prefixo deste chat
+    assert backend.excluidos == 1
+    chat.send_message("quarta")  # O chat registra o documento de novo em vez de falhar
+    agora[0] = 1000  # Expirado sem uso
+    chat.send_message("quinta")
+    assert backend.criados == 4 and cache.estatisticas()["turnos"] == 6
+
+
+def test_registro_lento_nao_bloqueia_outros_documentos(modelo_falso):
+    """Testa se o upload de um prefixo acontece fora do lock e é compartilhado por quem pede o mesmo documento."""
+    liberar, iniciou = threading.Event(), threading.Event()
+    class BackendLento(BackendFalso):
+        def criar(self, modelo, system_instruction, ttl):
+            if system_instruction.startswith("a"):
+                iniciou.set()
+                liberar.wait(5)
+            return super().criar(modelo, system_instruction, ttl)
+    backend = BackendLento(modelo_falso)
+    cache = CachePrefixos(backend, min_tokens=10)
+    threads = [threading.Thread(target=cache.modelo_para("gemini", "a" * 100).generate_content, args=("x",)) for _ in range(2)]
+    for t in threads: t.start()
+    assert iniciou.wait(5)
+    cache.modelo_para("gemini", "b" * 100).generate_content("x")  # Não espera o registro de "a"
+    assert backend.criados == 1
+    liberar.set()
+    for t in threads: t.join(5)
+    assert backend.criados == 2 and cache.estatisticas()["entradas"] == 2
@@ -0,0 +1,39 @@
+# tests/test_recuperacao.py
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.recuperacao import ChatComRecuperacao, IndiceBM25, dividir_em_trechos, tokenizar
+
+
+def test_trechos_guardam_fonte_e_pagina():
+    """Testa se cada trecho sabe de qual arquivo e página veio."""
+    paginas = ["palavra " * 100, "outra " * 100]
+    texto = "".join(paginas)
+    trechos = dividir_em_trechos(texto, "a.pdf", inicios_paginas=[0, len(paginas[0])], tamanho=300, sobreposicao=50)
+    assert {t["fonte"] for t in trechos} == {"a.pdf"}
+    assert trechos[0]["pagina"] == 1 and trechos[-1]["pagina"] == 2
+    assert all(len(t["texto"]) <= 300 for t in trechos)
+
+
+def test_bm25_ranqueia_o_trecho_mais_relevante_primeiro():
+    """Testa o ranqueamento, ignorando acentos e maiúsculas."""
+    trechos = [
+        {"fonte": "clima.pdf", "pagina": 1, "texto": "O aquecimento global eleva a temperatura dos oceanos."},
+        {"fonte": "economia.pdf", "pagina": 4, "texto": "A inflação e os juros afetam o crédito."},
+        {"fonte": "economia.pdf", "pagina": 5, "texto": "Juros altos reduzem o crédito e a inflação cai."},
+    ]
+    resultados = IndiceBM25(trechos).buscar("Qual o efeito dos JUROS na inflação?", k=2)
+    assert [t["fonte"] for t, _ in resultados] == ["economia.pdf", "economia.pdf"]
+    assert tokenizar("Inflação") == ["inflacao"]
+
+
+def test_chat_envia_so_os_trechos_do_turno_atual(modelo_falso):
+    """Testa se o histórico guarda só a pergunta, sem os trechos recuperados."""
+    trechos = [{"fonte": "a.pdf", "pagina": 2, "texto": "Fotossíntese converte luz em energia."}]
+    modelo = modelo_falso(texto="Resposta final", trechos=["Resposta ", "final"])
+    chat = ChatComRecuperacao(modelo, IndiceBM25(trechos))
+    assert "".join(t.text for t in chat.send_message("O que é fotossíntese?", stream=True)) == "Resposta final"
+    assert "Fotossíntese converte luz" in modelo.conteudos[0][-1]["parts"][0]
+    assert chat.ultimas_fontes == ["a.pdf, p. 2"]
+    assert chat.historico.trocas == [("O que é fotossíntese?", "Resposta final")]
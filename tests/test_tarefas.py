@@ -0,0 +1,87 @@
+# tests/test_tarefas.py
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.tarefas import CONCLUIDA, FALHOU, NA_FILA, ExecutorTarefas
+
+
+def _esperar(tarefa, timeout=5):
+    for _ in range(timeout * 100):
+        if tarefa.terminada: return
+        threading.Event().wait(0.01)
+    raise AssertionError("a tarefa não terminou")
+
+
+def test_reenvio_devolve_a_mesma_tarefa_sem_refazer_o_trabalho():
+    """Testa a tabela por (sessão, tipo, chave): rerun ou navegação não recomeçam a tarefa."""
+    executor, execucoes, liberar = ExecutorTarefas(max_trabalhadores=1), [], threading.Event()
+    def trabalho(tarefa):
+        execucoes.append(1)
+        tarefa.informar_progresso(etapa="meio")
+        liberar.wait(5)
+        return 42
+    tarefa = executor.enviar("u1", "analise", "abc", trabalho)
+    assert executor.enviar("u1", "analise", "abc", trabalho) is tarefa
+    outra = executor.enviar("u2", "analise", "abc", lambda t: 7)  # Outra sessão, mesma chave: tarefa própria
+    assert outra is not tarefa and outra.estado == NA_FILA
+    liberar.set()
+    _esperar(tarefa); _esperar(outra)
+    assert tarefa.estado == CONCLUIDA and tarefa.resultado == 42 and tarefa.progresso == {"etapa": "meio"}
+    assert executor.obter("u1", "analise", "abc") is tarefa and len(execucoes) == 1
+    resumo = {r["tipo"]: r for r in executor.estatisticas()}["analise"]
+    assert resumo["concluidas"] == 2 and resumo["na_fila"] == 0 and resumo["duracao_p95"] is not None
+    executor.encerrar()
+
+
+def test_tarefa_com_falha_e_executada_de_novo_so_depois_de_recolhida_e_concluidas_antigas_saem():
+    executor = ExecutorTarefas(max_trabalhadores=1, max_concluidas=2)
+    falha = executor.enviar("u1", "ingestao", "x", lambda t: 1 / 0)
+    _esperar(falha)
+    assert falha.estado == FALHOU and isinstance(falha.erro, ZeroDivisionError)
+    assert executor.enviar("u1", "ingestao", "x", lambda t: "ok") is falha
+    executor.recolher(falha)
+    nova = executor.enviar("u1", "ingestao", "x", lambda t: "ok")
+    _esperar(nova)
+    assert nova is not falha and nova.resultado == "ok"
+    for chave in ("a", "b", "c"): _esperar(executor.enviar("u1", "ingestao", chave, lambda t: chave))
+    executor.enviar("u1", "ingestao", "d", lambda t: None)
+    assert executor.obter("u1", "ingestao", "x") is None and executor.obter("u1", "ingestao", "c") is not None
+    executor.encerrar()
+
+
+def test_recolher_libera_o_resultado_e_permite_refazer_a_tarefa():
+    """Testa se a tarefa recolhida sai da tabela, solta o resultado e é executada de novo no próximo envio."""
+    executor, execucoes = ExecutorTarefas(max_trabalhadores=1), []
+    def trabalho(tarefa):
+        execucoes.append(1)
+        return {"resultados": None, "erros": {"resumo": "429"}}  # Concluída, mas com erros parciais
+    tarefa = executor.enviar("u1", "analise", "abc", trabalho)
+    _esperar(tarefa)
+    assert tarefa.estado == CONCLUIDA and executor.enviar("u1", "analise", "abc", trabalho) is tarefa
+    assert executor.recolher(tarefa)["erros"] == {"resumo": "429"}
+    assert tarefa.resultado is None and executor.obter("u1", "analise", "abc") is None
+    nova = executor.enviar("u1", "analise", "abc", trabalho)
+    _esperar(nova)
+    assert nova is not tarefa and len(execucoes) == 2
+    executor.encerrar()
+
+
+def test_pagina_mostra_o_erro_de_uma_analise_que_falhou_sem_reenviar():
+    """Simula as reexecuções da página de resultados: enviar a cada rerun até a tarefa terminar, então recolher e exibir o erro."""
+    executor, execucoes = ExecutorTarefas(max_trabalhadores=1), []
+    def trabalho(tarefa):
+        execucoes.append(1)
+        raise RuntimeError("cota diária excedida")
+    mensagem = None
+    for _ in range(500):  # Cada volta é um rerun disparado pelo fragmento de acompanhamento
+        tarefa = executor.enviar("u1", "analise", "abc", trabalho)
+        if tarefa.terminada:
+            executor.recolher(tarefa)
+            if tarefa.estado == FALHOU: mensagem = f"Erro ao comunicar com a IA: {tarefa.erro}"
+            break
+        threading.Event().wait(0.01)
+    assert mensagem == "Erro ao comunicar com a IA: cota diária excedida"
+    assert len(execucoes) == 1
+    executor.encerrar()
@@ -0,0 +1,51 @@
+# tests/test_transcricoes.py
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.transcricoes import (BaldeDeFichas, CacheTranscricoes, MuitasRequisicoes, ProvedorFalso,
+                               ServicoTranscricoes, extrair_id_video)
+
+ID = "dQw4w9WgXcQ"
+
+
+def test_extrai_id_dos_formatos_de_url():
+    for url in (f"https://www.youtube.com/watch?v={ID}&t=10", f"https://youtu.be/{ID}?si=x", f"https://youtube.com/shorts/{ID}", ID):
+        assert extrair_id_video(url) == ID
+    assert extrair_id_video("https://example.com/video") is None
+
+
+def test_balde_de_fichas_espera_quando_a_rajada_acaba():
+    """Testa o token bucket com um relógio falso: 2 fichas de rajada e 1 ficha por segundo."""
+    agora = [0.0]
+    def dormir(segundos): agora[0] += segundos
+    balde = BaldeDeFichas(taxa=1.0, capacidade=2, relogio=lambda: agora[0], dormir=dormir)
+    assert balde.adquirir() == 0 and balde.adquirir() == 0
+    assert balde.adquirir() == pytest.approx(1.0)
+    assert agora[0] == pytest.approx(1.0)
+
+
+def test_backoff_exponencial_e_cache_persistente(tmp_path):
+    """Testa as novas tentativas após 429 e se a segunda busca não chega ao provedor."""
+    esperas = []
+    provedor = ProvedorFalso({ID: "olá mundo"}, falhas_429=2)
+    cache = CacheTranscricoes(str(tmp_path / "transcricoes.sqlite3"))
+    servico = ServicoTranscricoes(provedor, cache, BaldeDeFichas(1000, 1000), espera_base=1.0, dormir=esperas.append)
+    assert servico.obter(ID) == "olá mundo"
+    assert esperas == [1.0, 2.0] and provedor.chamadas == 3
+    outro = ServicoTranscricoes(provedor, CacheTranscricoes(str(tmp_path / "transcricoes.sqlite3")))
+    assert outro.obter(ID) == "olá mundo" and provedor.chamadas == 3
+
+    bloqueado = ServicoTranscricoes(ProvedorFalso({}, falhas_429=10), balde=BaldeDeFichas(1000, 1000), max_tentativas=3, dormir=lambda s: None)
+    with pytest.raises(MuitasRequisicoes): bloqueado.obter(ID)
+
+
+def test_pedidos_simultaneos_do_mesmo_video_fazem_uma_busca():
+    provedor = ProvedorFalso({ID: "texto"}, atraso=0.2)
+    servico = ServicoTranscricoes(provedor, balde=BaldeDeFichas(1000, 1000))
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        textos = list(pool.map(lambda _: servico.obter(ID), range(5)))
+    assert textos == ["texto"] * 5 and provedor.chamadas == 1
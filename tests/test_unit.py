@@ -24,4 +24,31 @@ def test_assinatura_expirada():
 def test_assinatura_sem_data():
     """Testa se um perfil sem data de assinatura é considerado inválido."""
     user_details = {'name': 'Test User'}
-    assert verificar_validade_assinatura(user_details) is False
\ No newline at end of file
+    assert verificar_validade_assinatura(user_details) is False
+
+
+def test_perfil_em_cache_evita_nova_consulta(monkeypatch):
+    """Testa se o perfil é reaproveitado dentro do TTL e recarregado após invalidação."""
+    import streamlit as st
+    import app
+
+    consultas = []
+
+    class _Consulta:
+        def __getattr__(self, nome):
+            return lambda *args, **kwargs: self
+        def execute(self):
+            consultas.append(1)
+            return type("Resposta", (), {"data": {"full_name": "Teste"}})()
+
+    monkeypatch.setattr(app.supabase, "table", lambda nome: _Consulta())
+    st.session_state.user_session = {"user": {"id": "usuario-1"}}
+    try:
+        assert app.get_user_profile() == {"full_name": "Teste"}
+        assert app.get_user_profile() == {"full_name": "Teste"}
+        assert len(consultas) == 1
+        app.invalidar_perfil()
+        app.get_user_profile()
+        assert len(consultas) == 2
+    finally:
+        st.session_state.clear()
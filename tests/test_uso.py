@@ -0,0 +1,45 @@
+# tests/test_uso.py
+import sys
+import os
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.uso import CotaExcedida, ModeloRegistrado, RegistroUso
+
+
+def test_chamadas_sao_registradas_em_lote_e_resumidas(modelo_falso, tmp_path):
+    """Testa a gravação em lotes e o resumo por funcionalidade."""
+    registro = RegistroUso(str(tmp_path / "uso.sqlite3"), tamanho_lote=10, intervalo=3600)
+    modelo = ModeloRegistrado(modelo_falso(trechos=["a", "b"], uso=(100, 20)), registro, "usuario-1", "chat_documento")
+    modelo.generate_content("pergunta")
+    list(modelo.generate_content("pergunta", stream=True))
+    assert len(registro._pendentes) == 2  # Ainda não gravados
+    (resumo,) = registro.resumo_por_tipo()
+    assert resumo["tipo"] == "chat_documento" and resumo["chamadas"] == 2
+    assert resumo["tokens_entrada"] == 200 and resumo["tokens_saida"] == 40
+    assert resumo["latencia_p50"] <= resumo["latencia_p95"]
+
+
+def test_cota_diaria_bloqueia_antes_de_enviar(modelo_falso, tmp_path):
+    """Testa se a cota é verificada antes da requisição ser enviada."""
+    registro = RegistroUso(str(tmp_path / "uso.sqlite3"), limite_tokens_diario=150)
+    modelo = ModeloRegistrado(modelo_falso(uso=(100, 20)), registro, "usuario-1", "analise")
+    modelo.generate_content("x")  # Consome 120 tokens
+    with pytest.raises(CotaExcedida):
+        modelo.generate_content("y" * 400)  # ~100 tokens previstos
+    ModeloRegistrado(modelo_falso(uso=(100, 20)), registro, "usuario-2", "analise").generate_content("y" * 400)
+
+
+def test_consumo_em_memoria_guarda_so_o_dia_corrente(modelo_falso, tmp_path, monkeypatch):
+    """Testa se a virada do dia descarta os contadores dos dias anteriores e zera a cota."""
+    import core.uso
+    hoje = [date(2025, 1, 1)]
+    monkeypatch.setattr(core.uso, "date", type("DataFalsa", (), {"today": staticmethod(lambda: hoje[0])}))
+    registro = RegistroUso(str(tmp_path / "uso.sqlite3"), limite_tokens_diario=150)
+    for usuario in ("usuario-1", "usuario-2"):
+        ModeloRegistrado(modelo_falso(uso=(100, 20)), registro, usuario, "analise").generate_content("x")
+    assert registro.consumo_do_dia("usuario-1") == 120 and len(registro._consumo) == 2
+    hoje[0] = date(2025, 1, 2)
+    assert registro.consumo_do_dia("usuario-1") == 0 and list(registro._consumo) == ["usuario-1"]
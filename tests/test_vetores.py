@@ -0,0 +1,49 @@
+# tests/test_vetores.py
+import sys
+import os
+from io import BytesIO
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.vetores import EmbeddingHash, IndiceVetorial, carregar_ou_construir, chave_documentos, podar_indices
+
+TRECHOS = [
+    {"fonte": "economia.pdf", "pagina": 1, "texto": "O banco central elevou a taxa de juros para conter a inflação."},
+    {"fonte": "clima.pdf", "pagina": 3, "texto": "As geleiras derretem com o aumento da temperatura global."},
+]
+
+
+def test_busca_semantica_aproxima_variacoes_de_palavras():
+    """Testa se a consulta com palavras derivadas encontra o trecho certo."""
+    indice = IndiceVetorial.construir(TRECHOS, EmbeddingHash())
+    assert indice.vetores.dtype == np.float32 and indice.vetores.flags["C_CONTIGUOUS"]
+    (trecho, _), *_ = indice.buscar("pressões inflacionárias e juro", k=1)
+    assert trecho["fonte"] == "economia.pdf"
+
+
+def test_indice_persistido_e_reaberto_por_memory_map(tmp_path):
+    """Testa se o mesmo conjunto de arquivos reabre o índice do disco."""
+    embedding = EmbeddingHash()
+    arquivo = BytesIO(b"conteudo")
+    arquivo.name = "a.txt"
+    chave = chave_documentos([arquivo], embedding)
+    assert chave_documentos([arquivo], embedding, tamanho_trecho=800) != chave != chave_documentos([arquivo], embedding, limite_caracteres=1000)
+    construido, carregado = carregar_ou_construir(str(tmp_path), chave, lambda: TRECHOS, embedding)
+    assert not carregado
+    reaberto, carregado = carregar_ou_construir(str(tmp_path), chave, lambda: [], embedding)
+    assert carregado and isinstance(reaberto.vetores, np.memmap)
+    assert reaberto.buscar("geleiras", k=1)[0][0]["fonte"] == "clima.pdf"
+
+
+def test_indices_em_disco_sao_podados_pelo_uso_mais_antigo(tmp_path):
+    """Testa se o limite em bytes remove os índices usados há mais tempo e preserva o recém-criado."""
+    embedding = EmbeddingHash()
+    for i, chave in enumerate(["a", "b", "c"]):
+        carregar_ou_construir(str(tmp_path), chave, lambda: TRECHOS, embedding)
+        os.utime(tmp_path / chave, (1000 + i, 1000 + i))
+    tamanho = sum(f.stat().st_size for f in (tmp_path / "a").iterdir())
+    carregar_ou_construir(str(tmp_path), "a", lambda: [], embedding)  # Reaberto: passa a ser o mais recente
+    carregar_ou_construir(str(tmp_path), "d", lambda: TRECHOS, embedding, limite_bytes=2 * tamanho)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a", "d"]
+    assert podar_indices(str(tmp_path), 0, manter=("d",)) == 1 and [p.name for p in tmp_path.iterdir()] == ["d"]